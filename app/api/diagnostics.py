@@ -0,0 +1,59 @@
+from fastapi import APIRouter
+from app.core import cassette, prompt_payload
+from app.core.config import settings
+from app.core.loop_monitor import loop_monitor
+from app.services import rec_cache, knowledge, supabase_async, entity_cache
+from app import prompt_hub, llm_hub
+from app.jobs.queue import job_queue
+from app.jobs import process_group
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/diagnostics/keys")
+async def get_key_stats():
+    return {
+        "openai": settings.openai_keys.stats(),
+        "nvidia": settings.nvidia_keys.stats(),
+        "google": settings.google_keys.stats(),
+    }
+
+@router.get("/diagnostics/caches")
+async def get_cache_stats():
+    return {
+        "prompts": prompt_hub.registry.stats(),
+        "llm_clients": llm_hub.client_pool.stats(),
+        "llm_single_flight": llm_hub.single_flight.stats(),
+        "recommendations": rec_cache.stats(),
+        "knowledge": knowledge.memo_stats(),
+        "entities": entity_cache.stats(),
+    }
+
+@router.get("/diagnostics/routing")
+async def get_routing_stats():
+    return llm_hub.router.stats()
+
+@router.get("/diagnostics/breakers")
+async def get_breaker_stats():
+    return llm_hub.resilience_stats()
+
+@router.get("/diagnostics/payloads")
+async def get_prompt_payload_stats():
+    return prompt_payload.stats()
+
+@router.get("/diagnostics/jobs")
+async def get_job_queue_stats():
+    return {**job_queue.stats(), "kn_refresh": process_group.coalescer.stats()}
+
+@router.get("/diagnostics/db")
+async def get_db_stats():
+    return supabase_async.stats()
+
+@router.get("/diagnostics/loop")
+async def get_loop_stats():
+    return {**loop_monitor.stats(), "recent_blocks": loop_monitor.events()}
+
+@router.get("/diagnostics/cassette")
+async def get_cassette_stats():
+    return cassette.stats()
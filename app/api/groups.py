@@ -1,22 +1,28 @@
 from fastapi import APIRouter, HTTPException
-from app.models.schemas import GroupCreate, GroupResponse, MemberAdd, MemberResponse, GroupTraitsResponse, ErrorResponse
-from app.services import supabase as db
-from app.services import knowledge
+from app.models.schemas import GroupCreate, GroupResponse, MemberAdd, MemberResponse, GroupTraitsResponse, ErrorResponse, JobResponse, JobType
+from app.services import supabase_async as db
+from app.jobs.queue import job_queue, QueueFullError
 from app import prompt_hub
 import uuid
 from datetime import datetime
-import asyncio
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.post("/groups", response_model=GroupResponse, responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}})
+
+async def _enqueue_processing(group_id: str, **payload) -> dict:
+    try:
+        return await job_queue.enqueue(JobType.PROCESS_GROUP_TRAITS, group_id, **payload)
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail={"code": "JOB_QUEUE_FULL", "message": "Too many pending jobs, retry later"})
+
+
+@router.post("/groups", response_model=GroupResponse, status_code=202, responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}, 503: {"model": ErrorResponse}})
 async def create_group(group: GroupCreate):
     logger.info("create_group: start name=%s destination=%s creator=%s", group.group_name, group.destination, group.creator_email)
     with prompt_hub.langfuse.trace(name="group_creation_journey") as trace:
-        loop = asyncio.get_running_loop()
-        creator = await loop.run_in_executor(None, db.get_user_by_email, group.creator_email)
+        creator = await db.get_user_by_email(group.creator_email)
         if not creator:
             raise HTTPException(status_code=404, detail={"code": "CREATOR_NOT_FOUND", "message": "Creator not found"})
         group_data = {
@@ -26,40 +32,26 @@ async def create_group(group: GroupCreate):
             "destination": group.destination,
             "created_at": datetime.now().isoformat(),
         }
-        await loop.run_in_executor(None, db.insert_group, group_data)
+        await db.insert_group(group_data)
         member_data = {
             "group_id": group_data["id"],
             "user_id": creator["id"],
             "role": "creator",
             "joined_at": datetime.now().isoformat(),
         }
-        await loop.run_in_executor(None, db.insert_group_member, member_data)
-        members = await loop.run_in_executor(None, db.get_group_members, group_data["id"])
-        user_ids = [m["user_id"] for m in members]
-        users = await loop.run_in_executor(None, db.get_users_by_ids, user_ids)
-        group_members = [{"persona_traits": u["persona_traits"], "ai_summary": u["ai_summary"]} for u in users]
-        kn_data = await loop.run_in_executor(None, knowledge.generate_kn, group_members)
-        kg_record = {
-            "id": str(uuid.uuid4()),
-            "group_id": group_data["id"],
-            "graph_json": kn_data,
-            "updated_at": datetime.now().isoformat(),
-        }
-        await loop.run_in_executor(None, db.insert_knowledge_graph, kg_record)
-        kn_summary = await loop.run_in_executor(None, knowledge.generate_kn_summary, kn_data)
-        await loop.run_in_executor(None, db.update_group_kn_summary, group_data["id"], kn_summary)
-        logger.info("create_group: success id=%s", group_data["id"])
-        return group_data
+        await db.insert_group_member(member_data)
+        job = await _enqueue_processing(group_data["id"])
+        logger.info("create_group: success id=%s job_id=%s", group_data["id"], job["id"])
+        return {**group_data, "job_id": job["id"]}
 
-@router.post("/groups/{group_id}/members", response_model=MemberResponse, responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}})
+@router.post("/groups/{group_id}/members", response_model=MemberResponse, status_code=202, responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}, 503: {"model": ErrorResponse}})
 async def add_member(group_id: str, member: MemberAdd):
     logger.info("add_member: start group_id=%s email=%s", group_id, member.user_email)
     with prompt_hub.langfuse.trace(name="group_member_add_journey") as trace:
-        loop = asyncio.get_running_loop()
-        user = await loop.run_in_executor(None, db.get_user_by_email, member.user_email)
+        user = await db.get_user_by_email(member.user_email)
         if not user:
             raise HTTPException(status_code=404, detail={"code": "USER_NOT_FOUND", "message": "User not found"})
-        existing_member = await loop.run_in_executor(None, db.get_group_member, group_id, user["id"])
+        existing_member = await db.get_group_member(group_id, user["id"])
         if existing_member:
             raise HTTPException(status_code=400, detail={"code": "USER_ALREADY_IN_GROUP", "message": "User already in group"})
         member_data = {
@@ -68,39 +60,25 @@ async def add_member(group_id: str, member: MemberAdd):
             "role": "member",
             "joined_at": datetime.now().isoformat(),
         }
-        await loop.run_in_executor(None, db.insert_group_member, member_data)
-        members = await loop.run_in_executor(None, db.get_group_members, group_id)
-        user_ids = [m["user_id"] for m in members]
-        users = await loop.run_in_executor(None, db.get_users_by_ids, user_ids)
-        group_members = [{"persona_traits": u["persona_traits"], "ai_summary": u["ai_summary"]} for u in users]
-        kn_data = await loop.run_in_executor(None, knowledge.generate_kn, group_members)
-        kg_record = {
-            "id": str(uuid.uuid4()),
-            "group_id": group_id,
-            "graph_json": kn_data,
-            "updated_at": datetime.now().isoformat(),
-        }
-        await loop.run_in_executor(None, db.insert_knowledge_graph, kg_record)
-        kn_summary = await loop.run_in_executor(None, knowledge.generate_kn_summary, kn_data)
-        await loop.run_in_executor(None, db.update_group_kn_summary, group_id, kn_summary)
-        logger.info("add_member: success group_id=%s user_id=%s", group_id, user["id"])
-        return member_data
+        await db.insert_group_member(member_data)
+        new_member = {"persona_traits": user["persona_traits"], "ai_summary": user["ai_summary"]}
+        job = await _enqueue_processing(group_id, new_member=new_member)
+        logger.info("add_member: success group_id=%s user_id=%s job_id=%s", group_id, user["id"], job["id"])
+        return {**member_data, "job_id": job["id"]}
 
 @router.get("/groups/{group_id}/traits", response_model=GroupTraitsResponse, responses={404: {"model": ErrorResponse}})
 async def get_group_traits(group_id: str):
     logger.info("get_group_traits: start group_id=%s", group_id)
-    loop = asyncio.get_running_loop()
-
-    group = await loop.run_in_executor(None, db.get_group, group_id)
+    group = await db.get_group(group_id)
     if not group:
         raise HTTPException(status_code=404, detail={"code": "GROUP_NOT_FOUND", "message": "Group not found"})
 
-    members = await loop.run_in_executor(None, db.get_group_members, group_id)
+    members = await db.get_group_members(group_id)
     if not members:
         raise HTTPException(status_code=404, detail={"code": "NO_MEMBERS_FOUND", "message": "No members found"})
 
     user_ids = [m["user_id"] for m in members]
-    users = await loop.run_in_executor(None, db.get_users_by_ids, user_ids)
+    users = await db.get_users_by_ids(user_ids)
 
     result = {
         "group_id": group_id,
@@ -110,27 +88,13 @@ async def get_group_traits(group_id: str):
     logger.info("get_group_traits: success group_id=%s members=%d", group_id, len(result["group_members"]))
     return result
 
-@router.post("/groups/{group_id}/process", responses={404: {"model": ErrorResponse}})
+@router.post("/groups/{group_id}/process", response_model=JobResponse, status_code=202, responses={404: {"model": ErrorResponse}, 503: {"model": ErrorResponse}})
 async def process_group_manually(group_id: str):
     logger.info("process_group_manually: start group_id=%s", group_id)
     with prompt_hub.langfuse.trace(name="manual_group_processing") as trace:
-        loop = asyncio.get_running_loop()
-        group = await loop.run_in_executor(None, db.get_group, group_id)
+        group = await db.get_group(group_id)
         if not group:
             raise HTTPException(status_code=404, detail={"code": "GROUP_NOT_FOUND", "message": "Group not found"})
-        members = await loop.run_in_executor(None, db.get_group_members, group_id)
-        user_ids = [m["user_id"] for m in members]
-        users = await loop.run_in_executor(None, db.get_users_by_ids, user_ids)
-        group_members = [{"persona_traits": u["persona_traits"], "ai_summary": u["ai_summary"]} for u in users]
-        kn_data = await loop.run_in_executor(None, knowledge.generate_kn, group_members)
-        kg_record = {
-            "id": str(uuid.uuid4()),
-            "group_id": group_id,
-            "graph_json": kn_data,
-            "updated_at": datetime.now().isoformat(),
-        }
-        await loop.run_in_executor(None, db.insert_knowledge_graph, kg_record)
-        kn_summary = await loop.run_in_executor(None, knowledge.generate_kn_summary, kn_data)
-        await loop.run_in_executor(None, db.update_group_kn_summary, group_id, kn_summary)
-        logger.info("process_group_manually: success group_id=%s", group_id)
-        return {"message": "Processing completed"}
+        job = await _enqueue_processing(group_id)
+        logger.info("process_group_manually: enqueued group_id=%s job_id=%s", group_id, job["id"])
+        return job
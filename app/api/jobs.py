@@ -0,0 +1,14 @@
+from fastapi import APIRouter, HTTPException
+from app.models.schemas import JobResponse, ErrorResponse
+from app.jobs.queue import job_queue
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse, responses={404: {"model": ErrorResponse}})
+async def get_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail={"code": "JOB_NOT_FOUND", "message": "Job not found"})
+    return job
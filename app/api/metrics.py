@@ -0,0 +1,104 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core import metrics
+from app.core.config import settings
+from app.core.loop_monitor import loop_monitor
+from app.services import rec_cache, knowledge, supabase_async, entity_cache
+from app import prompt_hub, llm_hub
+from app.jobs.queue import job_queue
+import asyncio
+import os
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def _executor_metrics():
+    # The default executor serves asyncio.to_thread (cold prompt fetches, sync SDK calls).
+    executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    if executor is None:
+        max_workers, threads, busy, queued = min(32, (os.cpu_count() or 1) + 4), 0, 0, 0
+    else:
+        max_workers = executor._max_workers
+        threads = len(executor._threads)
+        busy = max(0, threads - executor._idle_semaphore._value)
+        queued = executor._work_queue.qsize()
+    yield "executor_max_workers", "gauge", "Default thread pool size", [({}, max_workers)]
+    yield "executor_threads", "gauge", "Threads started by the default thread pool", [({}, threads)]
+    yield "executor_in_flight_tasks", "gauge", "Default thread pool tasks running or queued", [({}, busy + queued)]
+    yield "executor_queued_tasks", "gauge", "Default thread pool tasks waiting for a thread", [({}, queued)]
+
+
+def _loop_metrics():
+    stats = loop_monitor.stats()
+    yield "event_loop_lag_seconds", "gauge", "Event-loop lag over recent heartbeats", [
+        ({"quantile": "0.5"}, stats["lag_p50_seconds"]),
+        ({"quantile": "0.99"}, stats["lag_p99_seconds"]),
+    ]
+    yield "event_loop_lag_max_seconds", "gauge", "Largest event-loop lag seen", [({}, stats["lag_max_seconds"])]
+    yield "event_loop_blocks_total", "counter", "Callbacks that blocked the loop beyond the threshold", [
+        ({"route": route}, count) for route, count in sorted(stats["blocks_by_route"].items())
+    ]
+
+
+def _cache_metrics():
+    caches = {
+        "prompts": prompt_hub.registry.stats(),
+        "recommendations": rec_cache.stats()["memory"],
+        "knowledge": knowledge.memo_stats(),
+        **{f"entity_{name}": entity_cache.stats()[name] for name in ("groups", "group_members", "users", "user_emails")},
+    }
+    for field, kind, help_text in (
+        ("hits", "counter", "Cache lookups served from the cache"),
+        ("misses", "counter", "Cache lookups that missed"),
+    ):
+        yield f"cache_{field}_total", kind, help_text, [({"cache": name}, stats.get(field)) for name, stats in caches.items()]
+    yield "cache_entries", "gauge", "Entries currently cached", [
+        ({"cache": name}, stats.get("entries")) for name, stats in caches.items()
+    ]
+    single_flight = llm_hub.single_flight.stats()
+    yield "llm_single_flight_deduplicated_total", "counter", "LLM calls served by an identical in-flight call", [
+        ({}, single_flight["deduplicated"])
+    ]
+    yield "llm_single_flight_abandoned_total", "counter", "Shared LLM calls cancelled because every caller left", [
+        ({}, single_flight["abandoned"])
+    ]
+
+
+_CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _pool_metrics():
+    key_stats = {
+        "openai": settings.openai_keys.stats(),
+        "nvidia": settings.nvidia_keys.stats(),
+        "google": settings.google_keys.stats(),
+    }
+    yield "llm_key_in_flight", "gauge", "LLM calls in flight per provider API key", [
+        ({"provider": provider, "key": key["key"]}, key["in_flight"])
+        for provider, keys in key_stats.items() for key in keys
+    ]
+    yield "llm_key_circuit_open", "gauge", "1 while the circuit breaker of a provider API key is open", [
+        ({"provider": provider, "key": key["key"]}, int(key["breaker"]["state"] == "open"))
+        for provider, keys in key_stats.items() for key in keys
+    ]
+    resilience = llm_hub.resilience_stats()["providers"]
+    yield "llm_circuit_state", "gauge", "Provider circuit breaker state (0 closed, 1 half-open, 2 open)", [
+        ({"provider": provider}, _CIRCUIT_STATES[row["breaker"]["state"]]) for provider, row in resilience.items()
+    ]
+    db = supabase_async.stats()
+    yield "db_retries_total", "counter", "PostgREST requests retried", [({}, db["retries"])]
+    yield "db_pool_max_connections", "gauge", "Size of the PostgREST connection pool", [({}, db["max_connections"])]
+    jobs = job_queue.stats()
+    yield "job_queue_pending", "gauge", "Background jobs waiting for a worker", [({}, jobs["pending"])]
+    yield "job_queue_workers", "gauge", "Background job workers running", [({}, jobs["workers"])]
+
+
+for _collector in (_executor_metrics, _loop_metrics, _cache_metrics, _pool_metrics):
+    metrics.registry.register_collector(_collector)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
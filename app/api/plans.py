@@ -1,27 +1,33 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.models.schemas import PlanCreate, PlanResponse, GeneratePlanRequest, ErrorResponse
-from app.services import supabase as db
+from app.services import supabase_async as db
 from app.services import plan
+from app.core import sse
 from app import prompt_hub
 import uuid
 from datetime import datetime
+import asyncio
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Streams whose client went away keep running until their plan is stored.
+_producers = set()
+
 @router.post("/groups/{group_id}/plan", response_model=PlanResponse, responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}, 502: {"model": ErrorResponse}})
 async def create_plan(group_id: str, plan_data: PlanCreate):
     logger.info("create_plan: start group_id=%s", group_id)
     with prompt_hub.langfuse.trace(name="plan_generation_journey", metadata={"group_id": group_id}) as trace:
-        group = db.get_group(group_id)
+        group = await db.get_group(group_id)
         if not group:
             raise HTTPException(status_code=404, detail={"code": "GROUP_NOT_FOUND", "message": "Group not found"})
 
         if not group.get("ai_group_kn_summary"):
             raise HTTPException(status_code=400, detail={"code": "KN_NOT_READY", "message": "Group processing not complete"})
 
-        generated_plan = plan.generate_plan(group["ai_group_kn_summary"], plan_data.raw_data)
+        generated_plan = await plan.generate_plan(group["ai_group_kn_summary"], plan_data.raw_data)
 
         if not isinstance(generated_plan, dict) or "plan_options" not in generated_plan:
             raise HTTPException(
@@ -42,7 +48,7 @@ async def create_plan(group_id: str, plan_data: PlanCreate):
             "created_at": datetime.now().isoformat(),
         }
 
-        db.insert_trip_plan(plan_record)
+        await db.insert_trip_plan(plan_record)
         logger.info("create_plan: success group_id=%s plan_id=%s", group_id, plan_record["id"])
         return plan_record
 
@@ -50,14 +56,14 @@ async def create_plan(group_id: str, plan_data: PlanCreate):
 async def create_plan_by_group_name(payload: GeneratePlanRequest):
     logger.info("create_plan_by_group_name: start group_name=%s", payload.group_name)
     with prompt_hub.langfuse.trace(name="plan_generation_journey_by_name", metadata={"group_name": payload.group_name}) as trace:
-        group = db.get_group_by_name(payload.group_name)
+        group = await db.get_group_by_name(payload.group_name)
         if not group:
             raise HTTPException(status_code=404, detail={"code": "GROUP_NOT_FOUND", "message": "Group not found"})
 
         if not group.get("ai_group_kn_summary"):
             raise HTTPException(status_code=400, detail={"code": "KN_NOT_READY", "message": "Group processing not complete"})
 
-        generated_plan = plan.generate_plan(group["ai_group_kn_summary"], payload.raw_data)
+        generated_plan = await plan.generate_plan(group["ai_group_kn_summary"], payload.raw_data)
 
         if not isinstance(generated_plan, dict) or "plan_options" not in generated_plan:
             raise HTTPException(
@@ -78,6 +84,69 @@ async def create_plan_by_group_name(payload: GeneratePlanRequest):
             "created_at": datetime.now().isoformat(),
         }
 
-        db.insert_trip_plan(plan_record)
+        await db.insert_trip_plan(plan_record)
         logger.info("create_plan_by_group_name: success group_id=%s plan_id=%s", group["id"], plan_record["id"])
         return plan_record
+
+async def _plan_event_stream(group_id: str, kn_summary, raw_data: dict):
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            with prompt_hub.langfuse.trace(name="plan_generation_stream_journey", metadata={"group_id": group_id}):
+                async for event, data in plan.stream_plan(kn_summary, raw_data):
+                    if event == "plan":
+                        if not isinstance(data, dict) or "plan_options" not in data:
+                            await queue.put(("error", {
+                                "code": "LLM_BAD_RESPONSE",
+                                "message": "Plan generator did not return expected plan_options structure",
+                            }))
+                            return
+                        data = {
+                            "id": str(uuid.uuid4()),
+                            "group_id": group_id,
+                            "plan_json": data,
+                            "summary_caption": "Generated multi-option plan",
+                            "estimated_cost_per_person": None,
+                            "created_at": datetime.now().isoformat(),
+                        }
+                        await db.insert_trip_plan(data)
+                        logger.info("stream_plan: success group_id=%s plan_id=%s", group_id, data["id"])
+                    await queue.put((event, data))
+        except Exception:
+            logger.exception("stream_plan: failed group_id=%s", group_id)
+            await queue.put(("error", {"code": "PLAN_STREAM_FAILED", "message": "Plan generation failed"}))
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(produce())
+    _producers.add(task)
+    task.add_done_callback(_producers.discard)
+
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        yield sse.format_event(*item)
+
+@router.post("/groups/{group_id}/plan/stream", responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}})
+async def stream_plan(group_id: str, plan_data: PlanCreate):
+    """
+    Server-Sent Events variant of `POST /groups/{group_id}/plan`.
+
+    Emits `day` and `option` events as parts of the itinerary become complete,
+    then `plan` with the stored `PlanResponse` (or `error`).
+    """
+    logger.info("stream_plan: start group_id=%s", group_id)
+    group = await db.get_group(group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail={"code": "GROUP_NOT_FOUND", "message": "Group not found"})
+
+    if not group.get("ai_group_kn_summary"):
+        raise HTTPException(status_code=400, detail={"code": "KN_NOT_READY", "message": "Group processing not complete"})
+
+    return StreamingResponse(
+        _plan_event_stream(group_id, group["ai_group_kn_summary"], plan_data.raw_data),
+        media_type="text/event-stream",
+        headers=sse.EVENT_STREAM_HEADERS,
+    )
@@ -1,22 +1,102 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.models.schemas import RecommendationsResponse
-from app.services import supabase as db
+from app.services import supabase_async as db
 from app.services import recommend
+from app.core import sse
 from app import prompt_hub
-import asyncio
 import datetime
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+
+def _fallback_branch(group: dict):
+    # Lightweight, deterministic recommendation payload so the user flow isn't
+    # blocked during MVP demos (e.g., free tier/model errors).
+    today = datetime.date.today()
+    return {
+        "user_id": "User_001",
+        "base_city": group.get("destination") or "Bangalore",
+        "date_range": [
+            str(today),
+            str(today + datetime.timedelta(days=3)),
+        ],
+        "search_radius_km": 200,
+        "short_trip_destinations": [
+            {
+                "option_variant": "Option A – Nature & Scenic Retreat",
+                "destination_name": "Nandi Hills",
+                "distance_from_base_km": "60",
+                "travel_time": "1.5 - 2 hours by car",
+                "trip_length_days": 2,
+                "key_highlights": [
+                    "Sunrise trek and panoramic views from the hilltop",
+                    "Paragliding and cycling options",
+                    "Visit Tipu's Drop and Bhoga Nandeeshwara Temple",
+                ],
+                "accommodation_notes": "Budget guesthouses to mid-range resorts available nearby.",
+                "estimated_cost_per_person": "INR 5,000 - 8,000",
+                "transportation_options": ["drive", "bus", "train"],
+                "weather_during_trip": "Pleasant and cool (typical mid-season).",
+                "source": {
+                    "title": "51 Places To Visit Near Bangalore Within 200 kms",
+                    "url": "https://example.com/nandi-hills",
+                    "snippet": "Nandi Hills blends historical charm with quick outdoor escapes.",
+                },
+            },
+            {
+                "option_variant": "Option B – Cultural & Heritage Destination",
+                "destination_name": "Mysore",
+                "distance_from_base_km": "145",
+                "travel_time": "3 - 4 hours by car/train",
+                "trip_length_days": 2,
+                "key_highlights": [
+                    "Mysore Palace illumination",
+                    "Devaraja Market walk",
+                    "Chamundi Hills & St. Philomena's Church",
+                ],
+                "accommodation_notes": "City hotels and boutique heritage stays available.",
+                "estimated_cost_per_person": "INR 6,000 - 10,000",
+                "transportation_options": ["drive", "bus", "train"],
+                "weather_during_trip": "Pleasant and moderate.",
+                "source": {
+                    "title": "Places to Visit Near Bangalore for 2 Days",
+                    "url": "https://example.com/mysore",
+                    "snippet": "The cultural capital with grand palaces and lively markets.",
+                },
+            },
+            {
+                "option_variant": "Option C – Adventure & Experiential",
+                "destination_name": "Ramanagara",
+                "distance_from_base_km": "50",
+                "travel_time": "1 - 1.5 hours by car",
+                "trip_length_days": 2,
+                "key_highlights": [
+                    "Rock climbing and rappelling on granite hills",
+                    "Trekking rugged trails",
+                    "Zip-lining, cave exploration at adventure camps",
+                ],
+                "accommodation_notes": "Adventure camps, nature resorts, and basic guesthouses.",
+                "estimated_cost_per_person": "INR 5,500 - 8,500",
+                "transportation_options": ["drive", "bus", "train"],
+                "weather_during_trip": "Pleasant and dry; ideal for outdoor activities.",
+                "source": {
+                    "title": "40 Places to Visit near Bangalore within 200 Kms",
+                    "url": "https://example.com/ramanagara",
+                    "snippet": "Adventure paradise near Bangalore with rugged trails.",
+                },
+            },
+        ],
+    }
+
+
 @router.get("/groups/{group_id}/recommendations", response_model=RecommendationsResponse)
 async def get_recommendations(group_id: str):
     logger.info("get_recommendations: start group_id=%s", group_id)
     with prompt_hub.langfuse.trace(name="recommendation_plan_journey", metadata={"group_id": group_id}) as trace:
-        loop = asyncio.get_running_loop()
-
-        group = await loop.run_in_executor(None, db.get_group, group_id)
+        group = await db.get_group(group_id)
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
 
@@ -27,90 +107,69 @@ async def get_recommendations(group_id: str):
             recommendations = await recommend.generate_recommendations(
                 group["ai_group_kn_summary"],
                 group["destination"],
+                group_id=group_id,
             )
-            logger.info("get_recommendations: success group_id=%s", group_id)
-            return recommendations
         except Exception as e:
             logger.exception("get_recommendations: fallback due to error group_id=%s", group_id)
-            # Fallback: return a lightweight, deterministic recommendation payload
-            # so the user flow isn't blocked during MVP demos (e.g., free tier/model errors).
-            today = datetime.date.today()
-            dummy = {
-                "user_id": "User_001",
-                "base_city": group.get("destination") or "Bangalore",
-                "date_range": [
-                    str(today),
-                    str(today + datetime.timedelta(days=3)),
-                ],
-                "search_radius_km": 200,
-                "short_trip_destinations": [
-                    {
-                        "option_variant": "Option A – Nature & Scenic Retreat",
-                        "destination_name": "Nandi Hills",
-                        "distance_from_base_km": "60",
-                        "travel_time": "1.5 - 2 hours by car",
-                        "trip_length_days": 2,
-                        "key_highlights": [
-                            "Sunrise trek and panoramic views from the hilltop",
-                            "Paragliding and cycling options",
-                            "Visit Tipu's Drop and Bhoga Nandeeshwara Temple",
-                        ],
-                        "accommodation_notes": "Budget guesthouses to mid-range resorts available nearby.",
-                        "estimated_cost_per_person": "INR 5,000 - 8,000",
-                        "transportation_options": ["drive", "bus", "train"],
-                        "weather_during_trip": "Pleasant and cool (typical mid-season).",
-                        "source": {
-                            "title": "51 Places To Visit Near Bangalore Within 200 kms",
-                            "url": "https://example.com/nandi-hills",
-                            "snippet": "Nandi Hills blends historical charm with quick outdoor escapes.",
-                        },
-                    },
-                    {
-                        "option_variant": "Option B – Cultural & Heritage Destination",
-                        "destination_name": "Mysore",
-                        "distance_from_base_km": "145",
-                        "travel_time": "3 - 4 hours by car/train",
-                        "trip_length_days": 2,
-                        "key_highlights": [
-                            "Mysore Palace illumination",
-                            "Devaraja Market walk",
-                            "Chamundi Hills & St. Philomena's Church",
-                        ],
-                        "accommodation_notes": "City hotels and boutique heritage stays available.",
-                        "estimated_cost_per_person": "INR 6,000 - 10,000",
-                        "transportation_options": ["drive", "bus", "train"],
-                        "weather_during_trip": "Pleasant and moderate.",
-                        "source": {
-                            "title": "Places to Visit Near Bangalore for 2 Days",
-                            "url": "https://example.com/mysore",
-                            "snippet": "The cultural capital with grand palaces and lively markets.",
-                        },
-                    },
-                    {
-                        "option_variant": "Option C – Adventure & Experiential",
-                        "destination_name": "Ramanagara",
-                        "distance_from_base_km": "50",
-                        "travel_time": "1 - 1.5 hours by car",
-                        "trip_length_days": 2,
-                        "key_highlights": [
-                            "Rock climbing and rappelling on granite hills",
-                            "Trekking rugged trails",
-                            "Zip-lining, cave exploration at adventure camps",
-                        ],
-                        "accommodation_notes": "Adventure camps, nature resorts, and basic guesthouses.",
-                        "estimated_cost_per_person": "INR 5,500 - 8,500",
-                        "transportation_options": ["drive", "bus", "train"],
-                        "weather_during_trip": "Pleasant and dry; ideal for outdoor activities.",
-                        "source": {
-                            "title": "40 Places to Visit near Bangalore within 200 Kms",
-                            "url": "https://example.com/ramanagara",
-                            "snippet": "Adventure paradise near Bangalore with rugged trails.",
-                        },
-                    },
-                ],
-            }
+            dummy = _fallback_branch(group)
             # Package into the expected RecommendationsResponse shape
             return {
                 "short_trip": dummy,
                 "long_trip": dummy,  # reuse for MVP; planner expects both keys present
             }
+
+        # A single failed branch only replaces that branch with the fallback payload.
+        for branch in ("short_trip", "long_trip"):
+            if recommendations.get(branch) is None:
+                logger.warning("get_recommendations: %s branch fell back group_id=%s", branch, group_id)
+                recommendations[branch] = _fallback_branch(group)
+        logger.info("get_recommendations: success group_id=%s", group_id)
+        return recommendations
+
+
+async def _recommendation_event_stream(group: dict, group_id: str, output_format: str):
+    encode = sse.format_ndjson if output_format == "ndjson" else sse.format_event
+    with prompt_hub.langfuse.trace(name="recommendation_stream_journey", metadata={"group_id": group_id}):
+        try:
+            async for event, data in recommend.stream_recommendations(
+                group["ai_group_kn_summary"],
+                group["destination"],
+                group_id=group_id,
+            ):
+                # A failed branch is replaced with the fallback payload, as in the blocking endpoint.
+                if event == "branch" and data["data"] is None:
+                    logger.warning("stream_recommendations: %s branch fell back group_id=%s", data["branch"], group_id)
+                    data = {"branch": data["branch"], "data": _fallback_branch(group), "fallback": True}
+                yield encode(event, data)
+        except Exception:
+            logger.exception("stream_recommendations: failed group_id=%s", group_id)
+            yield encode("error", {"code": "RECOMMENDATION_STREAM_FAILED", "message": "Recommendation generation failed"})
+        else:
+            logger.info("stream_recommendations: success group_id=%s", group_id)
+
+
+@router.get("/groups/{group_id}/recommendations/stream")
+async def stream_recommendations(
+    group_id: str,
+    format: str = Query("sse", pattern="^(sse|ndjson)$", description="`sse` (text/event-stream) or `ndjson`"),
+):
+    """
+    Streaming variant of `GET /groups/{group_id}/recommendations`.
+
+    Emits `destination` events as entries of each branch are generated, a
+    `branch` event with the complete `short_trip` / `long_trip` result as soon as
+    that branch finishes, and `done` at the end.
+    """
+    logger.info("stream_recommendations: start group_id=%s format=%s", group_id, format)
+    group = await db.get_group(group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+
+    if not group.get("ai_group_kn_summary"):
+        raise HTTPException(status_code=400, detail="Group processing not complete")
+
+    return StreamingResponse(
+        _recommendation_event_stream(group, group_id, format),
+        media_type="application/x-ndjson" if format == "ndjson" else "text/event-stream",
+        headers=sse.EVENT_STREAM_HEADERS,
+    )
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, HTTPException, Query
 from app.models.schemas import UserCreate, UserResponse, UserInfoResponse, GroupInfo, PlanResponse
-from app.services import supabase as db
+from app.services import supabase_async as db
+from app.services import loader
 from app import prompt_hub, llm_hub
+from app.core import prompt_payload
 from langfuse import Langfuse
 import uuid
 from datetime import datetime
-import asyncio
 import logging
 
 router = APIRouter()
@@ -15,16 +16,16 @@ logger = logging.getLogger(__name__)
 async def create_user(user: UserCreate):
     logger.info("create_user: start email=%s name=%s", user.email, user.name)
     with prompt_hub.langfuse.trace(name="user_signup_journey", user_id=user.email) as trace:
-        existing_user = db.get_user_by_email(user.email)
+        existing_user = await db.get_user_by_email(user.email)
         if existing_user:
             logger.warning("create_user: user exists email=%s", user.email)
             raise HTTPException(status_code=400, detail="User already exists")
 
-        template_str, prompt_config = prompt_hub.get_prompt("user_intrest")
+        template_str, prompt_config = await prompt_hub.aget_prompt("user_intrest")
 
         rendered_prompt = prompt_hub.render_prompt(
             template_str,
-            USER_RESPONSES=user.user_answer,
+            **prompt_payload.compact("user_intrest", USER_RESPONSES=user.user_answer),
         )
 
         model_name = None
@@ -41,8 +42,10 @@ async def create_user(user: UserCreate):
                 detail="Prompt config missing 'model' for user_intrest prompt."
             )
 
-        response = llm_hub.generate_openai(
+        response = await llm_hub.agenerate_routed(
+            "user_intrest",
             rendered_prompt,
+            "openai",
             model=model_name,
             temperature=temperature,
             top_p=top_p,
@@ -63,7 +66,7 @@ async def create_user(user: UserCreate):
             "ai_summary": response.get("profile_summary")
         }
 
-        db.insert_user(user_data)
+        await db.insert_user(user_data)
         logger.info("create_user: success id=%s email=%s", user_data["id"], user.email)
         return user_data
 
@@ -71,35 +74,16 @@ async def create_user(user: UserCreate):
 @router.get("/users/info", response_model=UserInfoResponse)
 async def get_user_info(email: str = Query(..., description="User email address")):
     logger.info("get_user_info: start email=%s", email)
-    loop = asyncio.get_running_loop()
-
-    user = await loop.run_in_executor(None, db.get_user_by_email, email)
+    user = await db.get_user_by_email(email)
     if not user:
         logger.warning("get_user_info: user not found email=%s", email)
         raise HTTPException(status_code=404, detail="User not found")
 
-    user_groups = await loop.run_in_executor(None, db.get_user_groups, user["id"])
+    user_groups = await loader.load_user_groups(user["id"])
 
     groups_info = []
-    for group in user_groups:
-        group_id = group["id"]
-
-        members = await loop.run_in_executor(None, db.get_group_members, group_id)
-        member_details = []
-        # Defensive: ensure role exists (default to "member")
-        for member in members:
-            member_user = await loop.run_in_executor(None, db.get_user_by_id, member["user_id"])
-            if member_user:
-                member_details.append({
-                    "id": member_user["id"],
-                    "email": member_user["email"],
-                    "name": member_user["name"],
-                    "role": member.get("role", "member"),
-                    "persona_traits": member_user.get("persona_traits"),
-                    "ai_summary": member_user.get("ai_summary")
-                })
-
-        group_plans = await loop.run_in_executor(None, db.get_group_plans, group_id)
+    for entry in user_groups:
+        group = entry["group"]
 
         # KN summary normalization (if backend stored an array, pick the last one)
         kn_summary_raw = group.get("ai_group_kn_summary")
@@ -109,12 +93,12 @@ async def get_user_info(email: str = Query(..., description="User email address"
             kn_summary_value = kn_summary_raw
 
         group_info = GroupInfo(
-            id=group_id,
+            id=group["id"],
             name=group["name"],
             destination=group["destination"],
             creator_id=group["creator_id"],
-            members=member_details,
-            plans=group_plans
+            members=entry["members"],
+            plans=entry["plans"]
         )
         # Note: GroupInfo no longer includes ai_group_kn_summary in the schema.
         # We still compute it above to avoid future errors in case of internal usage.
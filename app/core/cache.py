@@ -0,0 +1,166 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU cache with per-entry TTL.
+
+    Entries can carry tags (e.g. a group id) so every entry derived from one
+    record can be dropped with a single `invalidate_tag` call.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at, _ = item
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expired += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = (), ttl_seconds: Optional[float] = None):
+        ttl = self._ttl if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            tags = frozenset(tags)
+            self._data[key] = (value, time.monotonic() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self._max_entries:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, _, tags = self._data.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self._max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class SQLiteCache:
+    """
+    Persistent JSON cache tier in a local SQLite file; survives restarts.
+
+    Operations are local-disk only and short, so callers use it inline.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, table: str = "cache"):
+        self._ttl = ttl_seconds
+        self._table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, tag TEXT, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_tag ON {table}(tag)")
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, Optional[str]]]:
+        """(value, tag) of a live entry, so a caller promoting it to another tier can keep the tag."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, tag, expires_at FROM {self._table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[2] < time.time():
+                if row is not None:
+                    self._conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, tag: Optional[str] = None):
+        payload = json.dumps(value, separators=(",", ":"), default=str)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self._table} (key, tag, value, expires_at) VALUES (?, ?, ?, ?)",
+                (key, tag, payload, time.time() + self._ttl),
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+
+    def invalidate_tag(self, tag: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self._table} WHERE tag = ?", (tag,))
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
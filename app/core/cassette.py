@@ -0,0 +1,273 @@
+"""
+Record/replay of calls to external services for deterministic performance runs.
+
+Functions wrapped with `recorded` (the raw LLM SDK requests, the Langfuse
+prompt fetch and PostgREST requests) behave normally while CASSETTE_MODE is
+"off"; everything above them, such as response parsing, also runs on replay.
+In "record" mode every call's result, exception or stream chunks are stored with
+their latency in a gzip-compressed JSON-lines cassette at CASSETTE_PATH. In
+"replay" mode the calls never leave the process: results come from the
+cassette, delayed by the recorded latency times CASSETTE_LATENCY_SCALE (0 for
+none), so a profile shows only the application's own CPU and allocation cost.
+
+A call is matched on a hash of its name and arguments. Calls whose arguments
+contain fresh ids or timestamps (inserts, reads of just-created rows, prompts
+rendered with today's date) cannot match exactly, so they fall back to the next
+recording of the same group (by default the name) in recorded order;
+`stats()` counts both kinds of match.
+"""
+import asyncio
+import atexit
+import functools
+import gzip
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_FLUSH_EVERY = 100
+
+
+class CassetteMiss(LookupError):
+    """Replay mode met a call with no recording to serve."""
+
+
+class ReplayedError(RuntimeError):
+    """A recorded exception whose type is not rebuilt by the wrapped call site."""
+
+    def __init__(self, error: Dict[str, Any]):
+        self.error = error
+        super().__init__(f"{error.get('type')}: {error.get('message')}")
+
+
+def _opaque(value):
+    # Clients, registries and other handles don't identify a call; their type is enough.
+    return f"<{type(value).__name__}>"
+
+
+def call_key(name: str, args=(), kwargs=None) -> str:
+    material = json.dumps([name, list(args), kwargs or {}], sort_keys=True, separators=(",", ":"), default=_opaque)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+class _Track:
+    """Recordings sharing a key or a name, consumed in order and then reused from the start."""
+
+    __slots__ = ("entries", "cursor")
+
+    def __init__(self):
+        self.entries: List[dict] = []
+        self.cursor = 0
+
+    def next(self) -> dict:
+        entry = self.entries[self.cursor % len(self.entries)]
+        self.cursor += 1
+        return entry
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str, latency_scale: float = 1.0):
+        if mode not in ("off", "record", "replay"):
+            raise ValueError(f"unknown cassette mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._pending: List[dict] = []
+        self._by_key: Dict[str, _Track] = {}
+        self._by_name: Dict[str, _Track] = {}
+        self.recorded = 0
+        self.exact = 0
+        self.sequential = 0
+        self.misses = 0
+        if mode == "replay":
+            self.load()
+
+    def load(self):
+        entries = 0
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self._index(json.loads(line))
+                    entries += 1
+        logger.info("cassette: loaded %d recordings from %s", entries, self.path)
+
+    def _index(self, entry: dict):
+        self._by_key.setdefault(entry["h"], _Track()).entries.append(entry)
+        self._by_name.setdefault(entry["g"], _Track()).entries.append(entry)
+
+    def lookup(self, group: str, key: str, fallback: bool = True) -> dict:
+        with self._lock:
+            track = self._by_key.get(key)
+            if track is not None:
+                self.exact += 1
+                return track.next()
+            track = self._by_name.get(group) if fallback else None
+            if track is not None:
+                self.sequential += 1
+                return track.next()
+            self.misses += 1
+        raise CassetteMiss(f"no recording of {group} (key {key}) in {self.path}")
+
+    def record(self, group: str, key: str, latency: float, **fields):
+        entry = {"g": group, "h": key, "t": round(latency, 4), **fields}
+        with self._lock:
+            self._pending.append(entry)
+            self.recorded += 1
+            flush = len(self._pending) >= _FLUSH_EVERY
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """Append recordings not yet on disk; each flush adds one gzip member to the file."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                for entry in pending:
+                    f.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+
+    def delay(self, entry: dict) -> float:
+        return entry.get("t", 0.0) * self.latency_scale
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "recorded": self.recorded,
+            "pending_writes": len(self._pending),
+            "recordings": sum(len(track.entries) for track in self._by_name.values()),
+            "replayed_exact": self.exact,
+            "replayed_sequential": self.sequential,
+            "misses": self.misses,
+        }
+
+
+cassette = Cassette(settings.CASSETTE_PATH, settings.CASSETTE_MODE.lower(), settings.CASSETTE_LATENCY_SCALE)
+
+
+def _error_fields(exc: Exception) -> Dict[str, Any]:
+    try:
+        data = exc.json()  # postgrest.APIError carries the PostgREST error body
+    except Exception:
+        data = None
+    return {"type": type(exc).__name__, "message": str(exc), "data": data if isinstance(data, dict) else None}
+
+
+def _raise(entry: dict, decode_error: Optional[Callable[[dict], Exception]]):
+    error = entry["e"]
+    raise (decode_error(error) if decode_error else None) or ReplayedError(error)
+
+
+def recorded(name: str, key: Optional[Callable[..., str]] = None,
+             fallback: Union[bool, Callable[..., str]] = True,
+             encode: Callable[[Any], Any] = lambda value: value,
+             decode: Callable[[Any], Any] = lambda value: value,
+             decode_error: Optional[Callable[[dict], Optional[Exception]]] = None):
+    """
+    Put a sync, async or async-generator function behind the cassette.
+
+    `key(*args, **kwargs)` identifies a call (default: hash of `name` and the
+    arguments). Unmatched calls replay the next recording of their group:
+    `name`, or `fallback(*args, **kwargs)` when it is callable; `fallback=False`
+    replays exact matches only. `encode`/`decode` convert results to and from
+    JSON values and `decode_error` rebuilds a recorded exception, falling back
+    to `ReplayedError`. The function is returned unchanged while the cassette is off.
+    """
+    if cassette.mode == "off":
+        return lambda fn: fn
+
+    def make_key(args, kwargs):
+        call = key(*args, **kwargs) if key else call_key(name, args, kwargs)
+        group = fallback(*args, **kwargs) if callable(fallback) else name
+        return group, call
+
+    def decorate(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def stream(*args, **kwargs):
+                group, call = make_key(args, kwargs)
+                if cassette.mode == "replay":
+                    entry = cassette.lookup(group, call, bool(fallback))
+                    elapsed = 0.0
+                    for offset, chunk in entry.get("c", []):
+                        await asyncio.sleep(max(0.0, offset * cassette.latency_scale - elapsed))
+                        elapsed = offset * cassette.latency_scale
+                        yield decode(chunk)
+                    if "e" in entry:
+                        _raise(entry, decode_error)
+                    return
+                start, chunks = time.perf_counter(), []
+                try:
+                    async for chunk in fn(*args, **kwargs):
+                        chunks.append([round(time.perf_counter() - start, 4), encode(chunk)])
+                        yield chunk
+                except Exception as exc:
+                    cassette.record(group, call, time.perf_counter() - start, c=chunks, e=_error_fields(exc))
+                    raise
+                cassette.record(group, call, time.perf_counter() - start, c=chunks)
+            return stream
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def call_async(*args, **kwargs):
+                group, call = make_key(args, kwargs)
+                if cassette.mode == "replay":
+                    entry = cassette.lookup(group, call, bool(fallback))
+                    await asyncio.sleep(cassette.delay(entry))
+                    if "e" in entry:
+                        _raise(entry, decode_error)
+                    return decode(entry["r"])
+                start = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as exc:
+                    cassette.record(group, call, time.perf_counter() - start, e=_error_fields(exc))
+                    raise
+                cassette.record(group, call, time.perf_counter() - start, r=encode(result))
+                return result
+            return call_async
+
+        @functools.wraps(fn)
+        def call_sync(*args, **kwargs):
+            group, call = make_key(args, kwargs)
+            if cassette.mode == "replay":
+                entry = cassette.lookup(group, call, bool(fallback))
+                time.sleep(cassette.delay(entry))
+                if "e" in entry:
+                    _raise(entry, decode_error)
+                return decode(entry["r"])
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                cassette.record(group, call, time.perf_counter() - start, e=_error_fields(exc))
+                raise
+            cassette.record(group, call, time.perf_counter() - start, r=encode(result))
+            return result
+        return call_sync
+    return decorate
+
+
+def flush():
+    if cassette.mode == "record":
+        cassette.flush()
+
+
+atexit.register(flush)
+
+
+def stats() -> Dict[str, Any]:
+    return cassette.stats()
@@ -1,7 +1,9 @@
+import json
 import os
-import random
 from typing import List
 from dotenv import load_dotenv
+from app.core.keys import KeyScheduler, parse_keys
+# The one place .env is loaded: everything reading settings imports this module first.
 load_dotenv() 
 
 
@@ -12,28 +14,166 @@ class Settings:
     SUPABASE_ANON_KEY: str = os.getenv("SUPABASE_ANON_KEY", "")
     SUPABASE_SERVICE_ROLE_KEY: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
 
-    OPENAI_API_KEYS: List[str] = os.getenv("OPENAI_API_KEYS", "").split(",")
+    # Async PostgREST client pool (app.services.supabase_async).
+    SUPABASE_POOL_MAX_CONNECTIONS: int = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20"))
+    SUPABASE_POOL_MAX_KEEPALIVE: int = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "10"))
+    SUPABASE_POOL_KEEPALIVE_EXPIRY: float = float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", "30"))
+    SUPABASE_POOL_TIMEOUT: float = float(os.getenv("SUPABASE_POOL_TIMEOUT", "5"))
+    SUPABASE_CONNECT_TIMEOUT: float = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+    SUPABASE_HTTP_TIMEOUT: float = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "15"))
+    SUPABASE_MAX_RETRIES: int = int(os.getenv("SUPABASE_MAX_RETRIES", "2"))
+    SUPABASE_RETRY_BACKOFF_SECONDS: float = float(os.getenv("SUPABASE_RETRY_BACKOFF_SECONDS", "0.2"))
+
+    # Read-through cache of group/user rows (app.services.entity_cache).
+    ENTITY_CACHE_ENABLED: bool = os.getenv("ENTITY_CACHE_ENABLED", "True").lower() == "true"
+    ENTITY_CACHE_TTL_SECONDS: float = float(os.getenv("ENTITY_CACHE_TTL_SECONDS", "60"))
+    ENTITY_CACHE_MAX_ENTRIES: int = int(os.getenv("ENTITY_CACHE_MAX_ENTRIES", "5000"))
+    # Fraction of cache hits re-read from the database to measure staleness.
+    ENTITY_CACHE_VERIFY_RATE: float = float(os.getenv("ENTITY_CACHE_VERIFY_RATE", "0"))
+
+    OPENAI_API_KEYS: List[str] = parse_keys(os.getenv("OPENAI_API_KEYS", ""))
     OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
 
-    NVIDIA_API_KEYS: List[str] = os.getenv("NVIDIA_API_KEYS", "").split(",")
+    NVIDIA_API_KEYS: List[str] = parse_keys(os.getenv("NVIDIA_API_KEYS", ""))
     NVIDIA_BASE_URL: str = os.getenv("NVIDIA_BASE_URL", "https://integrate.api.nvidia.com/v1")
 
-    GOOGLE_API_KEYS: List[str] = os.getenv("GOOGLE_API_KEYS", "").split(",")
+    GOOGLE_API_KEYS: List[str] = parse_keys(os.getenv("GOOGLE_API_KEYS", ""))
+    GOOGLE_BASE_URL: str = os.getenv("GOOGLE_BASE_URL", "")  # Empty uses the SDK default endpoint
+
+    # Per-key rate limits; 0 disables the limit.
+    OPENAI_KEY_RPM: int = int(os.getenv("OPENAI_KEY_RPM", "0"))
+    OPENAI_KEY_TPM: int = int(os.getenv("OPENAI_KEY_TPM", "0"))
+    NVIDIA_KEY_RPM: int = int(os.getenv("NVIDIA_KEY_RPM", "0"))
+    NVIDIA_KEY_TPM: int = int(os.getenv("NVIDIA_KEY_TPM", "0"))
+    GOOGLE_KEY_RPM: int = int(os.getenv("GOOGLE_KEY_RPM", "0"))
+    GOOGLE_KEY_TPM: int = int(os.getenv("GOOGLE_KEY_TPM", "0"))
+    KEY_COOLDOWN_SECONDS: float = float(os.getenv("KEY_COOLDOWN_SECONDS", "30"))
+    KEY_MAX_WAIT_SECONDS: float = float(os.getenv("KEY_MAX_WAIT_SECONDS", "30"))
+
+    LLM_SINGLE_FLIGHT_ENABLED: bool = os.getenv("LLM_SINGLE_FLIGHT_ENABLED", "True").lower() == "true"
+
+    # Latency-based routing across equivalent backends (app.core.routing). LLM_ROUTES maps a
+    # prompt label to "provider:model" backends, e.g. {"spot_finder": ["google:gemini-2.5-flash",
+    # "openai:gpt-4o-mini"]}; unlisted labels keep the provider and model their service uses.
+    LLM_ROUTES: dict = json.loads(os.getenv("LLM_ROUTES", "{}") or "{}")
+    LLM_ROUTING_WINDOW: int = int(os.getenv("LLM_ROUTING_WINDOW", "200"))
+    LLM_ROUTING_MIN_SAMPLES: int = int(os.getenv("LLM_ROUTING_MIN_SAMPLES", "20"))
+    LLM_ROUTING_MAX_ERROR_RATE: float = float(os.getenv("LLM_ROUTING_MAX_ERROR_RATE", "0.5"))
+    LLM_ROUTING_EXPLORE_RATE: float = float(os.getenv("LLM_ROUTING_EXPLORE_RATE", "0.05"))
+    # Hedging: after the first backend's p95 latency, send a duplicate to the next backend.
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "False").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+    LLM_HEDGE_MAX_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_MAX_DELAY_SECONDS", "30"))
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "10"))
+
+    # Circuit breakers per provider and per API key (app.core.resilience): open after this many
+    # consecutive timeouts / connection errors / 5xx answers, probe again after LLM_BREAKER_OPEN_SECONDS.
+    LLM_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+    LLM_BREAKER_OPEN_SECONDS: float = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+    LLM_BREAKER_HALF_OPEN_CALLS: int = int(os.getenv("LLM_BREAKER_HALF_OPEN_CALLS", "1"))
+    # Adaptive per-call timeout: the backend's observed latency percentile times the multiplier,
+    # clamped to [LLM_TIMEOUT_MIN_SECONDS, LLM_HTTP_TIMEOUT]; LLM_HTTP_TIMEOUT until measured.
+    LLM_TIMEOUT_ADAPTIVE: bool = os.getenv("LLM_TIMEOUT_ADAPTIVE", "True").lower() == "true"
+    LLM_TIMEOUT_PERCENTILE: float = float(os.getenv("LLM_TIMEOUT_PERCENTILE", "0.99"))
+    LLM_TIMEOUT_MULTIPLIER: float = float(os.getenv("LLM_TIMEOUT_MULTIPLIER", "3"))
+    LLM_TIMEOUT_MIN_SECONDS: float = float(os.getenv("LLM_TIMEOUT_MIN_SECONDS", "10"))
+    # Retries of timeouts, 5xx and 429 with full-jitter backoff, capped per provider at
+    # LLM_RETRY_BUDGET_RATIO of recent calls plus LLM_RETRY_BUDGET_MIN_RETRIES per window.
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BASE_SECONDS: float = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+    LLM_RETRY_MAX_SECONDS: float = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+    LLM_RETRY_BUDGET_RATIO: float = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2"))
+    LLM_RETRY_BUDGET_MIN_RETRIES: int = int(os.getenv("LLM_RETRY_BUDGET_MIN_RETRIES", "3"))
+    LLM_RETRY_BUDGET_WINDOW_SECONDS: float = float(os.getenv("LLM_RETRY_BUDGET_WINDOW_SECONDS", "10"))
+
+    LLM_POOL_MAX_CONNECTIONS: int = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100"))
+    LLM_POOL_MAX_KEEPALIVE: int = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+    LLM_POOL_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "30"))
+    LLM_HTTP_TIMEOUT: float = float(os.getenv("LLM_HTTP_TIMEOUT", "120"))
+
+    RECOMMENDATION_BRANCH_TIMEOUT_SECONDS: float = float(os.getenv("RECOMMENDATION_BRANCH_TIMEOUT_SECONDS", "90"))
+
+    REC_CACHE_TTL_SECONDS: float = float(os.getenv("REC_CACHE_TTL_SECONDS", "21600"))
+    REC_CACHE_MAX_ENTRIES: int = int(os.getenv("REC_CACHE_MAX_ENTRIES", "512"))
+    REC_CACHE_SQLITE_PATH: str = os.getenv("REC_CACHE_SQLITE_PATH", "")
+
+    KN_MEMO_TTL_SECONDS: float = float(os.getenv("KN_MEMO_TTL_SECONDS", "86400"))
+    KN_MEMO_MAX_ENTRIES: int = int(os.getenv("KN_MEMO_MAX_ENTRIES", "1024"))
+
+    # Incremental graph updates need the KN_incremental_update prompt in Langfuse.
+    KN_INCREMENTAL_ENABLED: bool = os.getenv("KN_INCREMENTAL_ENABLED", "False").lower() == "true"
+    KN_FULL_REFRESH_EVERY: int = int(os.getenv("KN_FULL_REFRESH_EVERY", "5"))
+
+    KN_REFRESH_DEBOUNCE_SECONDS: float = float(os.getenv("KN_REFRESH_DEBOUNCE_SECONDS", "2"))
+
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_QUEUE_MAX_PENDING: int = int(os.getenv("JOB_QUEUE_MAX_PENDING", "1000"))
+    # "memory" or "supabase"; the latter needs the `jobs` table, which is not part of the base schema.
+    JOB_STORE: str = os.getenv("JOB_STORE", "memory")
+
+    # Event-loop lag monitor and blocking-call detector (app.core.loop_monitor).
+    LOOP_MONITOR_ENABLED: bool = os.getenv("LOOP_MONITOR_ENABLED", "True").lower() == "true"
+    LOOP_MONITOR_INTERVAL_SECONDS: float = float(os.getenv("LOOP_MONITOR_INTERVAL_SECONDS", "0.05"))
+    LOOP_BLOCK_THRESHOLD_SECONDS: float = float(os.getenv("LOOP_BLOCK_THRESHOLD_SECONDS", "0.1"))
+    LOOP_MONITOR_MAX_EVENTS: int = int(os.getenv("LOOP_MONITOR_MAX_EVENTS", "50"))
+
+    # Record/replay of LLM, prompt-store and PostgREST calls (app.core.cassette).
+    CASSETTE_MODE: str = os.getenv("CASSETTE_MODE", "off")  # "off", "record" or "replay"
+    CASSETTE_PATH: str = os.getenv("CASSETTE_PATH", "cassettes/session.jsonl.gz")
+    # Replay delay as a multiple of the recorded latency; 0 answers immediately.
+    CASSETTE_LATENCY_SCALE: float = float(os.getenv("CASSETTE_LATENCY_SCALE", "1"))
+
+    # Startup: SDKs, the Langfuse client and provider clients are created on first use. The lifespan
+    # creates them (and fetches STARTUP_WARMUP_PROMPTS) in a worker thread while the app already
+    # serves ("background"), before it reports ready ("blocking"), or not at all ("off"), in which
+    # case the first request to each provider imports its SDK on the event loop.
+    STARTUP_WARMUP: str = os.getenv("STARTUP_WARMUP", "background").lower()
+    STARTUP_WARMUP_PROMPTS: List[str] = parse_keys(os.getenv(
+        "STARTUP_WARMUP_PROMPTS", "user_intrest,KN_generator,KN_Summerise,spot_finder,Serach_retrival,base_level_planner"
+    ))
 
     LANGFUSE_PUBLIC_KEY: str = os.getenv("LANGFUSE_PUBLIC_KEY", "")
     LANGFUSE_SECRET_KEY: str = os.getenv("LANGFUSE_SECRET_KEY", "")
     LANGFUSE_BASE_URL: str = os.getenv("LANGFUSE_BASE_URL", "https://cloud.langfuse.com")
 
+    # Compact JSON for dicts/lists rendered into prompts (app.core.prompt_payload). PROMPT_PAYLOAD_FIELDS
+    # optionally keeps only some fields per label and variable, e.g. {"base_level_planner":
+    # {"CITY_ACTIVITY_RESULTS": ["short_trip_destinations.destination_name", "short_trip_destinations.key_highlights"]}}.
+    PROMPT_PAYLOAD_COMPACT: bool = os.getenv("PROMPT_PAYLOAD_COMPACT", "True").lower() == "true"
+    PROMPT_PAYLOAD_DROP_EMPTY: bool = os.getenv("PROMPT_PAYLOAD_DROP_EMPTY", "True").lower() == "true"
+    PROMPT_PAYLOAD_FIELDS: dict = json.loads(os.getenv("PROMPT_PAYLOAD_FIELDS", "{}") or "{}")
+
+    PROMPT_CACHE_TTL_SECONDS: float = float(os.getenv("PROMPT_CACHE_TTL_SECONDS", "300"))
+    PROMPT_FETCH_TIMEOUT_SECONDS: int = int(os.getenv("PROMPT_FETCH_TIMEOUT_SECONDS", "5"))
+
+    def __init__(self):
+        self.openai_keys = self._scheduler("openai", self.OPENAI_API_KEYS, self.OPENAI_KEY_RPM, self.OPENAI_KEY_TPM)
+        self.nvidia_keys = self._scheduler("nvidia", self.NVIDIA_API_KEYS, self.NVIDIA_KEY_RPM, self.NVIDIA_KEY_TPM)
+        self.google_keys = self._scheduler("google", self.GOOGLE_API_KEYS, self.GOOGLE_KEY_RPM, self.GOOGLE_KEY_TPM)
+
+    def _scheduler(self, provider: str, keys: List[str], rpm: int, tpm: int) -> KeyScheduler:
+        return KeyScheduler(
+            provider,
+            keys,
+            rpm=rpm,
+            tpm=tpm,
+            cooldown_seconds=self.KEY_COOLDOWN_SECONDS,
+            max_wait_seconds=self.KEY_MAX_WAIT_SECONDS,
+            breaker_threshold=self.LLM_BREAKER_FAILURE_THRESHOLD,
+            breaker_open_seconds=self.LLM_BREAKER_OPEN_SECONDS,
+        )
+
     @property
     def openai_api_key(self) -> str:
-        return random.choice(self.OPENAI_API_KEYS) if self.OPENAI_API_KEYS else ""
+        return self.openai_keys.pick()
 
     @property
     def nvidia_api_key(self) -> str:
-        return random.choice(self.NVIDIA_API_KEYS) if self.NVIDIA_API_KEYS else ""
+        return self.nvidia_keys.pick()
 
     @property
     def google_api_key(self) -> str:
-        return random.choice(self.GOOGLE_API_KEYS) if self.GOOGLE_API_KEYS else ""
+        return self.google_keys.pick()
 
 settings = Settings()
@@ -0,0 +1,363 @@
+import json
+import logging
+import re
+from typing import Any, List, Optional
+
+from app.core import metrics
+
+_OPENERS = {"{": "}", "[": "]"}
+_CLOSERS = "}]"
+_DELIMITERS = set(",:{}[]\"'") | set(" \t\r\n")
+_LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_JSON_ESCAPES = set('"\\/bfnrtu')
+# Numbers JSON rejects but models write: 1. / .5 / 007 / +3
+_LOOSE_NUMBER = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_PARTIAL_UNICODE_ESCAPE = re.compile(r"\\u[0-9a-fA-F]{0,3}$")
+# Extra start positions `loads` tries when the first bracket turns out to be prose.
+_MAX_ATTEMPTS = 4
+
+logger = logging.getLogger(__name__)
+
+_decoder = json.JSONDecoder()
+_REPAIRS = metrics.registry.counter("llm_json_repairs_total", "Defects repaired in model JSON output", ("repair",))
+
+
+class JSONExtractError(ValueError):
+    """Raised when no JSON value can be recovered from model output."""
+
+
+class _Frame:
+    __slots__ = ("kind", "expect_key", "complete")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.expect_key = kind == "{"
+        # A member value has ended and no "," followed yet.
+        self.complete = False
+
+
+class JSONExtractor:
+    """
+    Incremental, tolerant extractor of the first JSON object or array in LLM output.
+
+    Text before the first `{` / `[` (prose, code fences) is skipped and scanning
+    stops when that value is balanced, so trailing text is ignored. While
+    scanning, common defects are repaired: trailing commas, single-quoted
+    strings, unquoted keys, Python literals (True/False/None) and raw newlines
+    or tabs inside strings. `result()` also closes output that was cut off
+    mid-value, dropping the incomplete member.
+
+    `feed` returns the normalized JSON text committed by that chunk. Committed
+    text is append-only, so it can be piped into `JSONStreamScanner`. Every
+    input character is handled once; there is no regex backtracking.
+    """
+
+    def __init__(self):
+        self._out: List[str] = []
+        self._stack: List[_Frame] = []
+        self._started = False
+        self.done = False
+        self._quote: Optional[str] = None
+        self._escaped = False
+        self._string_is_key = False
+        # Whitespace seen after a possible closing quote, or None when not deciding.
+        self._after_quote: Optional[List[str]] = None
+        self._word: List[str] = []
+        self._pending_comma = False
+        self._safe_len = 0
+        self._committed = 0
+        self.consumed = 0
+        self.start_offset: Optional[int] = None
+        self.repairs: List[str] = []
+        self._has_content = False
+
+    @property
+    def text(self) -> str:
+        """Normalized JSON text committed so far."""
+        return "".join(self._out)
+
+    def _repair(self, kind: str):
+        if kind not in self.repairs:
+            self.repairs.append(kind)
+
+    def feed(self, chunk: str) -> str:
+        for ch in chunk:
+            if self.done:
+                break
+            self.consumed += 1
+            if not self._started:
+                if ch in _OPENERS:
+                    self._started = True
+                    self.start_offset = self.consumed - 1
+                    self._open(ch)
+                continue
+            if not self._has_content and ch not in " \t\r\n":
+                self._has_content = len(self._stack) > 1 or ch not in _CLOSERS
+            if self._after_quote is not None:
+                self._decide_quote(ch)
+            elif self._quote is not None:
+                self._string_char(ch)
+            else:
+                self._structural_char(ch)
+        delta = "".join(self._out[self._committed:])
+        self._committed = len(self._out)
+        return delta
+
+    # -- structure ---------------------------------------------------------------
+
+    def _mark_safe(self):
+        self._safe_len = len(self._out)
+
+    def _emit_pending_comma(self):
+        if self._pending_comma:
+            self._out.append(",")
+            self._pending_comma = False
+
+    def _open(self, ch: str):
+        self._emit_pending_comma()
+        self._out.append(ch)
+        self._stack.append(_Frame(ch))
+        self._mark_safe()
+
+    def _close(self, ch: str):
+        if self._pending_comma:
+            self._pending_comma = False
+            self._repair("trailing_comma")
+        frame = self._stack.pop()
+        expected = _OPENERS[frame.kind]
+        if ch != expected:
+            self._repair("mismatched_closer")
+        self._out.append(expected)
+        self._mark_safe()
+        if not self._stack:
+            self.done = True
+        else:
+            self._stack[-1].complete = True
+
+    def _begin_member(self, frame: _Frame):
+        """A new key or value starts; after a complete member it needs a comma, e.g. {"a": 1 "b": 2}."""
+        if frame.complete and not self._pending_comma:
+            self._repair("missing_comma")
+            self._pending_comma = True
+            if frame.kind == "{":
+                frame.expect_key = True
+        frame.complete = False
+
+    def _structural_char(self, ch: str):
+        if self._word and ch in _DELIMITERS:
+            self._flush_word()
+        frame = self._stack[-1]
+        if ch in "\"'":
+            self._begin_member(frame)
+            self._emit_pending_comma()
+            if ch == "'":
+                self._repair("single_quotes")
+            self._quote = ch
+            self._string_is_key = frame.kind == "{" and frame.expect_key
+            self._out.append('"')
+        elif ch in _OPENERS:
+            self._begin_member(frame)
+            self._open(ch)
+        elif ch in _CLOSERS:
+            self._close(ch)
+        elif ch == ",":
+            self._pending_comma = True
+            frame.complete = False
+            if frame.kind == "{":
+                frame.expect_key = True
+        elif ch == ":":
+            self._out.append(":")
+            frame.expect_key = False
+        elif ch in " \t\r\n":
+            pass
+        else:
+            if not self._word:
+                self._begin_member(frame)
+            self._word.append(ch)
+
+    @staticmethod
+    def _scalar(word: str):
+        """Normalized JSON for a bare literal or number, with the repair applied, or None."""
+        if word in _LITERALS:
+            return _LITERALS[word], (None if _LITERALS[word] == word else "python_literal")
+        try:
+            json.loads(word)
+        except ValueError:
+            if not _LOOSE_NUMBER.fullmatch(word):
+                return None
+            number = float(word) if any(c in word for c in ".eE") else int(word)
+            return json.dumps(number), "number_format"
+        return word, None
+
+    def _flush_word(self):
+        word = "".join(self._word)
+        self._word = []
+        frame = self._stack[-1]
+        self._emit_pending_comma()
+        if frame.kind == "{" and frame.expect_key:
+            # Unquoted key, e.g. {name: "x"}
+            self._repair("unquoted_key")
+            self._out.append(json.dumps(word))
+            return
+        scalar = self._scalar(word)
+        if scalar is None:
+            self._repair("bare_string")
+            self._out.append(json.dumps(word))
+        else:
+            text, repair = scalar
+            if repair:
+                self._repair(repair)
+            self._out.append(text)
+        frame.complete = True
+        self._mark_safe()
+
+    # -- strings -----------------------------------------------------------------
+
+    def _string_char(self, ch: str):
+        if self._escaped:
+            self._escaped = False
+            if ch == "'":
+                self._out.append("'")
+            elif ch in _JSON_ESCAPES:
+                self._out.append("\\" + ch)
+            else:
+                # Invalid escape such as "\d": keep the backslash literally.
+                self._repair("invalid_escape")
+                self._out.append("\\\\" + ch)
+        elif ch == "\\":
+            self._escaped = True
+        elif ch == self._quote:
+            # Only a closing quote if the next token fits; models sometimes
+            # leave inner quotes unescaped, e.g. "he said "hi"".
+            self._after_quote = []
+        elif ch == '"':
+            self._out.append('\\"')
+        elif ch in _CONTROL_ESCAPES:
+            self._repair("control_character")
+            self._out.append(_CONTROL_ESCAPES[ch])
+        else:
+            self._out.append(ch)
+
+    def _decide_quote(self, ch: str):
+        if ch in " \t\r\n":
+            self._after_quote.append(ch)
+            return
+        if ch in (":" if self._string_is_key else ",}]"):
+            self._after_quote = None
+            self._close_string()
+            self._structural_char(ch)
+            return
+        if not self._string_is_key and ch in ('"', self._quote):
+            # A value string followed by another string: the comma between them is missing.
+            self._after_quote = None
+            self._close_string()
+            self._structural_char(ch)
+            return
+        self._repair("unescaped_quote")
+        whitespace, self._after_quote = self._after_quote, None
+        self._out.append('\\"' if self._quote == '"' else "'")
+        for space in whitespace:
+            self._string_char(space)
+        self._string_char(ch)
+
+    def _close_string(self):
+        self._quote = None
+        self._out.append('"')
+        if not self._string_is_key:
+            self._stack[-1].complete = True
+            self._mark_safe()
+
+    # -- results -----------------------------------------------------------------
+
+    def closed_text(self) -> str:
+        """The committed text, closed as if the input ended here."""
+        if self.done:
+            return self.text
+        if not self._started:
+            raise JSONExtractError("no JSON object or array found")
+        # Stack depth only changes at safe points, so the open containers at the
+        # last safe point are exactly the ones still open now.
+        closers = "".join(_OPENERS[frame.kind] for frame in reversed(self._stack))
+        if self._after_quote is not None and not self._string_is_key:
+            # Input ended right after a value string's closing quote.
+            return self.text + '"' + closers
+        if self._quote is not None and not self._string_is_key:
+            # Input ended inside a value string: keep what was written, e.g. {"a": "abc
+            return _PARTIAL_UNICODE_ESCAPE.sub("", self.text) + '"' + closers
+        frame = self._stack[-1]
+        scalar = self._scalar("".join(self._word)) if self._word and not frame.expect_key else None
+        if scalar is not None:
+            # A number or literal cut off at the very end is kept, e.g. {"n": 12
+            comma = "," if self._pending_comma else ""
+            return self.text + comma + scalar[0] + closers
+        return "".join(self._out[:self._safe_len]) + closers
+
+    def result(self) -> Any:
+        text = self.closed_text()
+        if not self.done:
+            self._repair("truncated")
+        try:
+            value = json.loads(text)
+        except ValueError as exc:
+            raise JSONExtractError(f"could not repair JSON: {exc}") from exc
+        if not value and self._has_content:
+            # Never turn a container that had content into an empty one.
+            raise JSONExtractError("no complete member could be recovered")
+        if self.repairs:
+            logger.info("json_extract: repaired model output: %s", ", ".join(self.repairs))
+            for repair in self.repairs:
+                _REPAIRS.labels(repair).inc()
+        return value
+
+
+def _ends_payload(text: str, end: int) -> bool:
+    """Whether only whitespace or a closing code fence follows position `end`."""
+    return not text[end:].strip().strip("`").strip()
+
+
+def loads(text: Optional[str]) -> Any:
+    """
+    Parse the first JSON object or array in `text`, repairing common LLM defects.
+
+    If the first bracket turns out to be prose (e.g. "Note [1]: ..."), scanning
+    restarts after it, a bounded number of times. An array followed by more
+    text is only returned when no object can be recovered from that text.
+    """
+    if not text:
+        raise JSONExtractError("empty model output")
+    # Fast path: well-formed output (possibly fenced or after prose) is decoded
+    # by the C scanner when the value runs to the end of the payload.
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start >= 0:
+        try:
+            value, end = _decoder.raw_decode(text, start)
+            if _ends_payload(text, end):
+                return value
+        except ValueError:
+            pass
+    offset = 0
+    error: Optional[JSONExtractError] = None
+    array = None
+    for _ in range(_MAX_ATTEMPTS):
+        extractor = JSONExtractor()
+        extractor.feed(text[offset:] if offset else text)
+        if extractor.start_offset is None:
+            break
+        try:
+            value = extractor.result()
+        except JSONExtractError as exc:
+            error = error or exc
+            offset += extractor.start_offset + 1
+            continue
+        offset += extractor.consumed
+        if array is None:
+            if isinstance(value, dict) or _ends_payload(text, offset):
+                return value
+            # e.g. "[1] {...}": keep looking for an object after the array.
+            array = value
+        elif isinstance(value, dict) and value:
+            return value
+    if array is not None:
+        return array
+    raise error or JSONExtractError("no JSON object or array found")
@@ -0,0 +1,167 @@
+import json
+from collections import deque
+from typing import Any, Iterable, List, Optional, Sequence, Tuple, Union
+
+PathPattern = Sequence[Union[str, int]]
+Path = Tuple[Union[str, int], ...]
+
+WILDCARD = "*"
+
+
+def _matches(path: Path, pattern: PathPattern) -> bool:
+    if len(path) != len(pattern):
+        return False
+    return all(p == WILDCARD or p == part for part, p in zip(path, pattern))
+
+
+class _Frame:
+    __slots__ = ("kind", "path", "key", "index", "value_start", "emitted", "expect_key")
+
+    def __init__(self, kind: str, path: Path):
+        self.kind = kind
+        self.path = path
+        self.key: Optional[str] = None
+        self.index = -1
+        self.value_start: Optional[int] = None
+        self.emitted = False
+        self.expect_key = kind == "{"
+
+    def child_path(self) -> Path:
+        return self.path + ((self.key,) if self.kind == "{" else (self.index,))
+
+
+class JSONStreamScanner:
+    """
+    Incremental scanner that reports values nested in a streamed JSON document as
+    soon as they are complete.
+
+    Feed text chunks as they arrive; `feed` returns `(path, value)` for every
+    value whose path matches one of `patterns` (e.g. `("plan_options", "*")`,
+    where "*" matches any key or array index) and was closed by this chunk.
+    Prose or code fences before the document are skipped. Each character is
+    looked at once, and only the chunks still needed for a value that may be
+    reported (or a key being read) are kept, so scanning is linear in the
+    response size and memory is bounded by the largest reported value.
+    """
+
+    def __init__(self, patterns: Iterable[PathPattern]):
+        self._patterns = [tuple(p) for p in patterns]
+        # Retained chunks as (absolute offset, text); positions below are absolute.
+        self._chunks = deque()
+        self._end = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._started = False
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[Path, Any]]:
+        events = []
+        if not chunk or self.done:
+            return events
+        base = self._end
+        self._chunks.append((base, chunk))
+        self._end += len(chunk)
+        for offset, ch in enumerate(chunk):
+            self._step(ch, base + offset, events)
+            if self.done:
+                break
+        self._trim()
+        return events
+
+    def _wanted(self, path: Path) -> bool:
+        return any(_matches(path, p) for p in self._patterns)
+
+    def _slice(self, start: int, end: int) -> str:
+        parts = []
+        for offset, chunk in self._chunks:
+            if offset >= end:
+                break
+            if offset + len(chunk) > start:
+                parts.append(chunk[max(0, start - offset):end - offset])
+        return "".join(parts)
+
+    def _trim(self):
+        """Drop chunks that end before every position a later report or key still needs."""
+        keep = self._end
+        if self._in_string:
+            keep = self._string_start
+        for frame in self._stack:
+            if frame.value_start is not None and not frame.emitted and self._wanted(frame.child_path()):
+                keep = min(keep, frame.value_start)
+        while self._chunks and self._chunks[0][0] + len(self._chunks[0][1]) <= keep:
+            self._chunks.popleft()
+
+    def _emit(self, path: Path, start: int, end: int, events: list):
+        if self._wanted(path):
+            try:
+                events.append((path, json.loads(self._slice(start, end))))
+            except json.JSONDecodeError:
+                pass
+
+    def _begin_value(self, pos: int):
+        frame = self._stack[-1]
+        if frame.value_start is None:
+            frame.value_start = pos
+            frame.emitted = False
+            if frame.kind == "[":
+                frame.index += 1
+
+    def _end_value(self, frame: _Frame, end: int, events: list):
+        """Report a scalar that ends at "," or at its container's closer."""
+        if frame.value_start is not None and not frame.emitted:
+            self._emit(frame.child_path(), frame.value_start, end, events)
+        frame.value_start = None
+
+    def _step(self, ch: str, pos: int, events: list):
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif ch == "\\":
+                self._escaped = True
+            elif ch == '"':
+                self._in_string = False
+                frame = self._stack[-1]
+                if frame.kind == "{" and frame.expect_key:
+                    raw = self._slice(self._string_start, pos + 1)
+                    try:
+                        frame.key = json.loads(raw)
+                    except json.JSONDecodeError:
+                        frame.key = raw[1:-1]
+                    frame.expect_key = False
+            return
+
+        if not self._started:
+            if ch in "{[":
+                self._started = True
+                self._stack.append(_Frame(ch, ()))
+            return
+
+        frame = self._stack[-1]
+        if ch == '"':
+            self._in_string = True
+            self._string_start = pos
+            if not (frame.kind == "{" and frame.expect_key):
+                self._begin_value(pos)
+        elif ch in "{[":
+            self._begin_value(pos)
+            self._stack.append(_Frame(ch, frame.child_path()))
+        elif ch in "}]":
+            closed = self._stack.pop()
+            self._end_value(closed, pos, events)
+            if not self._stack:
+                self.done = True
+                return
+            # A closed container is reported right away rather than at the next ",".
+            parent = self._stack[-1]
+            self._emit(parent.child_path(), parent.value_start, pos + 1, events)
+            parent.emitted = True
+        elif ch == ",":
+            self._end_value(frame, pos, events)
+            if frame.kind == "{":
+                frame.expect_key = True
+        elif ch == ":" or ch.isspace():
+            pass
+        else:
+            self._begin_value(pos)
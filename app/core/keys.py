@@ -0,0 +1,302 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional
+
+from app.core import metrics
+from app.core.resilience import CLOSED, CircuitBreaker, CircuitOpenError, is_upstream_failure, status_code
+
+logger = logging.getLogger(__name__)
+
+_TOKENS = metrics.registry.counter(
+    "llm_key_tokens_total", "Tokens charged per provider API key (actual usage when reported)", ("provider", "key")
+)
+_RATE_LIMITED = metrics.registry.counter(
+    "llm_rate_limited_total", "HTTP 429 responses per provider API key", ("provider", "key")
+)
+
+
+class KeysExhaustedError(RuntimeError):
+    """Raised when no API key of a provider can serve a request in time."""
+
+
+def parse_keys(raw: str) -> List[str]:
+    """Split a comma-separated key list, dropping blanks and duplicates."""
+    keys = []
+    for key in raw.split(","):
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def mask_key(key: str) -> str:
+    if len(key) <= 8:
+        return "*" * len(key)
+    return f"{key[:4]}…{key[-4:]}"
+
+
+class TokenBucket:
+    """Continuously refilling bucket; `capacity` units per minute, 0 means unlimited."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.capacity:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        # A single request larger than the bucket only has to wait for a full bucket.
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float, now: float):
+        if self.capacity:
+            self._refill(now)
+            self.tokens -= amount
+
+
+class _KeyState:
+    def __init__(self, key: str, rpm: int, tpm: int, breaker: CircuitBreaker):
+        self.key = key
+        self.breaker = breaker
+        self.requests_bucket = TokenBucket(rpm)
+        self.tokens_bucket = TokenBucket(tpm)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.disabled_reason: Optional[str] = None
+        self.last_acquired = 0.0
+        self.requests = 0
+        self.tokens = 0
+        self.throttled = 0
+        self.throttle_wait_seconds = 0.0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        return max(
+            self.cooldown_until - now,
+            self.requests_bucket.wait_time(1, now),
+            self.tokens_bucket.wait_time(tokens, now),
+            0.0,
+        )
+
+
+class KeyLease:
+    def __init__(self, scheduler: "KeyScheduler", state: _KeyState, tokens: int, delay: float):
+        self._scheduler = scheduler
+        self._state = state
+        self.key = state.key
+        self.tokens = tokens
+        self.delay = delay
+        self.used_tokens: Optional[int] = None
+
+    def record_usage(self, total_tokens: Optional[int]):
+        """Report actual token usage so the TPM bucket is charged precisely."""
+        if total_tokens:
+            self.used_tokens = int(total_tokens)
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    # Google returns the delay as a RetryInfo detail, e.g. {"retryDelay": "17s"}.
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"](\d+(?:\.\d+)?)s", str(getattr(exc, "details", "") or exc))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def _is_invalid_key(exc: BaseException, status: Optional[int]) -> bool:
+    if status in (401, 403):
+        return True
+    return status == 400 and "api key not valid" in str(exc).lower()
+
+
+class KeyScheduler:
+    """
+    Picks the API key for each call of one provider.
+
+    Every key has request and token buckets (RPM/TPM), is put on cooldown after a
+    429 for as long as the provider's retry-after asks, and is dropped for the
+    lifetime of the process once the provider rejects it as invalid. A circuit
+    breaker per key takes a key out of rotation after `breaker_threshold`
+    consecutive timeouts, connection errors or 5xx answers, and lets a probe
+    through after `breaker_open_seconds`. Among usable keys the one that can start
+    soonest with the fewest in-flight calls wins.
+    """
+
+    def __init__(self, provider: str, keys: List[str], rpm: int = 0, tpm: int = 0,
+                 cooldown_seconds: float = 30.0, max_wait_seconds: float = 30.0,
+                 breaker_threshold: int = 5, breaker_open_seconds: float = 30.0):
+        self.provider = provider
+        self._states = [
+            _KeyState(key, rpm, tpm, CircuitBreaker(f"{provider}:{mask_key(key)}", breaker_threshold,
+                                                    breaker_open_seconds))
+            for key in keys
+        ]
+        self._cooldown = cooldown_seconds
+        self._max_wait = max_wait_seconds
+        self._lock = threading.Lock()
+
+    @property
+    def keys(self) -> List[str]:
+        return [s.key for s in self._states if s.disabled_reason is None]
+
+    def _state(self, key: str) -> Optional[_KeyState]:
+        for state in self._states:
+            if state.key == key:
+                return state
+        return None
+
+    def pick(self) -> str:
+        """Best key right now, without reserving capacity."""
+        now = time.monotonic()
+        with self._lock:
+            usable = [s for s in self._states if s.disabled_reason is None]
+            if not usable:
+                return ""
+            usable = [s for s in usable if s.breaker.state == CLOSED] or usable
+            return min(usable, key=lambda s: (s.wait_time(0, now), s.in_flight, s.last_acquired)).key
+
+    def acquire(self, tokens: int = 0) -> KeyLease:
+        now = time.monotonic()
+        with self._lock:
+            usable = [s for s in self._states if s.disabled_reason is None]
+            if not usable:
+                raise KeysExhaustedError(f"No usable {self.provider} API keys configured")
+            state = self._pick_admitted(usable, tokens, now)
+            delay = state.wait_time(tokens, now)
+            if delay > self._max_wait:
+                state.breaker.release_probe()
+                raise KeysExhaustedError(
+                    f"All {self.provider} API keys are throttled for at least {delay:.1f}s"
+                )
+            state.requests_bucket.take(1, now)
+            state.tokens_bucket.take(tokens, now)
+            state.in_flight += 1
+            state.requests += 1
+            state.last_acquired = now
+            if delay:
+                state.throttled += 1
+                state.throttle_wait_seconds += delay
+        return KeyLease(self, state, tokens, delay)
+
+    def _pick_admitted(self, usable: List[_KeyState], tokens: int, now: float) -> _KeyState:
+        # Keys with a closed breaker first; a half-open one only while it has a probe slot.
+        closed = [s for s in usable if s.breaker.state == CLOSED]
+        for state in sorted(closed or usable, key=lambda s: (s.wait_time(tokens, now), s.in_flight, s.last_acquired)):
+            if state.breaker.allow():
+                return state
+        raise CircuitOpenError(f"Circuit breakers of all {self.provider} API keys are open")
+
+    def release(self, lease: KeyLease, error: Optional[BaseException] = None):
+        now = time.monotonic()
+        state = lease._state
+        with self._lock:
+            state.in_flight -= 1
+            if lease.used_tokens is not None:
+                state.tokens_bucket.take(lease.used_tokens - lease.tokens, now)
+                charged = lease.used_tokens
+            else:
+                charged = lease.tokens
+            state.tokens += charged
+            if error is not None:
+                state.errors += 1
+        _TOKENS.labels(self.provider, mask_key(lease.key)).inc(charged)
+        if error is None:
+            state.breaker.record(True)
+            return
+        if is_upstream_failure(error):
+            state.breaker.record(False)
+        else:
+            state.breaker.release_probe()
+        status = status_code(error)
+        if status == 429:
+            self.report_rate_limited(lease.key, _retry_after(error))
+        elif _is_invalid_key(error, status):
+            self.disable(lease.key, f"HTTP {status}")
+
+    def report_rate_limited(self, key: str, retry_after: Optional[float] = None):
+        state = self._state(key)
+        if state is None:
+            return
+        cooldown = retry_after if retry_after is not None else self._cooldown
+        with self._lock:
+            state.rate_limited += 1
+            state.cooldown_until = max(state.cooldown_until, time.monotonic() + cooldown)
+        _RATE_LIMITED.labels(self.provider, mask_key(key)).inc()
+        logger.warning("key_scheduler: %s key %s rate limited; cooling down %.1fs",
+                       self.provider, mask_key(key), cooldown)
+
+    def disable(self, key: str, reason: str):
+        state = self._state(key)
+        if state is None or state.disabled_reason is not None:
+            return
+        state.disabled_reason = reason
+        logger.error("key_scheduler: %s key %s removed (%s)", self.provider, mask_key(key), reason)
+
+    @contextmanager
+    def lease(self, tokens: int = 0):
+        lease = self.acquire(tokens)
+        try:
+            # Inside the try: an interrupted throttle wait must still give the slot back.
+            if lease.delay:
+                time.sleep(lease.delay)
+            yield lease
+        except BaseException as exc:
+            self.release(lease, exc)
+            raise
+        self.release(lease)
+
+    @asynccontextmanager
+    async def alease(self, tokens: int = 0):
+        lease = self.acquire(tokens)
+        try:
+            # Cancellation during the throttle wait releases the slot (and any half-open probe).
+            if lease.delay:
+                await asyncio.sleep(lease.delay)
+            yield lease
+        except BaseException as exc:
+            self.release(lease, exc)
+            raise
+        self.release(lease)
+
+    def stats(self) -> List[Dict]:
+        now = time.monotonic()
+        return [
+            {
+                "key": mask_key(s.key),
+                "disabled": s.disabled_reason,
+                "in_flight": s.in_flight,
+                "cooldown_remaining_seconds": round(max(0.0, s.cooldown_until - now), 3),
+                "requests": s.requests,
+                "tokens": s.tokens,
+                "throttled": s.throttled,
+                "throttle_wait_seconds": round(s.throttle_wait_seconds, 3),
+                "rate_limited": s.rate_limited,
+                "errors": s.errors,
+                "breaker": s.breaker.stats(),
+            }
+            for s in self._states
+        ]
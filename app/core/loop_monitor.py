@@ -0,0 +1,226 @@
+import asyncio
+import contextvars
+import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ASGI scope of the request the current task is serving. The watchdog thread
+# cannot read another thread's context, so scopes are also recorded per task:
+# by the middleware for the request task and by the task factory for tasks it
+# spawns.
+_request_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_scope", default=None)
+_task_scopes: "weakref.WeakKeyDictionary[asyncio.Task, dict]" = weakref.WeakKeyDictionary()
+
+_STACK_FRAMES = 12
+
+
+def route_of(scope: Optional[dict]) -> str:
+    """"METHOD /path/{param}" for a request scope, with path parameters folded back into names."""
+    if not scope:
+        return "background"
+    path = scope.get("path", "")
+    for name, value in (scope.get("path_params") or {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+def current_route() -> str:
+    """Route of the request the current task is serving, or "background"."""
+    return route_of(_request_scope.get())
+
+
+class RequestContextMiddleware:
+    """Pure ASGI middleware exposing the request scope to the loop monitor."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        task = asyncio.current_task()
+        previous = _task_scopes.get(task)
+        _task_scopes[task] = scope
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+            if previous is None:
+                _task_scopes.pop(task, None)
+            else:
+                _task_scopes[task] = previous
+
+
+def _task_factory(parent_factory):
+    def factory(loop, coro, **kwargs):
+        if parent_factory is not None:
+            task = parent_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        context = kwargs.get("context")
+        scope = context.get(_request_scope) if context is not None else _request_scope.get()
+        if scope is not None:
+            _task_scopes[task] = scope
+        return task
+
+    return factory
+
+
+class LoopMonitor:
+    """
+    Continuous event-loop lag measurement and blocking-call detection.
+
+    A heartbeat task sleeps for `interval` seconds and records how late it
+    wakes up: that lateness is the time every other coroutine on the loop had
+    to wait. A watchdog thread checks the heartbeat; when it is overdue by more
+    than `threshold` seconds, the loop is stuck in a callback, so the watchdog
+    captures the loop thread's stack and the route of the running task right
+    then. When the heartbeat resumes, the block is logged with its duration,
+    stack and route, and counted per route.
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1, max_events: int = 50, max_samples: int = 1000):
+        self.interval = interval
+        self.threshold = threshold
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._parent_factory = None
+        self._beat = 0.0
+        self._beat_seq = 0
+        self._captured: Optional[Dict[str, Any]] = None
+        self.blocks_by_route: Counter = Counter()
+        self.max_lag = 0.0
+        self.blocks = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._parent_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(_task_factory(self._parent_factory))
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-monitor")
+        self._thread = threading.Thread(target=self._watchdog, name="loop-monitor-watchdog", daemon=True)
+        self._thread.start()
+        logger.info("LoopMonitor started interval=%.3fs threshold=%.3fs", self.interval, self.threshold)
+
+    async def stop(self):
+        self._stop.set()
+        if self._loop is not None:
+            self._loop.set_task_factory(self._parent_factory)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    # -- loop side ---------------------------------------------------------------
+
+    async def _heartbeat(self):
+        while True:
+            with self._lock:
+                self._beat = time.monotonic()
+                self._beat_seq += 1
+            started = self._beat
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - started - self.interval)
+            self._record(lag)
+
+    def _record(self, lag: float):
+        with self._lock:
+            captured, self._captured = self._captured, None
+        self._samples.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        if lag < self.threshold:
+            return
+        event = captured or {"route": "unknown", "task": None, "stack": None}
+        event = {**event, "at": time.time(), "blocked_seconds": round(lag, 4)}
+        self.blocks += 1
+        self.blocks_by_route[event["route"]] += 1
+        self._events.append(event)
+        logger.warning(
+            "Event loop blocked for %.3fs route=%s task=%s\n%s",
+            lag, event["route"], event["task"], "".join(event["stack"] or ["(no stack captured)\n"]),
+        )
+
+    # -- watchdog thread ---------------------------------------------------------
+
+    def _watchdog(self):
+        reported_seq = -1
+        while not self._stop.wait(self.threshold / 2):
+            with self._lock:
+                beat, seq = self._beat, self._beat_seq
+            if seq == reported_seq or time.monotonic() - beat - self.interval < self.threshold:
+                continue
+            reported_seq = seq
+            captured = self._capture()
+            with self._lock:
+                if self._beat_seq == seq:
+                    self._captured = captured
+
+    def _capture(self) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame)[-_STACK_FRAMES:] if frame is not None else None
+        task = asyncio.current_task(self._loop) if self._loop is not None else None
+        return {
+            "route": route_of(_task_scopes.get(task) if task is not None else None),
+            "task": task.get_name() if task is not None else None,
+            "stack": stack,
+        }
+
+    # -- reporting ---------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+
+        def percentile(q: float) -> float:
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))], 4) if samples else 0.0
+
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "threshold_seconds": self.threshold,
+            "lag_p50_seconds": percentile(0.5),
+            "lag_p99_seconds": percentile(0.99),
+            "lag_max_seconds": round(self.max_lag, 4),
+            "blocks": self.blocks,
+            "blocks_by_route": dict(self.blocks_by_route),
+        }
+
+    def events(self):
+        return list(self._events)
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_SECONDS,
+    threshold=settings.LOOP_BLOCK_THRESHOLD_SECONDS,
+    max_events=settings.LOOP_MONITOR_MAX_EVENTS,
+)
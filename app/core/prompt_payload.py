@@ -0,0 +1,239 @@
+"""
+Compact, canonical serialization of the data rendered into prompts.
+
+Jinja renders a dict or list through `str()`, i.e. as a Python repr with
+spaces after every separator, `None` values, empty fields and `datetime(...)`
+calls. `compact(label, **variables)` wraps those variables so that `{{ X }}`
+renders minified JSON with sorted keys instead: dates become ISO strings, dict
+fields that are None or empty are dropped (PROMPT_PAYLOAD_DROP_EMPTY) and,
+when PROMPT_PAYLOAD_FIELDS lists fields for the label and variable, only those
+are kept. The wrapped values are still the original dicts and lists, so
+templates that loop over them or read `X.field` see every field; nested
+values interpolated on their own render compactly too. Strings and scalars
+pass through unchanged.
+
+Input tokens are estimated before (the repr) and after, per label, and are
+exposed through `stats()` and the `llm_prompt_payload_tokens_total` counter.
+Sorted keys also keep the prompt text identical for equal data, which helps
+single-flight deduplication and provider-side prompt caching. The settings
+change the prompt text, so `fingerprint()` belongs in any key of a cached
+LLM result.
+"""
+import hashlib
+import json
+import logging
+import threading
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+
+_TOKENS = metrics.registry.counter(
+    "llm_prompt_payload_tokens_total",
+    "Estimated input tokens of data rendered into prompts, as a repr (raw) and as compact JSON (compact)",
+    ("prompt", "stage"),
+)
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+_warned: Set[Tuple[str, str, str]] = set()
+
+
+def estimate_tokens(text: str) -> int:
+    # Same ~4 chars/token heuristic as the TPM estimate in llm_hub.
+    return len(text) // 4
+
+
+def _default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _is_empty(value) -> bool:
+    return value is None or (isinstance(value, (str, list, tuple, dict)) and not value)
+
+
+def prune(value):
+    """Drop dict fields that are None, "" or empty containers, recursively; list positions are kept."""
+    if isinstance(value, dict):
+        pruned = ((key, prune(item)) for key, item in value.items())
+        return {key: item for key, item in pruned if not _is_empty(item)}
+    if isinstance(value, (list, tuple)):
+        return [prune(item) for item in value]
+    return value
+
+
+def _field_tree(paths: Iterable[str]) -> Dict[str, Any]:
+    # {"a": None} keeps `a` whole; {"a": {"b": None}} keeps only `a.b`.
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        node = tree
+        *parents, leaf = path.split(".")
+        for part in parents:
+            child = node.setdefault(part, {})
+            if child is None:
+                break
+            node = child
+        else:
+            node[leaf] = None
+    return tree
+
+
+def _project(value, tree: Optional[Dict[str, Any]]):
+    if tree is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_project(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: _project(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+
+def project(value, paths: Iterable[str]):
+    """Keep only the dotted `paths` of `value`; lists are projected element by element."""
+    return _project(value, _field_tree(paths))
+
+
+def _dumps(value, tree: Optional[Dict[str, Any]], drop_empty: bool) -> str:
+    value = _project(value, tree)
+    if drop_empty:
+        value = prune(value)
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+
+def serialize(value, fields: Optional[Iterable[str]] = None, drop_empty: bool = True) -> str:
+    """Canonical minified JSON of `value`, optionally projected to `fields` and pruned."""
+    return _dumps(value, _field_tree(fields) if fields else None, drop_empty)
+
+
+def _found(value, tree: Dict[str, Any], prefix: str, found: Set[str]):
+    # Adds the paths of `tree` that exist somewhere in `value`. Empty lists and
+    # nulls say nothing about their shape, so paths below them count as found.
+    if isinstance(value, (list, tuple)):
+        if not value:
+            found.update(prefix + path for path in _paths(tree))
+        for item in value:
+            _found(item, tree, prefix, found)
+    elif isinstance(value, dict):
+        for key, sub in tree.items():
+            if key not in value:
+                continue
+            if sub is None or value[key] is None:
+                found.update(prefix + path for path in _paths({key: sub}))
+            else:
+                _found(value[key], sub, f"{prefix}{key}.", found)
+
+
+def _paths(tree: Dict[str, Any]):
+    for key, sub in tree.items():
+        if sub is None:
+            yield key
+        else:
+            yield from (f"{key}.{path}" for path in _paths(sub))
+
+
+def _warn_unmatched(label: str, name: str, value, fields: Iterable[str]):
+    tree = _field_tree(fields)
+    found: Set[str] = set()
+    _found(value, tree, "", found)
+    for path in _paths(tree):
+        if path in found:
+            continue
+        with _lock:
+            if (label, name, path) in _warned:
+                continue
+            _warned.add((label, name, path))
+        logger.warning("prompt_payload: PROMPT_PAYLOAD_FIELDS path %s.%s.%s matches nothing in the data", label, name, path)
+
+
+class _Payload:
+    """Template data that renders as compact JSON through `str()` (i.e. `{{ X }}`)."""
+
+    _fields: Optional[Dict[str, Any]] = None
+    _drop_empty = True
+    _text: Optional[str] = None
+
+    def __str__(self):
+        if self._text is None:
+            self._text = _dumps(self, self._fields, self._drop_empty)
+        return self._text
+
+
+class PayloadDict(_Payload, dict):
+    pass
+
+
+class PayloadList(_Payload, list):
+    pass
+
+
+def wrap(value, tree: Optional[Dict[str, Any]] = None, drop_empty: bool = True):
+    """`value` with every dict and list replaced by a `PayloadDict`/`PayloadList` copy."""
+    if isinstance(value, dict):
+        wrapped = PayloadDict(
+            (key, wrap(item, tree.get(key) if tree else None, drop_empty)) for key, item in value.items()
+        )
+    elif isinstance(value, (list, tuple)):
+        wrapped = PayloadList(wrap(item, tree, drop_empty) for item in value)
+    else:
+        return value
+    wrapped._fields = tree
+    wrapped._drop_empty = drop_empty
+    return wrapped
+
+
+def compact(label: str, **variables) -> Dict[str, Any]:
+    """Template variables of prompt `label` with dicts and lists wrapped by `wrap`."""
+    if not settings.PROMPT_PAYLOAD_COMPACT:
+        return variables
+    fields = settings.PROMPT_PAYLOAD_FIELDS.get(label) or {}
+    rendered, raw_tokens, compact_tokens = {}, 0, 0
+    for name, value in variables.items():
+        if isinstance(value, (dict, list, tuple)):
+            paths = fields.get(name)
+            if paths:
+                _warn_unmatched(label, name, value, paths)
+            raw_tokens += estimate_tokens(str(value))
+            value = wrap(value, _field_tree(paths) if paths else None, settings.PROMPT_PAYLOAD_DROP_EMPTY)
+            compact_tokens += estimate_tokens(str(value))
+        rendered[name] = value
+    if raw_tokens:
+        _TOKENS.labels(label, "raw").inc(raw_tokens)
+        _TOKENS.labels(label, "compact").inc(compact_tokens)
+        with _lock:
+            row = _stats.setdefault(label, {"calls": 0, "raw_tokens": 0, "compact_tokens": 0})
+            row["calls"] += 1
+            row["raw_tokens"] += raw_tokens
+            row["compact_tokens"] += compact_tokens
+    return rendered
+
+
+def fingerprint() -> str:
+    """Short hash of the PROMPT_PAYLOAD_* settings, which decide the rendered prompt text."""
+    material = json.dumps(
+        [settings.PROMPT_PAYLOAD_COMPACT, settings.PROMPT_PAYLOAD_DROP_EMPTY, settings.PROMPT_PAYLOAD_FIELDS],
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        rows = {label: dict(row) for label, row in _stats.items()}
+    for row in rows.values():
+        row["saved_ratio"] = round(1 - row["compact_tokens"] / row["raw_tokens"], 4) if row["raw_tokens"] else 0.0
+    return {
+        "enabled": settings.PROMPT_PAYLOAD_COMPACT,
+        "drop_empty": settings.PROMPT_PAYLOAD_DROP_EMPTY,
+        "fields": settings.PROMPT_PAYLOAD_FIELDS,
+        "prompts": rows,
+    }
@@ -0,0 +1,166 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import httpx
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit breaker is open."""
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Timeouts, connection errors and 5xx answers: the backend, not the request, is at fault."""
+    status = status_code(exc)
+    if status is not None:
+        return status >= 500 or status == 408
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    # SDK wrappers such as openai.APIConnectionError / APITimeoutError.
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def is_retryable(exc: BaseException) -> bool:
+    return status_code(exc) == 429 or is_upstream_failure(exc)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one backend.
+
+    `failure_threshold` consecutive failures open the circuit; calls are rejected
+    for `open_seconds`, then up to `half_open_calls` probes are let through. A
+    successful probe closes the circuit, a failed one opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, open_seconds: float = 30.0, half_open_calls: int = 1):
+        self.name = name
+        self._threshold = failure_threshold
+        self._open_seconds = open_seconds
+        self._half_open_calls = half_open_calls
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.consecutive_failures = 0
+        self.opened = 0
+        self.rejected = 0
+
+    def _current(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self._open_seconds:
+            self._state, self._probes = HALF_OPEN, 0
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current(time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; a half-open circuit admits a limited number of probes."""
+        with self._lock:
+            state = self._current(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self._half_open_calls:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok: bool):
+        with self._lock:
+            if ok:
+                self.consecutive_failures = 0
+                self._state = CLOSED
+                return
+            self.consecutive_failures += 1
+            state = self._current(time.monotonic())
+            if state == HALF_OPEN or (state == CLOSED and self.consecutive_failures >= self._threshold):
+                self._state, self._opened_at = OPEN, time.monotonic()
+                self.opened += 1
+
+    def release_probe(self):
+        """Give back a half-open probe slot whose call ended without a verdict (e.g. a client error)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current(now)
+            remaining = self._open_seconds - (now - self._opened_at) if state == OPEN else 0.0
+            return {
+                "state": state,
+                "consecutive_failures": self.consecutive_failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "open_remaining_seconds": round(max(0.0, remaining), 3),
+            }
+
+
+class RetryBudget:
+    """
+    Caps retries at `ratio` of the calls made in the last `window_seconds`, plus
+    `min_retries` so a quiet service can still retry. When a backend fails
+    wholesale, retries stop at the budget instead of multiplying the load.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 3, window_seconds: float = 10.0):
+        self._ratio = ratio
+        self._min_retries = min_retries
+        self._window = window_seconds
+        self._calls = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.denied = 0
+
+    def _prune(self, now: float):
+        for events in (self._calls, self._retries):
+            while events and now - events[0] > self._window:
+                events.popleft()
+
+    def record_call(self):
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            self._calls.append(now)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            if len(self._retries) >= self._min_retries + self._ratio * len(self._calls):
+                self.denied += 1
+                return False
+            self._retries.append(now)
+            self.granted += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune(time.monotonic())
+            return {
+                "calls_in_window": len(self._calls),
+                "retries_in_window": len(self._retries),
+                "retries_granted": self.granted,
+                "retries_denied": self.denied,
+            }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,164 @@
+import random
+import threading
+from collections import deque
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+
+class Backend(NamedTuple):
+    provider: str
+    model: str
+
+    def __str__(self):
+        return f"{self.provider}:{self.model}"
+
+
+def parse_backend(spec: str) -> Backend:
+    provider, sep, model = spec.partition(":")
+    if not sep or not provider or not model:
+        raise ValueError(f"backend {spec!r} is not 'provider:model'")
+    return Backend(provider.strip().lower(), model.strip())
+
+
+def parse_routes(routes: Dict[str, Sequence[str]]) -> Dict[str, List[Backend]]:
+    return {label: [parse_backend(spec) for spec in specs] for label, specs in routes.items() if specs}
+
+
+class LatencyWindow:
+    """Latencies of the last `size` successful calls and outcomes of the last `size` calls of one backend."""
+
+    def __init__(self, size: int):
+        self._latencies = deque(maxlen=size)
+        self._outcomes = deque(maxlen=size)
+        self.calls = 0
+        self.errors = 0
+
+    def observe(self, seconds: float, ok: bool):
+        self.calls += 1
+        self._outcomes.append(ok)
+        if ok:
+            self._latencies.append(seconds)
+        else:
+            self.errors += 1
+
+    @property
+    def samples(self) -> int:
+        return len(self._latencies)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+
+class LatencyRouter:
+    """
+    Picks among equivalent (provider, model) backends for a prompt label.
+
+    Every upstream call feeds a rolling window per backend. Backends whose error
+    rate exceeds `max_error_rate` go last; the rest are ordered by median latency.
+    A backend with fewer than `min_samples` successes ranks first (in configured
+    order) until it has been measured, and a share `explore_rate` of calls puts a
+    random alternative first so the stats of every backend stay current.
+
+    `hedge_delay` is how long to wait for a backend before sending a duplicate
+    request to the next one: its latency at `hedge_percentile`, clamped to
+    [min_hedge_delay, max_hedge_delay], or `default_hedge_delay` without enough samples.
+    """
+
+    def __init__(self, routes: Dict[str, List[Backend]], window: int = 200, min_samples: int = 20,
+                 max_error_rate: float = 0.5, explore_rate: float = 0.05, hedge_percentile: float = 0.95,
+                 min_hedge_delay: float = 0.5, max_hedge_delay: float = 30.0, default_hedge_delay: float = 10.0,
+                 rng: Optional[random.Random] = None):
+        self.routes = routes
+        self._window = window
+        self._min_samples = min_samples
+        self._max_error_rate = max_error_rate
+        self._explore_rate = explore_rate
+        self._hedge_percentile = hedge_percentile
+        self._min_hedge_delay = min_hedge_delay
+        self._max_hedge_delay = max_hedge_delay
+        self._default_hedge_delay = default_hedge_delay
+        self._random = rng or random.Random()
+        self._windows: Dict[Backend, LatencyWindow] = {}
+        self._lock = threading.Lock()
+        self.routed: Dict[str, Dict[str, int]] = {}
+        self.explored = 0
+
+    def _window_of(self, backend: Backend) -> LatencyWindow:
+        window = self._windows.get(backend)
+        if window is None:
+            with self._lock:
+                window = self._windows.setdefault(backend, LatencyWindow(self._window))
+        return window
+
+    def observe(self, provider: str, model: str, seconds: float, ok: bool):
+        window = self._window_of(Backend(provider, model))
+        with self._lock:
+            window.observe(seconds, ok)
+
+    def candidates(self, label: str, default: Backend) -> List[Backend]:
+        """Backends allowed for `label`, best first; `default` alone when the label has no route."""
+        backends = self.routes.get(label) or [default]
+        if len(backends) > 1:
+            backends = self._rank(backends)
+            if self._explore_rate and self._random.random() < self._explore_rate:
+                self.explored += 1
+                chosen = self._random.choice(backends[1:])
+                backends = [chosen] + [b for b in backends if b != chosen]
+        counts = self.routed.setdefault(label, {})
+        counts[str(backends[0])] = counts.get(str(backends[0]), 0) + 1
+        return backends
+
+    def _rank(self, backends: List[Backend]) -> List[Backend]:
+        def key(item):
+            index, backend = item
+            window = self._window_of(backend)
+            measured = window.samples >= self._min_samples
+            return window.error_rate() > self._max_error_rate, window.percentile(0.5) if measured else 0.0, index
+        return [backend for _, backend in sorted(enumerate(backends), key=key)]
+
+    def latency(self, backend: Backend, q: float) -> Optional[float]:
+        """Latency of `backend` at percentile `q`, or None until it has `min_samples` successes."""
+        window = self._window_of(backend)
+        if window.samples < self._min_samples:
+            return None
+        return window.percentile(q)
+
+    def backends(self) -> List[Backend]:
+        """Every backend that has been observed, sorted."""
+        with self._lock:
+            return sorted(self._windows)
+
+    def hedge_delay(self, backend: Backend) -> float:
+        delay = self.latency(backend, self._hedge_percentile)
+        if delay is None:
+            return self._default_hedge_delay
+        return min(self._max_hedge_delay, max(self._min_hedge_delay, delay))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            windows = list(self._windows.items())
+        backends = {}
+        for backend, window in sorted(windows):
+            p50, p95 = window.percentile(0.5), window.percentile(self._hedge_percentile)
+            backends[str(backend)] = {
+                "calls": window.calls,
+                "errors": window.errors,
+                "error_rate": round(window.error_rate(), 4),
+                "samples": window.samples,
+                "p50_seconds": round(p50, 4) if p50 is not None else None,
+                "p95_seconds": round(p95, 4) if p95 is not None else None,
+                "hedge_delay_seconds": round(self.hedge_delay(backend), 4),
+            }
+        return {
+            "routes": {label: [str(b) for b in route] for label, route in self.routes.items()},
+            "routed": {label: dict(counts) for label, counts in self.routed.items()},
+            "explored": self.explored,
+            "backends": backends,
+        }
@@ -0,0 +1,73 @@
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse identical concurrent async calls into one.
+
+    The first caller for a key starts the call as its own task; callers arriving
+    while it is in flight await the same task. Every caller, the first included,
+    gets its own copy of the result (or the exception), so one caller patching its
+    result cannot change what the others see. The shared task survives
+    cancellation of any single caller and is cancelled when its last caller is,
+    so an abandoned call (a lost hedge, a timed-out branch) does not keep running
+    upstream.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.deduplicated = 0
+        self.abandoned = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            self.leaders += 1
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda task: self._done(key, call))
+        else:
+            self.deduplicated += 1
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            self._leave(key, call)
+        return copy.deepcopy(result)
+
+    def _leave(self, key: Hashable, call: _Call):
+        call.waiters -= 1
+        if call.waiters or call.task.done():
+            return
+        # Every caller was cancelled: nobody wants the result any more.
+        self.abandoned += 1
+        call.task.cancel()
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _done(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # Retrieve the exception so a call whose callers left is not logged
+            # as "Task exception was never retrieved".
+            call.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "waiters": sum(call.waiters for call in self._calls.values()),
+            "leaders": self.leaders,
+            "deduplicated": self.deduplicated,
+            "abandoned": self.abandoned,
+        }
@@ -0,0 +1,20 @@
+import json
+from typing import Any, Optional
+
+# Disable proxy buffering (nginx) and caching so events reach the client immediately.
+EVENT_STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_event(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    """One Server-Sent Events message with a JSON payload."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def format_ndjson(event: str, data: Any) -> str:
+    """The same event as one newline-delimited JSON line."""
+    return json.dumps({"event": event, "data": data}, separators=(",", ":"), default=str) + "\n"
@@ -1,4 +1,5 @@
-from app.services import supabase as db
+from app.core.config import settings
+from app.services import supabase_async as db
 from app.services import knowledge
 from langfuse import observe
 import uuid
@@ -6,24 +7,29 @@ from datetime import datetime
 import asyncio
 
 @observe
-async def process_group(group_id: str):
-    # NOTE: Supabase Python client is sync; run blocking calls in thread pool
-    loop = asyncio.get_running_loop()
+async def process_group(group_id: str, new_member: dict = None):
+    """
+    Regenerate and store a group's knowledge graph and summary.
 
-    members = await loop.run_in_executor(None, db.get_group_members, group_id)
+    With `new_member` (the persona of a member who just joined) the graph may be
+    updated incrementally instead of regenerated from every member.
+    """
+    members = await db.get_group_members(group_id)
     if not members:
         return
 
     user_ids = [m["user_id"] for m in members]
 
-    users = await loop.run_in_executor(None, db.get_users_by_ids, user_ids)
+    users = await db.get_users_by_ids(user_ids)
     group_members = [
         {"persona_traits": u["persona_traits"], "ai_summary": u["ai_summary"]}
         for u in users
     ]
 
-    # knowledge.* assumed pure/sync and cheap enough to run inline
-    kn_data = knowledge.generate_kn(group_members)
+    if new_member is not None:
+        kn_data, kn_summary = await knowledge.add_member_knowledge(group_id, group_members, new_member)
+    else:
+        kn_data, kn_summary = await knowledge.generate_group_knowledge(group_members, group_id=group_id)
 
     kg_record = {
         "id": str(uuid.uuid4()),
@@ -32,11 +38,118 @@ async def process_group(group_id: str):
         "updated_at": datetime.now().isoformat(),
     }
 
-    await loop.run_in_executor(None, db.insert_knowledge_graph, kg_record)
+    await db.insert_knowledge_graph(kg_record)
+    await db.update_group_kn_summary(group_id, kn_summary)
 
-    kn_summary = knowledge.generate_kn_summary(kn_data)
-    await loop.run_in_executor(None, db.update_group_kn_summary, group_id, kn_summary)
+class _Run:
+    """One scheduled process_group run and every trigger folded into it."""
+
+    def __init__(self):
+        self.future = asyncio.get_running_loop().create_future()
+        # Nobody may be left awaiting a failed run; don't warn about that.
+        self.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.started = False
+        self.full = False
+        self.new_members = []
+
+    def add(self, new_member: dict = None):
+        if new_member is None:
+            self.full = True
+        else:
+            self.new_members.append(new_member)
+
+    def new_member(self):
+        # Only a single join can be applied incrementally; anything else regenerates fully.
+        if self.full or len(self.new_members) != 1:
+            return None
+        return self.new_members[0]
+
+
+class RefreshCoalescer:
+    """
+    At most one knowledge refresh runs per group at a time.
+
+    A trigger starts a run after a debounce window; triggers during the window join
+    that run, and triggers while it is running collapse into a single follow-up run.
+    Every caller awaits the run that covers its trigger.
+    """
+
+    def __init__(self, debounce_seconds: float):
+        self._debounce = debounce_seconds
+        self._groups = {}
+        self._tasks = set()
+        self._stopping = False
+        self.triggers = 0
+        self.runs = 0
+        self.coalesced = 0
+
+    async def refresh(self, group_id: str, new_member: dict = None):
+        self.triggers += 1
+        state = self._groups.setdefault(group_id, {"current": None, "next": None})
+        if state["current"] is None:
+            run = state["current"] = _Run()
+            self._start(group_id, run)
+        elif not state["current"].started:
+            run = state["current"]
+            self.coalesced += 1
+        elif state["next"] is None:
+            run = state["next"] = _Run()
+        else:
+            run = state["next"]
+            self.coalesced += 1
+        run.add(new_member)
+        await asyncio.shield(run.future)
+
+    def _start(self, group_id: str, run: _Run):
+        task = asyncio.create_task(self._execute(group_id, run))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, group_id: str, run: _Run):
+        try:
+            await asyncio.sleep(self._debounce)
+            run.started = True
+            self.runs += 1
+            await process_group(group_id, run.new_member())
+            run.future.set_result(None)
+        except asyncio.CancelledError:
+            run.future.cancel()
+            raise
+        except Exception as e:
+            run.future.set_exception(e)
+        finally:
+            state = self._groups[group_id]
+            state["current"], state["next"] = state["next"], None
+            if state["current"] is not None and self._stopping:
+                state["current"].future.cancel()
+                state["current"] = None
+            if state["current"] is not None:
+                self._start(group_id, state["current"])
+            else:
+                del self._groups[group_id]
+
+    async def stop(self):
+        """Cancel pending and running refreshes (shutdown); queued follow-up runs are not started."""
+        self._stopping = True
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._stopping = False
+
+    def stats(self):
+        return {
+            "triggers": self.triggers,
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+            # Each skipped run saves the KN_generator and KN_Summerise calls.
+            "llm_calls_saved": self.coalesced * 2,
+            "active_groups": len(self._groups),
+        }
+
+
+coalescer = RefreshCoalescer(settings.KN_REFRESH_DEBOUNCE_SECONDS)
 
 @observe
-async def refresh_kn(group_id: str):
-    await process_group(group_id)
+async def refresh_kn(group_id: str, new_member: dict = None):
+    await coalescer.refresh(group_id, new_member)
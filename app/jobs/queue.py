@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+from app.jobs import process_group
+from app.models.schemas import JobStatus, JobType
+from app.services import supabase_async as db
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the job backlog is at JOB_QUEUE_MAX_PENDING."""
+
+
+class InMemoryJobStore:
+    """Process-local job store; the stand-in for tests and single-replica setups."""
+
+    def __init__(self, max_jobs: int = 10000):
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._max_jobs = max_jobs
+
+    async def create(self, job: dict):
+        self._jobs[job["id"]] = dict(job)
+        while len(self._jobs) > self._max_jobs:
+            self._jobs.popitem(last=False)
+
+    async def update(self, job_id: str, fields: dict):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.update(fields)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+
+class SupabaseJobStore:
+    """Persists job state in the Supabase `jobs` table."""
+
+    async def create(self, job: dict):
+        await db.insert_job(job)
+
+    async def update(self, job_id: str, fields: dict):
+        await db.update_job(job_id, fields)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await db.get_job(job_id)
+
+
+def _make_store():
+    if settings.JOB_STORE == "memory":
+        return InMemoryJobStore()
+    return SupabaseJobStore()
+
+
+class JobQueue:
+    """
+    Bounded in-process job queue served by a fixed pool of asyncio workers.
+
+    Endpoints enqueue and return immediately; workers run the handler for the job
+    type and record PENDING -> RUNNING -> SUCCESS/FAILED in the job store.
+    """
+
+    def __init__(self, store, handlers: Dict[str, Callable[..., Awaitable]], workers: int, max_pending: int):
+        self.store = store
+        self._handlers = handlers
+        self._workers = workers
+        self._max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self._max_pending)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self._workers)
+        ]
+        logger.info("job_queue: started workers=%d", self._workers)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    async def enqueue(self, job_type: str, group_id: str, **payload) -> dict:
+        if not self._tasks:
+            await self.start()
+        if self._queue.full():
+            raise QueueFullError("Job queue is full")
+        now = datetime.now().isoformat()
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "group_id": group_id,
+            "status": JobStatus.PENDING,
+            "error_message": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.store.create(job)
+        self._queue.put_nowait((job, payload))
+        logger.info("job_queue: enqueued id=%s type=%s group_id=%s", job["id"], job_type, group_id)
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.store.get(job_id)
+
+    async def _worker(self, index: int):
+        while True:
+            job, payload = await self._queue.get()
+            try:
+                await self._run(job, payload)
+            except Exception:
+                logger.exception("job_queue: worker %d could not record job id=%s", index, job["id"])
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: dict, payload: dict):
+        await self.store.update(job["id"], {"status": JobStatus.RUNNING, "updated_at": datetime.now().isoformat()})
+        try:
+            await self._handlers[job["type"]](job["group_id"], **payload)
+        except Exception as e:
+            logger.exception("job_queue: failed id=%s type=%s", job["id"], job["type"])
+            await self.store.update(job["id"], {
+                "status": JobStatus.FAILED,
+                "error_message": str(e)[:1000],
+                "updated_at": datetime.now().isoformat(),
+            })
+            return
+        await self.store.update(job["id"], {"status": JobStatus.SUCCESS, "updated_at": datetime.now().isoformat()})
+        logger.info("job_queue: success id=%s", job["id"])
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self._max_pending,
+        }
+
+
+job_queue = JobQueue(
+    _make_store(),
+    handlers={JobType.PROCESS_GROUP_TRAITS: process_group.refresh_kn},
+    workers=settings.JOB_WORKERS,
+    max_pending=settings.JOB_QUEUE_MAX_PENDING,
+)
@@ -1,89 +1,742 @@
+import asyncio
+import functools
+import hashlib
+import inspect
 import json
-import re
-from openai import OpenAI
-from google import genai
-from google.genai.types import (
-    Tool,
-    GenerateContentConfig,
-    GoogleSearch,
-)
-from openinference.instrumentation.google_genai import GoogleGenAIInstrumentor
-from langfuse import Langfuse, observe
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Optional
+import httpx
+import requests
+from app.core import cassette, json_extract, metrics, routing
 from app.core.config import settings
-from dotenv import load_dotenv
+from app.core.resilience import (
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    backoff_delay,
+    is_retryable,
+    is_upstream_failure,
+)
+from app.core.routing import Backend
+from app.core.singleflight import SingleFlight
 
-load_dotenv()
+# The provider SDKs take over a second to import; they are loaded with the first
+# client (or by `warmup()`), not when the app is imported.
+if TYPE_CHECKING:
+    from google import genai
+    from google.genai.types import GenerateContentConfig
+    from openai import AsyncOpenAI, OpenAI
 
-GoogleGenAIInstrumentor().instrument()
 
+@functools.lru_cache(maxsize=None)
+def _instrument_google():
+    """Trace Google GenAI calls; runs once, before the first Google client is created."""
+    from openinference.instrumentation.google_genai import GoogleGenAIInstrumentor
 
-def clean_llm_json(text: str) -> str:
-    if not text:
-        return ""
+    GoogleGenAIInstrumentor().instrument()
 
-    # Match ```json ... ``` or ``` ... ``` (non-greedy inner)
-    fence_match = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL | re.IGNORECASE)
-    if fence_match:
-        return fence_match.group(1).strip()
 
-    return text.strip()
+class ClientPool:
+    """
+    Long-lived provider clients keyed by (provider, api_key).
 
+    Each client owns a keep-alive connection pool, so repeated calls with the same
+    key reuse TCP/TLS connections instead of paying for a new handshake per call.
+    """
 
+    def __init__(self):
+        self._clients = {}
+        self._closers = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
 
-def generate_openai(prompt: str, model: str, **kwargs):
-    """Generate content using OpenAI API."""
-    client = OpenAI(
-        api_key=settings.openai_api_key,
-        base_url=settings.OPENAI_BASE_URL
+    def get(self, provider: str, api_key: str, factory):
+        key = (provider, api_key)
+        client = self._clients.get(key)
+        if client is not None:
+            self.reused += 1
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client, closer = factory(api_key)
+                self._clients[key] = client
+                self._closers.append(closer)
+                self.created += 1
+            else:
+                self.reused += 1
+        return client
+
+    async def aclose(self):
+        with self._lock:
+            closers, self._closers = self._closers, []
+            self._clients.clear()
+        for closer in closers:
+            try:
+                result = closer()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                pass
+
+    def stats(self):
+        return {"clients": len(self._clients), "created": self.created, "reused": self.reused}
+
+
+client_pool = ClientPool()
+
+
+def _httpx_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def _openai_factory(base_url: str):
+    def factory(api_key: str):
+        from openai import OpenAI
+
+        http_client = httpx.Client(limits=_httpx_limits(), timeout=settings.LLM_HTTP_TIMEOUT)
+        # Retries are budgeted by `_resilient`; the SDK's own would multiply them.
+        client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+        return client, client.close
+    return factory
+
+
+def _async_openai_factory(base_url: str):
+    def factory(api_key: str):
+        from openai import AsyncOpenAI
+
+        http_client = httpx.AsyncClient(limits=_httpx_limits(), timeout=settings.LLM_HTTP_TIMEOUT)
+        client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+        return client, client.close
+    return factory
+
+
+class _ClosingStream:
+    """Streamed httpx response that returns its pooled connection once fully read or abandoned."""
+
+    def __init__(self, response: httpx.Response):
+        self._response = response
+
+    async def aiter_lines(self):
+        try:
+            async for line in self._response.aiter_lines():
+                yield line
+        finally:
+            await self._response.aclose()
+
+
+def _google_factory(api_key: str):
+    from google import genai
+    from google.genai.types import HttpOptions
+
+    _instrument_google()
+    client = genai.Client(
+        api_key=api_key,
+        http_options=HttpOptions(
+            timeout=int(settings.LLM_HTTP_TIMEOUT * 1000),
+            base_url=settings.GOOGLE_BASE_URL or None,
+        ),
     )
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a JSON-only API. "
-                    "Read the instructions below and respond with a SINGLE valid JSON object. "
-                    "Do not include explanations, markdown, or code fences. "
-                    "If you reference lists or nested data, include them as proper JSON."
-                ),
-            },
-            {"role": "user", "content": prompt},
-        ],
-        **kwargs,
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+        pool_maxsize=settings.LLM_POOL_MAX_CONNECTIONS,
     )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    async_http = httpx.AsyncClient(limits=_httpx_limits(), timeout=settings.LLM_HTTP_TIMEOUT)
+
+    api_client = client._api_client
+    # Older google-genai releases open a fresh requests.Session / httpx.AsyncClient
+    # for every call; route those calls through one pooled client per key instead.
+    if hasattr(api_client, "_request_unauthorized") and not api_client.vertexai:
+        from google.genai import errors
+        from google.genai._api_client import HttpResponse
+
+        def _request_unauthorized(http_request, stream=False):
+            data = http_request.data
+            if data and not isinstance(data, bytes):
+                data = json.dumps(data)
+            response = session.request(
+                method=http_request.method,
+                url=http_request.url,
+                headers=http_request.headers,
+                data=data or None,
+                timeout=http_request.timeout,
+                stream=stream,
+            )
+            errors.APIError.raise_for_response(response)
+            return HttpResponse(response.headers, response if stream else [response.text])
+
+        async def _async_request(http_request, stream=False):
+            content = json.dumps(http_request.data) if http_request.data else None
+            if stream:
+                request = async_http.build_request(
+                    method=http_request.method,
+                    url=http_request.url,
+                    headers=http_request.headers,
+                    content=content,
+                    timeout=http_request.timeout,
+                )
+                response = await async_http.send(request, stream=True)
+                if response.status_code != 200:
+                    # The error body must be read before APIError can inspect it.
+                    await response.aread()
+                    await response.aclose()
+                    errors.APIError.raise_for_response(response)
+                return HttpResponse(response.headers, _ClosingStream(response))
+            else:
+                response = await async_http.request(
+                    method=http_request.method,
+                    url=http_request.url,
+                    headers=http_request.headers,
+                    content=content,
+                    timeout=http_request.timeout,
+                )
+            errors.APIError.raise_for_response(response)
+            return HttpResponse(response.headers, response if stream else [response.text])
+
+        api_client._request_unauthorized = _request_unauthorized
+        api_client._async_request = _async_request
+
+    async def close():
+        session.close()
+        await async_http.aclose()
+
+    return client, close
+
+
+def get_openai_client(api_key: str) -> "OpenAI":
+    return client_pool.get("openai", api_key, _openai_factory(settings.OPENAI_BASE_URL))
+
+
+def get_nvidia_client(api_key: str) -> "OpenAI":
+    return client_pool.get("nvidia", api_key, _openai_factory(settings.NVIDIA_BASE_URL))
+
+
+def get_async_openai_client(api_key: str) -> "AsyncOpenAI":
+    return client_pool.get("openai_async", api_key, _async_openai_factory(settings.OPENAI_BASE_URL))
+
+
+def get_async_nvidia_client(api_key: str) -> "AsyncOpenAI":
+    return client_pool.get("nvidia_async", api_key, _async_openai_factory(settings.NVIDIA_BASE_URL))
+
+
+def get_google_client(api_key: str) -> "genai.Client":
+    """The same client serves sync calls and async calls through `client.aio`."""
+    return client_pool.get("google", api_key, _google_factory)
+
+
+async def close_clients():
+    """Close every pooled provider client; called from the FastAPI lifespan."""
+    await client_pool.aclose()
+
+
+def warmup():
+    """
+    Import the provider SDKs and create the pooled client of every configured key,
+    so the first requests don't pay for it. Blocking; the lifespan runs it in a thread.
+    """
+    for api_key in settings.openai_keys.keys:
+        get_openai_client(api_key)
+        get_async_openai_client(api_key)
+    for api_key in settings.nvidia_keys.keys:
+        get_nvidia_client(api_key)
+        get_async_nvidia_client(api_key)
+    for api_key in settings.google_keys.keys:
+        get_google_client(api_key)
+
+
+_OPENAI_SYSTEM_PROMPT = (
+    "You are a JSON-only API. "
+    "Read the instructions below and respond with a SINGLE valid JSON object. "
+    "Do not include explanations, markdown, or code fences. "
+    "If you reference lists or nested data, include them as proper JSON."
+)
 
+
+def _openai_messages(prompt: str):
+    return [
+        {"role": "system", "content": _OPENAI_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _nvidia_messages(prompt: str):
+    return [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": "Follow the system prompt and complete the task according"}
+    ]
+
+
+def _estimate_tokens(prompt: str) -> int:
+    # Rough pre-call estimate (~4 chars/token) for the TPM bucket; corrected from usage afterwards.
+    return len(prompt) // 4
+
+
+def _openai_usage(response):
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def _google_usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None)
+
+
+def _parse_openai_response(response):
     raw_content = response.choices[0].message.content or ""
-    output = clean_llm_json(raw_content)
 
     try:
-        return json.loads(output)
-    except json.JSONDecodeError:
+        return json_extract.loads(raw_content)
+    except json_extract.JSONExtractError:
+        _JSON_FAILURES.labels("openai").inc()
         raise ValueError(
             f"LLM did not return valid JSON. Raw output was:\n{raw_content!r}"
         )
 
 
+def _parse_nvidia_response(response):
+    try:
+        return json_extract.loads(response.choices[0].message.content)
+    except json_extract.JSONExtractError:
+        _JSON_FAILURES.labels("nvidia").inc()
+        raise
 
-def generate_nvidia(prompt: str, model: str, **kwargs):
-    """Generate content using NVIDIA API."""
-    client = OpenAI(
-        api_key=settings.nvidia_api_key,
-        base_url=settings.NVIDIA_BASE_URL
+
+def _google_config(kwargs, timeout: Optional[float] = None) -> "GenerateContentConfig":
+    from google.genai.types import GenerateContentConfig, GoogleSearch, HttpOptions, Tool
+
+    # Define tools using Tool objects with GoogleSearch
+    tools = [
+        Tool(google_search=GoogleSearch()),
+    ]
+
+    # Create generation config with tools
+    return GenerateContentConfig(
+        temperature=kwargs.get('temperature', 1),
+        top_p=kwargs.get('top_p', 1),
+        tools=tools,
+        http_options=HttpOptions(timeout=int(timeout * 1000)) if timeout else None,
     )
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": "Follow the system prompt and complete the task according"}
-        ],
-        **kwargs
+
+
+def _parse_google_response(response):
+    if not response.candidates:
+        raise ValueError("Google GenAI returned no candidates")
+    try:
+        return json_extract.loads(_candidate_text(response.candidates[0]))
+    except json_extract.JSONExtractError:
+        _JSON_FAILURES.labels("google").inc()
+        raise
+
+
+def _candidate_text(candidate) -> str:
+    # Grounded answers can split the JSON across several text parts.
+    parts = candidate.content.parts if candidate.content else None
+    return "".join(part.text for part in parts or () if part.text and not part.thought)
+
+
+single_flight = SingleFlight()
+
+router = routing.LatencyRouter(
+    routing.parse_routes(settings.LLM_ROUTES),
+    window=settings.LLM_ROUTING_WINDOW,
+    min_samples=settings.LLM_ROUTING_MIN_SAMPLES,
+    max_error_rate=settings.LLM_ROUTING_MAX_ERROR_RATE,
+    explore_rate=settings.LLM_ROUTING_EXPLORE_RATE,
+    hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+    min_hedge_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+    max_hedge_delay=settings.LLM_HEDGE_MAX_DELAY_SECONDS,
+    default_hedge_delay=settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+)
+
+
+_LLM_LATENCY = metrics.registry.histogram(
+    "llm_request_duration_seconds", "Upstream LLM call latency, including response parsing",
+    ("provider", "model", "prompt"), buckets=metrics.LLM_BUCKETS,
+)
+_LLM_REQUESTS = metrics.registry.counter(
+    "llm_requests_total", "Upstream LLM calls by outcome (ok, error, cancelled)",
+    ("provider", "model", "prompt", "outcome"),
+)
+_LLM_IN_FLIGHT = metrics.registry.gauge("llm_requests_in_flight", "Upstream LLM calls in progress", ("provider",))
+_JSON_FAILURES = metrics.registry.counter(
+    "llm_json_parse_failures_total", "LLM responses no JSON could be recovered from", ("provider",)
+)
+_HEDGES = metrics.registry.counter(
+    "llm_hedged_requests_total", "Routed LLM calls that sent a hedged duplicate, by the backend that answered",
+    ("prompt", "winner"),
+)
+_FAILOVERS = metrics.registry.counter(
+    "llm_failovers_total", "Routed LLM calls answered by another backend after the first one failed", ("prompt",)
+)
+_TIMEOUTS = metrics.registry.counter(
+    "llm_timeouts_total", "Upstream LLM calls cut off by their adaptive timeout", ("provider",)
+)
+_RETRIES = metrics.registry.counter("llm_retries_total", "Upstream LLM calls retried", ("provider",))
+_RETRIES_DENIED = metrics.registry.counter(
+    "llm_retries_denied_total", "Retryable LLM failures not retried because the retry budget was spent", ("provider",)
+)
+_CIRCUIT_REJECTIONS = metrics.registry.counter(
+    "llm_circuit_rejections_total", "LLM calls refused because the provider's circuit breaker was open", ("provider",)
+)
+
+_PROVIDERS = ("openai", "nvidia", "google")
+
+breakers = {
+    provider: CircuitBreaker(
+        provider,
+        failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+        open_seconds=settings.LLM_BREAKER_OPEN_SECONDS,
+        half_open_calls=settings.LLM_BREAKER_HALF_OPEN_CALLS,
     )
-    output = clean_llm_json(response.choices[0].message.content)
-    return json.loads(output)
+    for provider in _PROVIDERS
+}
 
+retry_budgets = {
+    provider: RetryBudget(
+        ratio=settings.LLM_RETRY_BUDGET_RATIO,
+        min_retries=settings.LLM_RETRY_BUDGET_MIN_RETRIES,
+        window_seconds=settings.LLM_RETRY_BUDGET_WINDOW_SECONDS,
+    )
+    for provider in _PROVIDERS
+}
 
 
+def upstream_timeout(provider: str, model: str) -> float:
+    """
+    Deadline for one call to (provider, model): its observed latency at
+    LLM_TIMEOUT_PERCENTILE times LLM_TIMEOUT_MULTIPLIER, clamped to
+    [LLM_TIMEOUT_MIN_SECONDS, LLM_HTTP_TIMEOUT]; LLM_HTTP_TIMEOUT until `router`
+    has enough samples of the backend.
+    """
+    if not settings.LLM_TIMEOUT_ADAPTIVE:
+        return settings.LLM_HTTP_TIMEOUT
+    latency = router.latency(Backend(provider, model), settings.LLM_TIMEOUT_PERCENTILE)
+    if latency is None:
+        return settings.LLM_HTTP_TIMEOUT
+    return min(settings.LLM_HTTP_TIMEOUT, max(settings.LLM_TIMEOUT_MIN_SECONDS, latency * settings.LLM_TIMEOUT_MULTIPLIER))
+
+
+async def _bounded(provider: str, model: str, call):
+    """Await an SDK call under the backend's adaptive timeout, inside the key lease so the key's breaker sees it."""
+    timeout = upstream_timeout(provider, model)
+    try:
+        return await asyncio.wait_for(call, timeout)
+    except asyncio.TimeoutError:
+        _TIMEOUTS.labels(provider).inc()
+        raise asyncio.TimeoutError(f"{provider} {model} gave no answer within {timeout:.1f}s") from None
+
+
+@contextmanager
+def _observed(provider: str, model: str):
+    """Record latency, outcome and concurrency of one upstream call."""
+    prompt = metrics.current_prompt_label()
+    in_flight = _LLM_IN_FLIGHT.labels(provider)
+    in_flight.inc()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except (asyncio.CancelledError, GeneratorExit):
+        outcome = "cancelled"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        in_flight.dec()
+        _LLM_LATENCY.labels(provider, model, prompt).observe(elapsed)
+        _LLM_REQUESTS.labels(provider, model, prompt, outcome).inc()
+        if outcome != "cancelled":
+            router.observe(provider, model, elapsed, outcome == "ok")
+
+
+def _instrumented(provider: str):
+    """Wrap a sync, async or streaming `fn(prompt, model, **kwargs)` in `_observed`."""
+    def decorate(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def stream(prompt: str, model: str, **kwargs):
+                with _observed(provider, model):
+                    async for item in fn(prompt, model, **kwargs):
+                        yield item
+            return stream
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def call(prompt: str, model: str, **kwargs):
+                with _observed(provider, model):
+                    return await fn(prompt, model, **kwargs)
+            return call
+
+        @functools.wraps(fn)
+        def sync_call(prompt: str, model: str, **kwargs):
+            with _observed(provider, model):
+                return fn(prompt, model, **kwargs)
+        return sync_call
+    return decorate
+
+
+def _resilient(provider: str):
+    """
+    Put a sync, async or streaming `fn(prompt, model, **kwargs)` behind the
+    provider's circuit breaker and retry budget.
+
+    Every attempt needs the breaker's admission, else `CircuitOpenError` is raised
+    without calling out. Timeouts, connection errors, 5xx and 429 answers are
+    retried up to LLM_MAX_RETRIES times with full-jitter backoff while the
+    provider's retry budget allows. Streams are not retried.
+    """
+    def admit(attempt: int):
+        if not breakers[provider].allow():
+            _CIRCUIT_REJECTIONS.labels(provider).inc()
+            raise CircuitOpenError(f"{provider} circuit breaker is open")
+        if not attempt:
+            retry_budgets[provider].record_call()
+
+    def settle(exc: Optional[BaseException]):
+        breaker = breakers[provider]
+        if exc is None:
+            breaker.record(True)
+        elif isinstance(exc, Exception) and is_upstream_failure(exc):
+            breaker.record(False)
+        else:
+            # Client errors, bad JSON and cancellations say nothing about the provider's health.
+            breaker.release_probe()
+
+    def retry_delay(exc: BaseException, attempt: int) -> Optional[float]:
+        if not isinstance(exc, Exception) or attempt >= settings.LLM_MAX_RETRIES or not is_retryable(exc):
+            return None
+        if not retry_budgets[provider].try_spend():
+            _RETRIES_DENIED.labels(provider).inc()
+            return None
+        _RETRIES.labels(provider).inc()
+        return backoff_delay(attempt, settings.LLM_RETRY_BASE_SECONDS, settings.LLM_RETRY_MAX_SECONDS)
+
+    def decorate(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def stream(prompt: str, model: str, **kwargs):
+                admit(0)
+                try:
+                    async for item in fn(prompt, model, **kwargs):
+                        yield item
+                except BaseException as exc:
+                    settle(exc)
+                    raise
+                settle(None)
+            return stream
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def call(prompt: str, model: str, **kwargs):
+                attempt = 0
+                while True:
+                    admit(attempt)
+                    try:
+                        result = await fn(prompt, model, **kwargs)
+                    except BaseException as exc:
+                        settle(exc)
+                        delay = retry_delay(exc, attempt)
+                        if delay is None:
+                            raise
+                        attempt += 1
+                        await asyncio.sleep(delay)
+                        continue
+                    settle(None)
+                    return result
+            return call
+
+        @functools.wraps(fn)
+        def sync_call(prompt: str, model: str, **kwargs):
+            attempt = 0
+            while True:
+                admit(attempt)
+                try:
+                    result = fn(prompt, model, **kwargs)
+                except BaseException as exc:
+                    settle(exc)
+                    delay = retry_delay(exc, attempt)
+                    if delay is None:
+                        raise
+                    attempt += 1
+                    time.sleep(delay)
+                    continue
+                settle(None)
+                return result
+        return sync_call
+    return decorate
+
+
+async def _deduplicated(provider: str, prompt: str, model: str, kwargs: dict, call):
+    """Identical in-flight requests (provider, model, prompt, sampling params) share one upstream call."""
+    if not settings.LLM_SINGLE_FLIGHT_ENABLED:
+        return await call(prompt, model, **kwargs)
+    key = (
+        provider,
+        model,
+        hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        json.dumps(kwargs, sort_keys=True, default=str),
+    )
+    return await single_flight.do(key, lambda: call(prompt, model, **kwargs))
+
+
+# Cassettes record the raw SDK responses, so replay still runs parsing, JSON
+# repair and usage accounting. The adaptive timeout is left out of the key.
+def _dump_response(response):
+    return response.model_dump(mode="json", exclude_none=True)
+
+
+def _load_chat_completion(value):
+    from openai.types.chat import ChatCompletion
+
+    return ChatCompletion.model_validate(value)
+
+
+def _load_google_response(value):
+    from google.genai.types import GenerateContentResponse
+
+    return GenerateContentResponse.model_validate(value)
+
+
+def _chat_key(name: str):
+    def key(client, model: str, messages, timeout=None, **kwargs):
+        return cassette.call_key(name, [model, messages], kwargs)
+    return key
+
+
+def _google_key(name: str):
+    def key(client, model: str, contents: str, config):
+        return cassette.call_key(name, [model, contents, config.temperature, config.top_p])
+    return key
+
+
+@cassette.recorded("llm.openai", key=_chat_key("llm.openai"), encode=_dump_response, decode=_load_chat_completion)
+def _openai_create(client, **request):
+    return client.chat.completions.create(**request)
+
+
+@cassette.recorded("llm.openai", key=_chat_key("llm.openai"), encode=_dump_response, decode=_load_chat_completion)
+async def _aopenai_create(client, **request):
+    return await client.chat.completions.create(**request)
+
+
+@cassette.recorded("llm.nvidia", key=_chat_key("llm.nvidia"), encode=_dump_response, decode=_load_chat_completion)
+def _nvidia_create(client, **request):
+    return client.chat.completions.create(**request)
+
+
+@cassette.recorded("llm.nvidia", key=_chat_key("llm.nvidia"), encode=_dump_response, decode=_load_chat_completion)
+async def _anvidia_create(client, **request):
+    return await client.chat.completions.create(**request)
+
+
+@cassette.recorded("llm.google", key=_google_key("llm.google"), encode=_dump_response, decode=_load_google_response)
+def _google_generate(client, model: str, contents: str, config):
+    return client.models.generate_content(model=model, contents=contents, config=config)
+
+
+@cassette.recorded("llm.google", key=_google_key("llm.google"), encode=_dump_response, decode=_load_google_response)
+async def _agoogle_generate(client, model: str, contents: str, config):
+    return await client.aio.models.generate_content(model=model, contents=contents, config=config)
+
+
+@cassette.recorded(
+    "llm.google.stream", key=_google_key("llm.google.stream"), encode=_dump_response, decode=_load_google_response,
+)
+async def _agoogle_stream(client, model: str, contents: str, config):
+    # Bounds the wait for the response headers; the chunks arrive under LLM_HTTP_TIMEOUT.
+    stream = await _bounded("google", model, client.aio.models.generate_content_stream(
+        model=model, contents=contents, config=config
+    ))
+    async for chunk in stream:
+        yield chunk
+
+
+@_resilient("openai")
+@_instrumented("openai")
+def generate_openai(prompt: str, model: str, **kwargs):
+    """Generate content using OpenAI API."""
+    with settings.openai_keys.lease(_estimate_tokens(prompt)) as lease:
+        client = get_openai_client(lease.key)
+        response = _openai_create(
+            client,
+            model=model,
+            messages=_openai_messages(prompt),
+            timeout=upstream_timeout("openai", model),
+            **kwargs,
+        )
+        lease.record_usage(_openai_usage(response))
+    return _parse_openai_response(response)
+
+
+async def agenerate_openai(prompt: str, model: str, **kwargs):
+    """Async variant of `generate_openai`; runs on the event loop without a worker thread."""
+    return await _deduplicated("openai", prompt, model, kwargs, _agenerate_openai)
+
+
+@_resilient("openai")
+@_instrumented("openai")
+async def _agenerate_openai(prompt: str, model: str, **kwargs):
+    async with settings.openai_keys.alease(_estimate_tokens(prompt)) as lease:
+        client = get_async_openai_client(lease.key)
+        response = await _bounded("openai", model, _aopenai_create(
+            client,
+            model=model,
+            messages=_openai_messages(prompt),
+            **kwargs,
+        ))
+        lease.record_usage(_openai_usage(response))
+    return _parse_openai_response(response)
+
+
+@_resilient("nvidia")
+@_instrumented("nvidia")
+def generate_nvidia(prompt: str, model: str, **kwargs):
+    """Generate content using NVIDIA API."""
+    with settings.nvidia_keys.lease(_estimate_tokens(prompt)) as lease:
+        client = get_nvidia_client(lease.key)
+        response = _nvidia_create(
+            client,
+            model=model,
+            messages=_nvidia_messages(prompt),
+            timeout=upstream_timeout("nvidia", model),
+            **kwargs
+        )
+        lease.record_usage(_openai_usage(response))
+    return _parse_nvidia_response(response)
+
+
+async def agenerate_nvidia(prompt: str, model: str, **kwargs):
+    """Async variant of `generate_nvidia`."""
+    return await _deduplicated("nvidia", prompt, model, kwargs, _agenerate_nvidia)
+
+
+@_resilient("nvidia")
+@_instrumented("nvidia")
+async def _agenerate_nvidia(prompt: str, model: str, **kwargs):
+    async with settings.nvidia_keys.alease(_estimate_tokens(prompt)) as lease:
+        client = get_async_nvidia_client(lease.key)
+        response = await _bounded("nvidia", model, _anvidia_create(
+            client,
+            model=model,
+            messages=_nvidia_messages(prompt),
+            **kwargs
+        ))
+        lease.record_usage(_openai_usage(response))
+    return _parse_nvidia_response(response)
+
+
+@_resilient("google")
+@_instrumented("google")
 def generate_google(prompt: str, model: str, **kwargs):
     """
     Generate content using Google GenAI with grounding (Google Search + URL Context).
@@ -91,34 +744,133 @@ def generate_google(prompt: str, model: str, **kwargs):
     This function uses the google-genai SDK with Tool objects for grounding.
     It processes grounding metadata and adds inline citations to the response.
     """
-    client = genai.Client(api_key=settings.google_api_key)
+    with settings.google_keys.lease(_estimate_tokens(prompt)) as lease:
+        client = get_google_client(lease.key)
 
-    # Define tools using Tool objects with GoogleSearch
-    tools = [
-        Tool(google_search=GoogleSearch()),
-    ]
+        # Generate content with grounding
+        response = _google_generate(
+            client,
+            model=model,
+            contents=prompt,
+            config=_google_config(kwargs, upstream_timeout("google", model))
+        )
+        lease.record_usage(_google_usage(response))
+    return _parse_google_response(response)
 
-    # Create generation config with tools
-    config = GenerateContentConfig(
-        temperature=kwargs.get('temperature', 1),
-        top_p=kwargs.get('top_p', 1),
-        tools=tools
-    )
 
-    # Generate content with grounding
-    response = client.models.generate_content(
-        model=model,
-        contents=prompt,
-        config=config
-    )
-    
-    if not response.candidates:
-        raise ValueError("Google GenAI returned no candidates")
-    else:
-        candidate = response.candidates[0]
-        text = candidate.content.parts[0].text
-        cleaned_text = clean_llm_json(text) or ""
-        parsed_json = json.loads(cleaned_text)
+async def agenerate_google(prompt: str, model: str, **kwargs):
+    """Async variant of `generate_google` using the SDK's `client.aio` surface."""
+    return await _deduplicated("google", prompt, model, kwargs, _agenerate_google)
+
+
+@_resilient("google")
+@_instrumented("google")
+async def astream_google(prompt: str, model: str, **kwargs):
+    """
+    Stream the text of a Google GenAI response as it is generated.
+
+    Not deduplicated: every caller consumes its own stream. The key lease is held
+    until the stream ends and is charged with the usage reported in the last chunk.
+    """
+    async with settings.google_keys.alease(_estimate_tokens(prompt)) as lease:
+        client = get_google_client(lease.key)
+        async for chunk in _agoogle_stream(client, model=model, contents=prompt, config=_google_config(kwargs)):
+            usage = _google_usage(chunk)
+            if usage:
+                lease.record_usage(usage)
+            text = _candidate_text(chunk.candidates[0]) if chunk.candidates else ""
+            if text:
+                yield text
+
+
+@_resilient("google")
+@_instrumented("google")
+async def _agenerate_google(prompt: str, model: str, **kwargs):
+    async with settings.google_keys.alease(_estimate_tokens(prompt)) as lease:
+        client = get_google_client(lease.key)
+
+        response = await _bounded("google", model, _agoogle_generate(
+            client,
+            model=model,
+            contents=prompt,
+            config=_google_config(kwargs)
+        ))
+        lease.record_usage(_google_usage(response))
+    return _parse_google_response(response)
+
+
+def _provider_call(provider: str, deduplicated: bool = True):
+    # Looked up per call rather than bound at import, so replacing e.g.
+    # `llm_hub.agenerate_nvidia` (benchmarks, tests) also affects routed calls.
+    return globals()[f"agenerate_{provider}" if deduplicated else f"_agenerate_{provider}"]
+
+
+async def agenerate_routed(label: str, prompt: str, provider: str, model: str, **kwargs):
+    """
+    Generate for prompt `label` on the best of its equivalent backends.
+
+    `provider`/`model` is the backend the caller would use on its own; LLM_ROUTES
+    can replace it with a list of equivalent "provider:model" backends, ranked by
+    `router` on observed latency and errors. With LLM_HEDGE_ENABLED a duplicate
+    goes to the next backend once the first has run past its hedge delay (its
+    p95 latency); the first answer wins and the other call is cancelled. A failed
+    first call fails over to the next backend, and backends whose provider circuit
+    breaker is open go last.
+    """
+    candidates = router.candidates(label, Backend(provider.lower(), model))
+    # A backend behind an open circuit breaker would only fail fast; try the others first.
+    candidates = sorted(candidates, key=lambda backend: breakers[backend.provider].state == OPEN)
+    if len(candidates) == 1:
+        primary = candidates[0]
+        return await _provider_call(primary.provider)(prompt, primary.model, **kwargs)
+    return await _hedged(label, candidates[0], candidates[1], prompt, kwargs)
+
+
+async def _hedged(label: str, primary: Backend, secondary: Backend, prompt: str, kwargs: dict):
+    # The primary goes through single-flight, which cancels the upstream call when this was its only caller;
+    # the duplicate is a direct call, so whichever loses is cancelled.
+    first = asyncio.ensure_future(_provider_call(primary.provider)(prompt, primary.model, **kwargs))
+    second = None
+    try:
+        if settings.LLM_HEDGE_ENABLED:
+            await asyncio.wait({first}, timeout=router.hedge_delay(primary))
+        else:
+            await asyncio.wait({first})
+        if first.done() and not first.exception():
+            return first.result()
+
+        second = asyncio.ensure_future(_provider_call(secondary.provider, deduplicated=False)(prompt, secondary.model, **kwargs))
+        pending = {first, second}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in (first, second):
+                if task in done and not task.exception():
+                    if first.done() and first.exception() is not None:
+                        _FAILOVERS.labels(label).inc()
+                    else:
+                        _HEDGES.labels(label, "primary" if task is first else "hedge").inc()
+                    return task.result()
+        raise first.exception()
+    finally:
+        for task in (first, second):
+            if task is not None and not task.done():
+                task.cancel()
 
-        return parsed_json
 
+def resilience_stats():
+    """Circuit breakers, retry budgets and current adaptive timeouts, for /diagnostics/breakers."""
+    return {
+        "providers": {
+            provider: {"breaker": breakers[provider].stats(), "retry_budget": retry_budgets[provider].stats()}
+            for provider in _PROVIDERS
+        },
+        "keys": {
+            provider: [{"key": key["key"], **key["breaker"]} for key in scheduler.stats()]
+            for provider, scheduler in (
+                ("openai", settings.openai_keys), ("nvidia", settings.nvidia_keys), ("google", settings.google_keys)
+            )
+        },
+        "timeouts_seconds": {
+            str(backend): round(upstream_timeout(*backend), 3) for backend in router.backends()
+        },
+    }
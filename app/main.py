@@ -3,17 +3,44 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
-from app.api import users, groups, recommendations, plans
-from app import prompt_hub    
-from dotenv import load_dotenv
+from app.core.loop_monitor import RequestContextMiddleware, loop_monitor
+from app.api import users, groups, recommendations, plans, jobs, diagnostics, metrics
+from app import prompt_hub, llm_hub
+from app.jobs.process_group import coalescer
+from app.jobs.queue import job_queue
+from app.services import supabase_async
+import asyncio
 import logging
-load_dotenv() 
+import time
+
+def warmup():
+    """Create the lazily initialized SDK clients and fetch the common prompts; anything missed is created on first use."""
+    start = time.perf_counter()
+    try:
+        llm_hub.warmup()
+        prompt_hub.warmup(settings.STARTUP_WARMUP_PROMPTS)
+    except Exception:
+        logging.getLogger(__name__).exception("Warmup failed after %.2fs", time.perf_counter() - start)
+        return
+    logging.getLogger(__name__).info("Warmup finished in %.2fs", time.perf_counter() - start)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    prompt_hub.langfuse
+    if settings.LOOP_MONITOR_ENABLED:
+        await loop_monitor.start()
+    if settings.STARTUP_WARMUP == "blocking":
+        await asyncio.to_thread(warmup)
+    elif settings.STARTUP_WARMUP == "background":
+        # Held on app.state so the task isn't garbage collected while it runs.
+        app.state.warmup = asyncio.create_task(asyncio.to_thread(warmup))
+    await job_queue.start()
     logging.getLogger(__name__).info("Application lifespan started")
     yield
+    await job_queue.stop()
+    await coalescer.stop()
+    await llm_hub.close_clients()
+    await supabase_async.aclose()
+    await loop_monitor.stop()
     logging.getLogger(__name__).info("Application lifespan ended")
 
 def create_app():
@@ -31,6 +58,7 @@ def create_app():
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(RequestContextMiddleware)
 
     @app.get("/api/v1/health")
     async def healthcheck():
@@ -40,6 +68,9 @@ def create_app():
     app.include_router(groups.router, prefix="/api/v1")
     app.include_router(recommendations.router, prefix="/api/v1")
     app.include_router(plans.router, prefix="/api/v1")
+    app.include_router(jobs.router, prefix="/api/v1")
+    app.include_router(diagnostics.router, prefix="/api/v1")
+    app.include_router(metrics.router)
 
     logging.getLogger(__name__).info("Routers registered. Backend ready.")
     return app
@@ -27,6 +27,7 @@ class GroupResponse(BaseModel):
     name: str
     creator_id: str
     destination: str
+    job_id: Optional[str] = None
 
 
 class MemberAdd(BaseModel):
@@ -37,6 +38,7 @@ class MemberResponse(BaseModel):
     group_id: str
     user_id: str
     role: str
+    job_id: Optional[str] = None
 
 
 class GroupTraitsResponse(BaseModel):
@@ -1,33 +1,250 @@
-import os
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
 from langfuse import Langfuse, observe
 from jinja2 import Template
+from app.core import cassette, metrics
 from app.core.config import settings
 from contextlib import nullcontext
 
-langfuse = Langfuse(
-    public_key=settings.LANGFUSE_PUBLIC_KEY,
-    secret_key=settings.LANGFUSE_SECRET_KEY,
-    host=settings.LANGFUSE_BASE_URL,
+logger = logging.getLogger(__name__)
+
+_langfuse: Optional[Langfuse] = None
+_langfuse_lock = threading.Lock()
+
+
+def get_langfuse() -> Langfuse:
+    """The shared Langfuse client, created on first use rather than at import."""
+    global _langfuse
+    if _langfuse is None:
+        with _langfuse_lock:
+            if _langfuse is None:
+                client = Langfuse(
+                    public_key=settings.LANGFUSE_PUBLIC_KEY,
+                    secret_key=settings.LANGFUSE_SECRET_KEY,
+                    host=settings.LANGFUSE_BASE_URL,
+                )
+                # Compatibility: some code uses `langfuse.trace(...)` as a context manager (JS-style API).
+                # The Python SDK v3 does not expose this; provide a no-op context manager to avoid runtime errors.
+                if not hasattr(client, "trace"):
+                    def _trace_stub(*args, **kwargs):
+                        return nullcontext()
+                    setattr(client, "trace", _trace_stub)
+                _langfuse = client
+    return _langfuse
+
+
+def __getattr__(name: str):
+    # `prompt_hub.langfuse` keeps working for callers and builds the client on first access.
+    if name == "langfuse":
+        return get_langfuse()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@cassette.recorded(
+    "langfuse.get_prompt",
+    key=lambda client, label, fetch_timeout_seconds: cassette.call_key("langfuse.get_prompt", [label]),
+    fallback=False,
+    encode=list,
+    decode=tuple,
 )
+def _load_prompt(client, label: str, fetch_timeout_seconds: int) -> Tuple[Any, Any, Any]:
+    """(template_str, config, version) of the production prompt `label` from the prompt store."""
+    # The registry owns caching, so bypass the SDK's own prompt cache.
+    prompt_obj = client.get_prompt(
+        label,
+        label="production",
+        cache_ttl_seconds=0,
+        fetch_timeout_seconds=fetch_timeout_seconds,
+    )
+    # For current Langfuse SDKs, prompt_obj.prompt is typically the template string.
+    template_str = getattr(prompt_obj, "prompt", prompt_obj)
+    return template_str, getattr(prompt_obj, "config", None), getattr(prompt_obj, "version", None)
+
+
+def _content_hash(template_str: str) -> str:
+    return hashlib.sha256(template_str.encode("utf-8")).hexdigest()
 
-# Compatibility: some code uses `langfuse.trace(...)` as a context manager (JS-style API).
-# The Python SDK v3 does not expose this; provide a no-op context manager to avoid runtime errors.
-if not hasattr(langfuse, "trace"):
-    def _trace_stub(*args, **kwargs):
-        return nullcontext()
-    setattr(langfuse, "trace", _trace_stub)
 
+@dataclass
+class _PromptEntry:
+    template_str: str
+    config: Any
+    version: Optional[int]
+    content_hash: str
+    fetched_at: float
 
-def get_prompt(label: str):
+
+class PromptRegistry:
     """
-    Fetch a prompt from Langfuse by label and normalize it to (template_str, config).
+    In-memory cache of Langfuse prompts keyed by label.
+
+    Fresh entries are served straight from memory. Entries older than the TTL are
+    still served while a background thread refreshes them, so a slow or unavailable
+    Langfuse never sits on the request path once a label has been fetched once.
+    Compiled Jinja templates are kept per content hash so each prompt version is
+    compiled exactly once. Without a `client` the shared Langfuse client is used.
     """
-    prompt_obj = langfuse.get_prompt(label , label="production")
-    # For current Langfuse SDKs, prompt_obj.prompt is typically the template string.
-    template_str = getattr(prompt_obj, "prompt", prompt_obj)
-    config = getattr(prompt_obj, "config", None)
-    return template_str, config
+
+    def __init__(self, client, ttl_seconds: float, fetch_timeout_seconds: int, max_templates: int = 256):
+        self._client = client
+        self._ttl = ttl_seconds
+        self._fetch_timeout = fetch_timeout_seconds
+        self._max_templates = max_templates
+        self._entries: Dict[str, _PromptEntry] = {}
+        self._templates: Dict[str, Template] = {}
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.template_compiles = 0
+
+    def _fetch(self, label: str) -> _PromptEntry:
+        template_str, config, version = _load_prompt(self._client or get_langfuse(), label, self._fetch_timeout)
+        entry = _PromptEntry(
+            template_str=template_str,
+            config=config,
+            version=version,
+            content_hash=_content_hash(template_str) if isinstance(template_str, str) else "",
+            fetched_at=time.monotonic(),
+        )
+        if isinstance(template_str, str):
+            self.compile(template_str, entry.content_hash)
+        with self._lock:
+            self._entries[label] = entry
+        return entry
+
+    def _refresh(self, label: str):
+        try:
+            self._fetch(label)
+            self.refreshes += 1
+        except Exception:
+            self.refresh_errors += 1
+            entry = self._entries.get(label)
+            if entry is not None:
+                # Back off before the next attempt instead of retrying on every request.
+                entry.fetched_at = time.monotonic() - self._ttl + min(self._ttl, 30.0)
+            logger.warning("prompt_registry: refresh failed label=%s; serving last known good", label, exc_info=True)
+        finally:
+            with self._lock:
+                self._refreshing.discard(label)
+
+    def _schedule_refresh(self, label: str):
+        with self._lock:
+            if label in self._refreshing:
+                return
+            self._refreshing.add(label)
+        threading.Thread(target=self._refresh, args=(label,), name=f"prompt-refresh-{label}", daemon=True).start()
+
+    def get(self, label: str) -> _PromptEntry:
+        entry = self._entries.get(label)
+        if entry is None:
+            self.misses += 1
+            return self._fetch(label)
+
+        self.hits += 1
+        if time.monotonic() - entry.fetched_at >= self._ttl:
+            self.stale_hits += 1
+            self._schedule_refresh(label)
+        return entry
+
+    def compile(self, template_str: str, content_hash: Optional[str] = None) -> Template:
+        key = content_hash or _content_hash(template_str)
+        template = self._templates.get(key)
+        if template is None:
+            template = Template(template_str)
+            self.template_compiles += 1
+            with self._lock:
+                if len(self._templates) >= self._max_templates:
+                    self._templates.pop(next(iter(self._templates)))
+                self._templates[key] = template
+        return template
+
+    def has(self, label: str) -> bool:
+        """Whether `label` is cached, fresh or stale, so `get` returns without fetching."""
+        return label in self._entries
+
+    @staticmethod
+    def version_key(entry: _PromptEntry) -> str:
+        return f"{entry.version}:{entry.content_hash[:16]}"
+
+    def version_of(self, label: str) -> str:
+        """Stable identifier of the cached prompt version, for use in cache keys."""
+        return self.version_key(self._entries.get(label) or self.get(label))
+
+    def invalidate(self, label: Optional[str] = None):
+        with self._lock:
+            if label is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(label, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "template_compiles": self.template_compiles,
+            "cached_labels": sorted(self._entries),
+            "compiled_templates": len(self._templates),
+        }
+
+
+registry = PromptRegistry(
+    None,
+    ttl_seconds=settings.PROMPT_CACHE_TTL_SECONDS,
+    fetch_timeout_seconds=settings.PROMPT_FETCH_TIMEOUT_SECONDS,
+)
+
+
+def get_prompt(label: str) -> Tuple[Any, Any]:
+    """
+    Fetch a prompt by label through the registry and normalize it to (template_str, config).
+
+    The label is recorded for the current task so the LLM call that follows is
+    attributed to it in /metrics.
+    """
+    metrics.set_prompt_label(label)
+    return _fetch(label)
+
+def _fetch(label: str) -> Tuple[Any, Any]:
+    entry = registry.get(label)
+    return entry.template_str, entry.config
+
+async def aget_prompt(label: str) -> Tuple[Any, Any]:
+    """
+    Async `get_prompt`: cached labels are served inline, a cold fetch runs in a thread
+    so it never blocks the event loop.
+    """
+    metrics.set_prompt_label(label)
+    if registry.has(label):
+        return _fetch(label)
+    return await asyncio.to_thread(_fetch, label)
+
+async def aprompt_version(label: str) -> str:
+    # Does not set the metrics prompt label: only the version is needed here.
+    entry = registry.get(label) if registry.has(label) else await asyncio.to_thread(registry.get, label)
+    return registry.version_key(entry)
 
 def render_prompt(template_str: str, **kwargs):
-    template = Template(template_str)
+    template = registry.compile(template_str)
     return template.render(**kwargs)
+
+
+def warmup(labels):
+    """Create the Langfuse client and fetch `labels` into the registry; failures are logged, not raised."""
+    get_langfuse()
+    for label in labels:
+        try:
+            registry.get(label)
+        except Exception as exc:
+            logger.warning("prompt_hub: warmup fetch failed label=%s: %s", label, exc)
@@ -0,0 +1,150 @@
+import copy
+import json
+import logging
+import random
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Read-through cache of rarely changing rows for app.services.supabase_async.
+# Users are stored once by id; the email index only maps an email to that id,
+# so invalidating a user also retires every lookup path to it.
+groups = TTLCache(settings.ENTITY_CACHE_MAX_ENTRIES, settings.ENTITY_CACHE_TTL_SECONDS)
+group_members = TTLCache(settings.ENTITY_CACHE_MAX_ENTRIES, settings.ENTITY_CACHE_TTL_SECONDS)
+users = TTLCache(settings.ENTITY_CACHE_MAX_ENTRIES, settings.ENTITY_CACHE_TTL_SECONDS)
+user_emails = TTLCache(settings.ENTITY_CACHE_MAX_ENTRIES, settings.ENTITY_CACHE_TTL_SECONDS)
+
+# A read that started before an invalidation can finish after it. Readers take
+# `read_stamp()` before querying and pass it to `put_*`; a fill is skipped when
+# its key was invalidated after the stamp was taken.
+_names = {id(groups): "group", id(group_members): "group_members", id(users): "user", id(user_emails): "user_email"}
+_invalidated = TTLCache(settings.ENTITY_CACHE_MAX_ENTRIES, settings.ENTITY_CACHE_TTL_SECONDS)
+_sequence = 0
+
+_consistency = {"verified": 0, "mismatches": 0, "stale_fills_skipped": 0}
+
+
+def _get(cache: TTLCache, key: str) -> Any:
+    if not settings.ENTITY_CACHE_ENABLED:
+        return None
+    value = cache.get(key)
+    # Routers return and extend these rows; never hand out the cached object itself.
+    return copy.deepcopy(value) if value is not None else None
+
+
+def read_stamp() -> int:
+    return _sequence
+
+
+def _invalidate(cache: TTLCache, key: str):
+    global _sequence
+    _sequence += 1
+    _invalidated.set((_names[id(cache)], key), _sequence)
+    cache.delete(key)
+
+
+def _put(cache: TTLCache, key: str, value: Any, stamp: Optional[int] = None):
+    if not settings.ENTITY_CACHE_ENABLED or value is None:
+        return
+    if stamp is not None and _invalidated.get((_names[id(cache)], key), 0) > stamp:
+        _consistency["stale_fills_skipped"] += 1
+        return
+    cache.set(key, copy.deepcopy(value))
+
+
+def get_group(group_id: str) -> Optional[dict]:
+    return _get(groups, group_id)
+
+
+def put_group(group: Optional[dict], stamp: Optional[int] = None):
+    if group:
+        _put(groups, group["id"], group, stamp)
+
+
+def get_group_members(group_id: str) -> Optional[List[dict]]:
+    return _get(group_members, group_id)
+
+
+def put_group_members(group_id: str, members: List[dict], stamp: Optional[int] = None):
+    _put(group_members, group_id, members, stamp)
+
+
+def get_user(user_id: str) -> Optional[dict]:
+    return _get(users, user_id)
+
+
+def get_user_by_email(email: str) -> Optional[dict]:
+    user_id = _get(user_emails, email)
+    return get_user(user_id) if user_id else None
+
+
+def get_users(user_ids: Iterable[str]) -> Tuple[Dict[str, dict], List[str]]:
+    """Cached rows by id, plus the ids that still have to be fetched."""
+    found, missing = {}, []
+    for user_id in user_ids:
+        user = get_user(user_id)
+        if user is None:
+            missing.append(user_id)
+        else:
+            found[user_id] = user
+    return found, missing
+
+
+def put_user(user: Optional[dict], stamp: Optional[int] = None):
+    if not user:
+        return
+    _put(users, user["id"], user, stamp)
+    if user.get("email"):
+        _put(user_emails, user["email"], user["id"], stamp)
+
+
+def invalidate_user(user_id: Optional[str] = None, email: Optional[str] = None):
+    if user_id:
+        _invalidate(users, user_id)
+    if email:
+        _invalidate(user_emails, email)
+
+
+def invalidate_group(group_id: str):
+    _invalidate(groups, group_id)
+
+
+def invalidate_group_members(group_id: str):
+    _invalidate(group_members, group_id)
+
+
+def should_verify() -> bool:
+    rate = settings.ENTITY_CACHE_VERIFY_RATE
+    return rate > 0 and random.random() < rate
+
+
+def record_verification(kind: str, key: str, cached: Any, fresh: Any, stamp: Optional[int] = None) -> bool:
+    """Compare a served cache hit with the database row; a mismatch replaces the entry."""
+    _consistency["verified"] += 1
+    if json.dumps(cached, sort_keys=True, default=str) == json.dumps(fresh, sort_keys=True, default=str):
+        return True
+    _consistency["mismatches"] += 1
+    logger.warning("entity_cache: stale %s served key=%s", kind, key)
+    cache = {"group": groups, "group_members": group_members, "user": users}[kind]
+    cache.delete(key)
+    if fresh is not None:
+        _put(cache, key, fresh, stamp)
+    return False
+
+
+def clear():
+    for cache in (groups, group_members, users, user_emails, _invalidated):
+        cache.clear()
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "enabled": settings.ENTITY_CACHE_ENABLED,
+        "groups": groups.stats(),
+        "group_members": group_members.stats(),
+        "users": users.stats(),
+        "user_emails": user_emails.stats(),
+        "consistency": {**_consistency, "verify_rate": settings.ENTITY_CACHE_VERIFY_RATE},
+    }
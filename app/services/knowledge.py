@@ -1,18 +1,37 @@
 from app import prompt_hub, llm_hub
-from app.services import supabase as db
+from app.core import prompt_payload
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services import supabase_async as db
 from langfuse import Langfuse, observe
+import copy
+import hashlib
+import json
+import logging
 import uuid
+from collections import Counter
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# (graph, summary) per canonical member-persona set and prompt versions.
+_kn_memo = TTLCache(settings.KN_MEMO_MAX_ENTRIES, settings.KN_MEMO_TTL_SECONDS)
+
+# Per group: member count covered by the last full generation and incremental
+# updates applied since, written only after a successful generation. Unknown or
+# expired groups (e.g. after a restart) get a full run.
+_kn_lineage = TTLCache(settings.KN_MEMO_MAX_ENTRIES, settings.KN_MEMO_TTL_SECONDS)
+_update_modes = Counter()
+
 @observe(name="knowledge_generation_llm_call")
-def generate_kn(group_members: list):
+async def generate_kn(group_members: list):
     # get_prompt now returns (template_str, config)
-    template_str, prompt_config = prompt_hub.get_prompt("KN_generator")
+    template_str, prompt_config = await prompt_hub.aget_prompt("KN_generator")
 
     # Render prompt with group member data
     rendered_prompt = prompt_hub.render_prompt(
         template_str,
-        INPUT_DATA=group_members,
+        **prompt_payload.compact("KN_generator", INPUT_DATA=group_members),
     )
 
     # Extract model/temperature from config following your working pattern
@@ -27,8 +46,10 @@ def generate_kn(group_members: list):
     if not model_name:
         raise ValueError("Prompt config missing 'model' for KN_generator prompt")
 
-    response = llm_hub.generate_nvidia(
+    response = await llm_hub.agenerate_routed(
+        "KN_generator",
         rendered_prompt,
+        "nvidia",
         model=model_name,
         temperature=temperature,
         top_p=top_p,
@@ -37,14 +58,14 @@ def generate_kn(group_members: list):
     return response
 
 @observe(name="knowledge_summary_llm_call")
-def generate_kn_summary(kn_data: dict):
+async def generate_kn_summary(kn_data: dict):
     # get_prompt now returns (template_str, config)
-    template_str, prompt_config = prompt_hub.get_prompt("KN_Summerise")
+    template_str, prompt_config = await prompt_hub.aget_prompt("KN_Summerise")
 
     # Render prompt with KN graph/subgraph JSON
     rendered_prompt = prompt_hub.render_prompt(
         template_str,
-        GRAPH_SUBGRAPH_JSON=str(kn_data),
+        **prompt_payload.compact("KN_Summerise", GRAPH_SUBGRAPH_JSON=kn_data),
     )
 
     model_name = None
@@ -58,11 +79,134 @@ def generate_kn_summary(kn_data: dict):
     if not model_name:
         raise ValueError("Prompt config missing 'model' for KN_Summerise prompt")
 
-    response = llm_hub.generate_nvidia(
+    response = await llm_hub.agenerate_routed(
+        "KN_Summerise",
         rendered_prompt,
+        "nvidia",
         model=model_name,
         temperature=temperature,
         top_p=top_p,
     )
 
     return response
+
+
+def _members_fingerprint(group_members: list, prompt_versions: dict) -> str:
+    # Member order is irrelevant to the graph, so canonicalize each member and sort.
+    members = sorted(
+        json.dumps(
+            {"persona_traits": m.get("persona_traits"), "ai_summary": m.get("ai_summary")},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        for m in group_members
+    )
+    # The payload settings change the rendered prompts as much as a new prompt version does.
+    material = json.dumps(
+        [members, sorted(prompt_versions.items()), prompt_payload.fingerprint()], separators=(",", ":")
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+async def generate_group_knowledge(group_members: list, group_id: str = None):
+    """
+    Return (kn_data, kn_summary) for a set of member personas.
+
+    Reuses the stored graph and summary, skipping both NVIDIA calls, when the same
+    persona set was processed before with the same prompt versions. Passing
+    `group_id` records the full generation as the base for incremental updates.
+    """
+    prompt_versions = {
+        "KN_generator": await prompt_hub.aprompt_version("KN_generator"),
+        "KN_Summerise": await prompt_hub.aprompt_version("KN_Summerise"),
+    }
+    key = _members_fingerprint(group_members, prompt_versions)
+    cached = _kn_memo.get(key)
+    if cached is not None:
+        logger.info("generate_group_knowledge: memo hit members=%d", len(group_members))
+        kn_data, kn_summary = copy.deepcopy(cached)
+    else:
+        kn_data = await generate_kn(group_members)
+        kn_summary = await generate_kn_summary(kn_data)
+        _kn_memo.set(key, copy.deepcopy((kn_data, kn_summary)))
+    if group_id is not None:
+        _kn_lineage.set(group_id, {"members": len(group_members), "incremental": 0})
+    return kn_data, kn_summary
+
+
+@observe(name="knowledge_incremental_llm_call")
+async def update_kn(existing_graph: dict, new_member: dict):
+    template_str, prompt_config = await prompt_hub.aget_prompt("KN_incremental_update")
+
+    rendered_prompt = prompt_hub.render_prompt(
+        template_str,
+        **prompt_payload.compact("KN_incremental_update", GRAPH_JSON=existing_graph, NEW_MEMBER_DATA=new_member),
+    )
+
+    model_name = None
+    temperature = 0.7
+    top_p = 1
+
+    if prompt_config:
+        model_name = prompt_config.get("model", model_name)
+        temperature = float(prompt_config.get("tempreature", temperature))
+
+    if not model_name:
+        raise ValueError("Prompt config missing 'model' for KN_incremental_update prompt")
+
+    return await llm_hub.agenerate_routed(
+        "KN_incremental_update",
+        rendered_prompt,
+        "nvidia",
+        model=model_name,
+        temperature=temperature,
+        top_p=top_p,
+    )
+
+
+async def add_member_knowledge(group_id: str, group_members: list, new_member: dict):
+    """
+    Return (kn_data, kn_summary) after `new_member` joined `group_id`.
+
+    Feeds only the latest stored graph plus the new persona to the model, so the
+    prompt no longer grows with every member. Falls back to a full regeneration
+    when incremental mode is off, no base graph or lineage is known, the member
+    count drifted from the lineage, or KN_FULL_REFRESH_EVERY updates have been
+    applied since the last full run.
+    """
+    lineage = _kn_lineage.get(group_id)
+    reason = None
+    if not settings.KN_INCREMENTAL_ENABLED:
+        reason = "disabled"
+    elif lineage is None:
+        reason = "no_lineage"
+    elif lineage["members"] + lineage["incremental"] + 1 != len(group_members):
+        reason = "member_drift"
+    elif lineage["incremental"] >= settings.KN_FULL_REFRESH_EVERY:
+        reason = "scheduled_full_refresh"
+    else:
+        latest_graph = await db.get_latest_knowledge_graph(group_id)
+        if not latest_graph or not latest_graph.get("graph_json"):
+            reason = "no_base_graph"
+
+    if reason is None:
+        try:
+            kn_data = await update_kn(latest_graph["graph_json"], new_member)
+            kn_summary = await generate_kn_summary(kn_data)
+            _kn_lineage.set(group_id, {**lineage, "incremental": lineage["incremental"] + 1})
+            _update_modes["incremental"] += 1
+            logger.info("add_member_knowledge: incremental update group_id=%s members=%d",
+                        group_id, len(group_members))
+            return kn_data, kn_summary
+        except Exception:
+            logger.exception("add_member_knowledge: incremental update failed group_id=%s", group_id)
+            reason = "incremental_failed"
+
+    _update_modes[f"full:{reason}"] += 1
+    logger.info("add_member_knowledge: full regeneration group_id=%s reason=%s", group_id, reason)
+    return await generate_group_knowledge(group_members, group_id=group_id)
+
+
+def memo_stats():
+    return {**_kn_memo.stats(), "lineage_groups": len(_kn_lineage), "update_modes": dict(_update_modes)}
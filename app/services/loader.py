@@ -0,0 +1,48 @@
+import asyncio
+from app.services import supabase_async as db
+
+
+async def load_user_groups(user_id: str):
+    """
+    Load every group of a user with its members and plans in a constant number of
+    queries: groups (2), memberships, member users and plans (1 each), independent
+    of how many groups and members there are. Users shared across groups are
+    fetched once; memberships and plans are fetched concurrently.
+    """
+    groups = await db.get_user_groups(user_id)
+    group_ids = [g["id"] for g in groups]
+
+    memberships, plans = await asyncio.gather(
+        db.get_group_memberships(group_ids),
+        db.get_plans_for_groups(group_ids),
+    )
+    user_ids = list(dict.fromkeys(m["user_id"] for m in memberships))
+    users_by_id = {u["id"]: u for u in await db.get_users_full_by_ids(user_ids)}
+
+    plans_by_group = {group_id: [] for group_id in group_ids}
+    for plan in plans:
+        plans_by_group.setdefault(plan["group_id"], []).append(plan)
+
+    members_by_group = {group_id: [] for group_id in group_ids}
+    for member in memberships:
+        member_user = users_by_id.get(member["user_id"])
+        if not member_user:
+            continue
+        members_by_group.setdefault(member["group_id"], []).append({
+            "id": member_user["id"],
+            "email": member_user["email"],
+            "name": member_user["name"],
+            # Defensive: ensure role exists (default to "member")
+            "role": member.get("role") or "member",
+            "persona_traits": member_user.get("persona_traits"),
+            "ai_summary": member_user.get("ai_summary"),
+        })
+
+    return [
+        {
+            "group": group,
+            "members": members_by_group[group["id"]],
+            "plans": plans_by_group[group["id"]],
+        }
+        for group in groups
+    ]
@@ -1,15 +1,24 @@
 from app import prompt_hub, llm_hub
+from app.core import json_extract, prompt_payload
+from app.core.json_stream import JSONStreamScanner
 from langfuse import observe
 
-@observe(name="plan_generation_llm_call")
-def generate_plan(kn_summary: dict, raw_data: dict):
-    template_str, prompt_config = prompt_hub.get_prompt("base_level_planner")
+# Paths in the planner's output reported while a plan is streamed.
+_OPTION_PATH = ("plan_options", "*")
+_DAY_PATH = ("plan_options", "*", "schedule", "*")
+
+
+async def _plan_request(kn_summary: dict, raw_data: dict):
+    template_str, prompt_config = await prompt_hub.aget_prompt("base_level_planner")
 
     rendered_prompt = prompt_hub.render_prompt(
         template_str,
-        USER_PROFILE_SUMMARY=kn_summary,
-        CITY_ACTIVITY_RESULTS=raw_data.get("short_trip"),
-        SHORT_TRIP_OPTIONS=raw_data.get("long_trip"),
+        **prompt_payload.compact(
+            "base_level_planner",
+            USER_PROFILE_SUMMARY=kn_summary,
+            CITY_ACTIVITY_RESULTS=raw_data.get("short_trip"),
+            SHORT_TRIP_OPTIONS=raw_data.get("long_trip"),
+        ),
     )
 
     model_name = "gemini-2.5-pro"
@@ -24,9 +33,40 @@ def generate_plan(kn_summary: dict, raw_data: dict):
     if not model_name:
         raise ValueError("Prompt config missing 'model' for base_level_planner prompt.")
 
-    return llm_hub.generate_google(
-        rendered_prompt,
-        model=model_name,
-        temperature=temperature,
-        top_p=top_p,
-    )
+    return rendered_prompt, {"model": model_name, "temperature": temperature, "top_p": top_p}
+
+
+@observe(name="plan_generation_llm_call")
+async def generate_plan(kn_summary: dict, raw_data: dict):
+    rendered_prompt, params = await _plan_request(kn_summary, raw_data)
+    return await llm_hub.agenerate_routed("base_level_planner", rendered_prompt, "google", **params)
+
+
+@observe(name="plan_generation_llm_stream")
+async def stream_plan(kn_summary: dict, raw_data: dict):
+    """
+    Streamed variant of `generate_plan` yielding `(event, data)` pairs:
+
+    - `("day", {"option_index", "day_index", "day"})` for each schedule entry
+    - `("option", {"option_index", "option"})` for each complete plan option
+    - `("plan", plan)` once, with the complete plan parsed from the full response
+
+    Chunks are normalized by a `JSONExtractor` before scanning, so repaired
+    output streams too. The final plan is parsed from the whole response exactly
+    as `generate_plan` parses it, so the stored result does not depend on how
+    the stream was chunked.
+    """
+    rendered_prompt, params = await _plan_request(kn_summary, raw_data)
+    extractor = json_extract.JSONExtractor()
+    scanner = JSONStreamScanner([_OPTION_PATH, _DAY_PATH])
+    chunks = []
+
+    async for text in llm_hub.astream_google(rendered_prompt, **params):
+        chunks.append(text)
+        for path, value in scanner.feed(extractor.feed(text)):
+            if len(path) == len(_DAY_PATH):
+                yield "day", {"option_index": path[1], "day_index": path[3], "day": value}
+            else:
+                yield "option", {"option_index": path[1], "option": value}
+
+    yield "plan", json_extract.loads("".join(chunks))
@@ -0,0 +1,73 @@
+import copy
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional
+from app.core import prompt_payload
+from app.core.cache import SQLiteCache, TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+memory = TTLCache(settings.REC_CACHE_MAX_ENTRIES, settings.REC_CACHE_TTL_SECONDS)
+persistent: Optional[SQLiteCache] = (
+    SQLiteCache(settings.REC_CACHE_SQLITE_PATH, settings.REC_CACHE_TTL_SECONDS, table="recommendations")
+    if settings.REC_CACHE_SQLITE_PATH
+    else None
+)
+
+
+def _normalize_summary(kn_summary: Any) -> str:
+    if isinstance(kn_summary, str):
+        return " ".join(kn_summary.split())
+    return json.dumps(kn_summary, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def make_key(kn_summary: Any, destination: str, date_bucket: str, prompt_versions: Dict[str, str]) -> str:
+    """Content address of a recommendation result."""
+    material = json.dumps(
+        [
+            _normalize_summary(kn_summary),
+            (destination or "").strip().lower(),
+            date_bucket,
+            sorted(prompt_versions.items()),
+            prompt_payload.fingerprint(),
+        ],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> Optional[dict]:
+    value = memory.get(key)
+    if value is None and persistent is not None:
+        entry = persistent.get_entry(key)
+        if entry is not None:
+            value, group_id = entry
+            # Keep the group tag so invalidate_group also evicts the promoted copy.
+            memory.set(key, value, tags=(group_id,) if group_id else ())
+    # Callers may patch branches in place; never hand out the cached object itself.
+    return copy.deepcopy(value) if value is not None else None
+
+
+def put(key: str, value: dict, group_id: Optional[str] = None):
+    tags = (group_id,) if group_id else ()
+    memory.set(key, copy.deepcopy(value), tags=tags)
+    if persistent is not None:
+        persistent.set(key, value, tag=group_id)
+
+
+def invalidate_group(group_id: str):
+    """Drop every cached result computed for a group; called when its summary changes."""
+    removed = memory.invalidate_tag(group_id)
+    if persistent is not None:
+        removed += persistent.invalidate_tag(group_id)
+    if removed:
+        logger.info("rec_cache: invalidated %d entries group_id=%s", removed, group_id)
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "memory": memory.stats(),
+        "persistent": persistent.stats() if persistent is not None else None,
+    }
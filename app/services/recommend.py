@@ -1,85 +1,189 @@
 from app import prompt_hub, llm_hub
+from app.core.config import settings
+from app.core import json_extract, prompt_payload
+from app.core.json_stream import JSONStreamScanner
+from app.services import rec_cache
 from langfuse import observe
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 import asyncio
+import logging
 
-async def generate_recommendations(kn_summary: dict, destination: str):
-    time_now = datetime.now()
+logger = logging.getLogger(__name__)
 
-    city_params = {
-        "city": destination,
-        "travel_profile": [time_now, time_now + timedelta(days=1)],
-    }
 
-    wide_params = {
-        "city": destination,
-        "travel_profile": [time_now, time_now + timedelta(days=3)],
-        "radius": "100-200 km",
-        "budget_per_person": "INR 5K - 10K",
-    }
-
-    # get_prompt returns (template_str, config); assumed fast/sync.
-    city_template, city_config = prompt_hub.get_prompt("spot_finder")
+async def _branch_request(label: str, kn_summary: dict, destination_context: dict):
+    template_str, prompt_config = await prompt_hub.aget_prompt(label)
 
-    city_rendered = prompt_hub.render_prompt(
-        city_template,
-        USER_PROFILE_SUMMARY=kn_summary,
-        DESTINATION_CONTEXT=city_params,
+    rendered_prompt = prompt_hub.render_prompt(
+        template_str,
+        **prompt_payload.compact(label, USER_PROFILE_SUMMARY=kn_summary, DESTINATION_CONTEXT=destination_context),
     )
 
-    city_model = None
-    city_temperature = 0.7
+    model_name = None
+    temperature = 0.7
 
-    if city_config:
-        city_model = city_config.get("model", city_model)
-        city_temperature = float(city_config.get("tempreature", city_temperature))
+    if prompt_config:
+        model_name = prompt_config.get("model", model_name)
+        temperature = float(prompt_config.get("tempreature", temperature))
 
-    if not city_model:
-        raise ValueError("Prompt config missing 'model' for spot_finder prompt")
+    if not model_name:
+        raise ValueError(f"Prompt config missing 'model' for {label} prompt")
 
-    loop = asyncio.get_running_loop()
+    return rendered_prompt, {"model": model_name, "temperature": temperature, "top_p": 1}
 
-    @observe(name="city_recommendations_llm_call")
-    def _gen_city():
-        return llm_hub.generate_google(
-            city_rendered,
-            model=city_model,
-            temperature=city_temperature,
-            top_p=1,
-        )
 
-    city_recs = await loop.run_in_executor(None, _gen_city)
+async def _generate_branch(label: str, kn_summary: dict, destination_context: dict):
+    rendered_prompt, params = await _branch_request(label, kn_summary, destination_context)
+    return await llm_hub.agenerate_routed(label, rendered_prompt, "google", **params)
 
-    wide_template, wide_config = prompt_hub.get_prompt("Serach_retrival")
 
-    wide_rendered = prompt_hub.render_prompt(
-        wide_template,
-        USER_PROFILE_SUMMARY=kn_summary,
-        DESTINATION_CONTEXT=wide_params,
-    )
+@observe(name="city_recommendations_llm_call")
+async def _gen_city(kn_summary: dict, city_params: dict):
+    return await _generate_branch("spot_finder", kn_summary, city_params)
+
+
+@observe(name="wide_recommendations_llm_call")
+async def _gen_wide(kn_summary: dict, wide_params: dict):
+    return await _generate_branch("Serach_retrival", kn_summary, wide_params)
+
 
-    wide_model = None
-    wide_temperature = 0.7
+_BRANCH_LABELS = ("spot_finder", "Serach_retrival")
 
-    if wide_config:
-        wide_model = wide_config.get("model", wide_model)
-        wide_temperature = float(wide_config.get("tempreature", wide_temperature))
 
-    if not wide_model:
-        raise ValueError("Prompt config missing 'model' for Serach_retrival prompt")
+async def _prepare(kn_summary: dict, destination: str):
+    """Cache key and destination contexts of the city and wide branches."""
+    # Bucketed to the day so the rendered prompts, and the cache key, are stable.
+    today = date.today()
+
+    prompt_versions = {label: await prompt_hub.aprompt_version(label) for label in _BRANCH_LABELS}
+    cache_key = rec_cache.make_key(kn_summary, destination, today.isoformat(), prompt_versions)
+
+    city_params = {
+        "city": destination,
+        "travel_profile": [today.isoformat(), (today + timedelta(days=1)).isoformat()],
+    }
+
+    wide_params = {
+        "city": destination,
+        "travel_profile": [today.isoformat(), (today + timedelta(days=3)).isoformat()],
+        "radius": "100-200 km",
+        "budget_per_person": "INR 5K - 10K",
+    }
+    return cache_key, city_params, wide_params
+
+
+async def generate_recommendations(kn_summary: dict, destination: str, group_id: str = None):
+    """
+    Run the city (short trip) and wide-range (long trip) branches concurrently.
+
+    Each branch has its own timeout and failure handling: a failed branch comes back
+    as None so callers can keep the other branch's real results. Raises only when
+    both branches fail.
+
+    Complete results are cached by (summary, destination, day, prompt versions);
+    `group_id` tags the entry so a new group summary invalidates it.
+    """
+    cache_key, city_params, wide_params = await _prepare(kn_summary, destination)
+    cached = rec_cache.get(cache_key)
+    if cached is not None:
+        logger.info("generate_recommendations: cache hit group_id=%s", group_id)
+        return cached
+
+    timeout = settings.RECOMMENDATION_BRANCH_TIMEOUT_SECONDS
+    city_recs, wide_recs = await asyncio.gather(
+        asyncio.wait_for(_gen_city(kn_summary, city_params), timeout),
+        asyncio.wait_for(_gen_wide(kn_summary, wide_params), timeout),
+        return_exceptions=True,
+    )
 
-    @observe(name="wide_recommendations_llm_call")
-    def _gen_wide():
-        return llm_hub.generate_google(
-            wide_rendered,
-            model=wide_model,
-            temperature=wide_temperature,
-            top_p=1,
-        )
+    errors = []
+    if isinstance(city_recs, BaseException):
+        logger.error("generate_recommendations: city branch failed", exc_info=city_recs)
+        errors.append(city_recs)
+        city_recs = None
+    if isinstance(wide_recs, BaseException):
+        logger.error("generate_recommendations: wide branch failed", exc_info=wide_recs)
+        errors.append(wide_recs)
+        wide_recs = None
 
-    wide_recs = await loop.run_in_executor(None, _gen_wide)
+    if len(errors) == 2:
+        raise errors[0]
 
-    return {
+    recommendations = {
         "short_trip": city_recs,
         "long_trip": wide_recs,
     }
+    if not errors:
+        rec_cache.put(cache_key, recommendations, group_id=group_id)
+    return recommendations
+
+
+# Entries of any top-level list in a branch result (e.g. `short_trip_destinations`).
+_DESTINATION_PATH = ("*", "*")
+
+
+@observe(name="recommendations_llm_stream")
+async def _stream_branch(branch: str, label: str, kn_summary: dict, destination_context: dict, queue: asyncio.Queue):
+    rendered_prompt, params = await _branch_request(label, kn_summary, destination_context)
+    extractor = json_extract.JSONExtractor()
+    scanner = JSONStreamScanner([_DESTINATION_PATH])
+    chunks = []
+    async for text in llm_hub.astream_google(rendered_prompt, **params):
+        chunks.append(text)
+        for (field, index), item in scanner.feed(extractor.feed(text)):
+            await queue.put(("destination", {"branch": branch, "field": field, "index": index, "item": item}))
+    return json_extract.loads("".join(chunks))
+
+
+async def stream_recommendations(kn_summary: dict, destination: str, group_id: str = None):
+    """
+    Streamed variant of `generate_recommendations` yielding `(event, data)` pairs:
+
+    - `("destination", {"branch", "field", "index", "item"})` for each entry of a
+      top-level list in a branch's output, as soon as it has been generated
+    - `("branch", {"branch", "data"})` when a branch is complete; `data` is None
+      when the branch failed or timed out
+    - `("done", {"cached": bool})` at the end
+
+    A cache hit yields both branches immediately; a run where both branches
+    succeed is cached exactly like `generate_recommendations`.
+    """
+    cache_key, city_params, wide_params = await _prepare(kn_summary, destination)
+    cached = rec_cache.get(cache_key)
+    if cached is not None:
+        logger.info("stream_recommendations: cache hit group_id=%s", group_id)
+        for branch in ("short_trip", "long_trip"):
+            yield "branch", {"branch": branch, "data": cached[branch]}
+        yield "done", {"cached": True}
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    results = {}
+    timeout = settings.RECOMMENDATION_BRANCH_TIMEOUT_SECONDS
+
+    async def run(branch: str, label: str, params: dict):
+        try:
+            results[branch] = await asyncio.wait_for(_stream_branch(branch, label, kn_summary, params, queue), timeout)
+        except Exception:
+            logger.exception("stream_recommendations: %s branch failed", branch)
+            results[branch] = None
+        await queue.put(("branch", {"branch": branch, "data": results[branch]}))
+
+    tasks = [
+        asyncio.create_task(run("short_trip", "spot_finder", city_params)),
+        asyncio.create_task(run("long_trip", "Serach_retrival", wide_params)),
+    ]
+    try:
+        finished = 0
+        while finished < len(tasks):
+            event, data = await queue.get()
+            if event == "branch":
+                finished += 1
+            yield event, data
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if all(results.get(branch) is not None for branch in ("short_trip", "long_trip")):
+        rec_cache.put(cache_key, {"short_trip": results["short_trip"], "long_trip": results["long_trip"]}, group_id=group_id)
+    yield "done", {"cached": False}
@@ -0,0 +1,390 @@
+"""
+Async counterpart of `app.services.supabase` for code running on the event loop.
+
+Queries go to PostgREST through one pooled `httpx.AsyncClient` that is sized and
+timed independently of the LLM clients, so database calls neither block the
+loop nor queue behind LLM calls in the default thread pool. Idempotent requests
+are retried on transport errors and gateway responses; writes are retried only
+when the request never reached the server.
+
+Group, membership and user reads go through `entity_cache`; the writes below
+invalidate exactly the entries they change.
+"""
+import asyncio
+import functools
+import logging
+import time
+from typing import Optional
+
+import httpx
+from postgrest import APIError, APIResponse, AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+
+from app.core import cassette, metrics
+from app.core.config import settings
+from app.core.loop_monitor import current_route
+from app.services import entity_cache, rec_cache
+
+logger = logging.getLogger(__name__)
+
+_RETRYABLE_STATUS = {502, 503, 504}
+# Failures where the request provably never reached PostgREST.
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+_DB_LATENCY = metrics.registry.histogram(
+    "db_call_duration_seconds", "Latency of supabase_async functions, retries included", ("function",)
+)
+_DB_REQUESTS = metrics.registry.counter(
+    "db_requests_total", "PostgREST round trips (attempts) per API route", ("route",)
+)
+_DB_ERRORS = metrics.registry.counter("db_call_errors_total", "supabase_async calls that raised", ("function",))
+
+_client: Optional[AsyncPostgrestClient] = None
+_stats = {"requests": 0, "retries": 0, "failures": 0}
+_verifications = set()
+
+
+def _create_client() -> AsyncPostgrestClient:
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            settings.SUPABASE_HTTP_TIMEOUT,
+            connect=settings.SUPABASE_CONNECT_TIMEOUT,
+            pool=settings.SUPABASE_POOL_TIMEOUT,
+        ),
+        follow_redirects=True,
+    )
+    headers = {
+        **DEFAULT_POSTGREST_CLIENT_HEADERS,
+        "apikey": settings.SUPABASE_ANON_KEY,
+        "Authorization": f"Bearer {settings.SUPABASE_ANON_KEY}",
+    }
+    return AsyncPostgrestClient(
+        f"{settings.SUPABASE_URL.rstrip('/')}/rest/v1",
+        headers=headers,
+        http_client=http_client,
+    )
+
+
+def client() -> AsyncPostgrestClient:
+    global _client
+    if _client is None:
+        _client = _create_client()
+    return _client
+
+
+async def aclose():
+    """Close the connection pool; called from the FastAPI lifespan."""
+    global _client
+    current, _client = _client, None
+    if current is not None:
+        await current.aclose()
+
+
+def stats():
+    return {
+        **_stats,
+        "max_connections": settings.SUPABASE_POOL_MAX_CONNECTIONS,
+        "max_retries": settings.SUPABASE_MAX_RETRIES,
+    }
+
+
+def _retryable(exc: Exception, idempotent: bool) -> bool:
+    if isinstance(exc, _NOT_SENT_ERRORS):
+        return True
+    if not idempotent:
+        return False
+    if isinstance(exc, APIError):
+        return exc.code in _RETRYABLE_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+
+def _request_group(query) -> str:
+    # Query shape without filter values: method, table, selected columns and filtered columns.
+    request = query.request
+    columns = ",".join(sorted(name for name in request.params.keys() if name != "select"))
+    table = request.path.path.rsplit("/", 1)[-1]
+    return f"{request.http_method.value} {table}?select={request.params.get('select', '')}&{columns}"
+
+
+def _request_key(query) -> str:
+    request = query.request
+    return cassette.call_key(_request_group(query), [sorted(request.params.multi_items()), request.json])
+
+
+def _replayed_error(error: dict):
+    if error["type"] == "APIError" and error["data"]:
+        return APIError(error["data"])
+    cls = getattr(httpx, error["type"], None)
+    if isinstance(cls, type) and issubclass(cls, httpx.TransportError):
+        return cls(error["message"])
+    return None
+
+
+@cassette.recorded(
+    "postgrest",
+    key=_request_key,
+    fallback=_request_group,
+    encode=lambda response: {"data": response.data, "count": response.count},
+    decode=lambda value: APIResponse(**value),
+    decode_error=_replayed_error,
+)
+async def _send(query):
+    return await query.execute()
+
+
+async def _execute(query, idempotent: bool = True):
+    attempt = 0
+    route = current_route()
+    while True:
+        _stats["requests"] += 1
+        _DB_REQUESTS.labels(route).inc()
+        try:
+            return await _send(query)
+        except (httpx.TransportError, APIError) as exc:
+            if attempt >= settings.SUPABASE_MAX_RETRIES or not _retryable(exc, idempotent):
+                _stats["failures"] += 1
+                raise
+            delay = settings.SUPABASE_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+            attempt += 1
+            _stats["retries"] += 1
+            logger.warning("supabase_async: %s; retry %d in %.2fs", type(exc).__name__, attempt, delay)
+            await asyncio.sleep(delay)
+
+
+def _timed(fn):
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        except Exception:
+            _DB_ERRORS.labels(name).inc()
+            raise
+        finally:
+            _DB_LATENCY.labels(name).observe(time.perf_counter() - start)
+    return wrapper
+
+
+def _table(name: str):
+    return client().table(name)
+
+
+def _verify_later(kind: str, key: str, cached, fetch):
+    """On a sampled cache hit, re-read the row in the background and record whether it was stale."""
+    if not entity_cache.should_verify():
+        return
+
+    async def verify():
+        stamp = entity_cache.read_stamp()
+        try:
+            fresh = await fetch(key)
+        except Exception:
+            logger.debug("supabase_async: cache verification failed kind=%s key=%s", kind, key, exc_info=True)
+            return
+        entity_cache.record_verification(kind, key, cached, fresh, stamp)
+
+    task = asyncio.create_task(verify())
+    _verifications.add(task)
+    task.add_done_callback(_verifications.discard)
+
+
+async def _fetch_user_by_email(email: str):
+    response = await _execute(_table("users").select("*").eq("email", email))
+    return response.data[0] if response.data else None
+
+
+async def _fetch_user_by_id(user_id: str):
+    response = await _execute(_table("users").select("*").eq("id", user_id))
+    return response.data[0] if response.data else None
+
+
+async def _fetch_group(group_id: str):
+    response = await _execute(_table("groups").select("*").eq("id", group_id))
+    return response.data[0] if response.data else None
+
+
+async def _fetch_group_members(group_id: str):
+    response = await _execute(_table("group_members").select("user_id").eq("group_id", group_id))
+    return response.data
+
+
+@_timed
+async def get_user_by_email(email: str):
+    cached = entity_cache.get_user_by_email(email)
+    if cached is not None:
+        _verify_later("user", cached["id"], cached, _fetch_user_by_id)
+        return cached
+    stamp = entity_cache.read_stamp()
+    user = await _fetch_user_by_email(email)
+    entity_cache.put_user(user, stamp)
+    return user
+
+@_timed
+async def insert_user(user_data: dict):
+    response = await _execute(_table("users").insert(user_data), idempotent=False)
+    entity_cache.invalidate_user(user_data.get("id"), user_data.get("email"))
+    return response.data
+
+@_timed
+async def get_group(group_id: str):
+    cached = entity_cache.get_group(group_id)
+    if cached is not None:
+        _verify_later("group", group_id, cached, _fetch_group)
+        return cached
+    stamp = entity_cache.read_stamp()
+    group = await _fetch_group(group_id)
+    entity_cache.put_group(group, stamp)
+    return group
+
+
+@_timed
+async def get_group_by_name(group_name: str):
+    response = await _execute(_table("groups").select("*").eq("name", group_name))
+    return response.data[0] if response.data else None
+
+@_timed
+async def insert_group(group_data: dict):
+    response = await _execute(_table("groups").insert(group_data), idempotent=False)
+    entity_cache.invalidate_group(group_data["id"])
+    return response.data
+
+@_timed
+async def get_group_member(group_id: str, user_id: str):
+    response = await _execute(_table("group_members").select("*").eq("group_id", group_id).eq("user_id", user_id))
+    return response.data[0] if response.data else None
+
+@_timed
+async def insert_group_member(member_data: dict):
+    response = await _execute(_table("group_members").insert(member_data), idempotent=False)
+    entity_cache.invalidate_group_members(member_data["group_id"])
+    return response.data
+
+@_timed
+async def get_group_members(group_id: str):
+    cached = entity_cache.get_group_members(group_id)
+    if cached is not None:
+        _verify_later("group_members", group_id, cached, _fetch_group_members)
+        return cached
+    stamp = entity_cache.read_stamp()
+    members = await _fetch_group_members(group_id)
+    entity_cache.put_group_members(group_id, members, stamp)
+    return members
+
+@_timed
+async def get_users_by_ids(user_ids: list):
+    # Fetch full rows for the ids not cached yet so they serve get_user_by_id too.
+    user_ids = list(dict.fromkeys(user_ids))
+    found, missing = entity_cache.get_users(user_ids)
+    stamp = entity_cache.read_stamp()
+    for user in await get_users_full_by_ids(missing):
+        entity_cache.put_user(user, stamp)
+        found[user["id"]] = user
+    return [
+        {"persona_traits": found[user_id].get("persona_traits"), "ai_summary": found[user_id].get("ai_summary")}
+        for user_id in user_ids
+        if user_id in found
+    ]
+
+@_timed
+async def insert_knowledge_graph(kg_data: dict):
+    response = await _execute(_table("knowledge_graphs").insert(kg_data), idempotent=False)
+    return response.data
+
+@_timed
+async def get_latest_knowledge_graph(group_id: str):
+    response = await _execute(
+        _table("knowledge_graphs")
+        .select("*")
+        .eq("group_id", group_id)
+        .order("updated_at", desc=True)
+        .limit(1)
+    )
+    return response.data[0] if response.data else None
+
+@_timed
+async def update_group_kn_summary(group_id: str, summary: dict):
+    response = await _execute(_table("groups").update({"ai_group_kn_summary": summary}).eq("id", group_id))
+    entity_cache.invalidate_group(group_id)
+    rec_cache.invalidate_group(group_id)
+    return response.data
+
+@_timed
+async def insert_job(job_data: dict):
+    response = await _execute(_table("jobs").insert(job_data), idempotent=False)
+    return response.data
+
+@_timed
+async def update_job(job_id: str, fields: dict):
+    response = await _execute(_table("jobs").update(fields).eq("id", job_id))
+    return response.data
+
+@_timed
+async def get_job(job_id: str):
+    response = await _execute(_table("jobs").select("*").eq("id", job_id))
+    return response.data[0] if response.data else None
+
+@_timed
+async def insert_trip_plan(plan_data: dict):
+    response = await _execute(_table("trip_plans").insert(plan_data), idempotent=False)
+    return response.data
+
+
+@_timed
+async def get_user_groups(user_id: str):
+    response = await _execute(_table("group_members").select("group_id").eq("user_id", user_id))
+    group_ids = [item["group_id"] for item in response.data]
+
+    if not group_ids:
+        return []
+
+    response = await _execute(_table("groups").select("*").in_("id", group_ids))
+    return response.data
+
+
+@_timed
+async def get_user_by_id(user_id: str):
+    cached = entity_cache.get_user(user_id)
+    if cached is not None:
+        _verify_later("user", user_id, cached, _fetch_user_by_id)
+        return cached
+    stamp = entity_cache.read_stamp()
+    user = await _fetch_user_by_id(user_id)
+    entity_cache.put_user(user, stamp)
+    return user
+
+
+@_timed
+async def get_group_plans(group_id: str):
+    response = await _execute(_table("trip_plans").select("*").eq("group_id", group_id))
+    return response.data
+
+
+@_timed
+async def get_group_memberships(group_ids: list):
+    if not group_ids:
+        return []
+    response = await _execute(_table("group_members").select("group_id, user_id, role").in_("group_id", group_ids))
+    return response.data
+
+
+@_timed
+async def get_users_full_by_ids(user_ids: list):
+    if not user_ids:
+        return []
+    response = await _execute(_table("users").select("*").in_("id", user_ids))
+    return response.data
+
+
+@_timed
+async def get_plans_for_groups(group_ids: list):
+    if not group_ids:
+        return []
+    response = await _execute(_table("trip_plans").select("*").in_("group_id", group_ids))
+    return response.data
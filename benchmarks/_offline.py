@@ -0,0 +1,24 @@
+"""Environment defaults so benchmarks import the app without credentials or network."""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+OFFLINE_ENV = {
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_ANON_KEY": "bench",
+    "LANGFUSE_PUBLIC_KEY": "pk-bench",
+    "LANGFUSE_SECRET_KEY": "sk-bench",
+    "LANGFUSE_BASE_URL": "http://127.0.0.1:9",
+    "LANGFUSE_TRACING_ENABLED": "false",
+    "OTEL_SDK_DISABLED": "true",
+}
+
+
+def configure(**overrides):
+    """Apply offline defaults (existing env wins unless overridden) and put the repo on sys.path."""
+    for key, value in OFFLINE_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.update(overrides)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
@@ -0,0 +1,106 @@
+"""
+Database latency while LLM work saturates the default thread pool.
+
+Runs `--requests` concurrent request handlers, each doing three reads against
+the in-memory PostgREST stand-in, while `--llm-calls` blocking calls (modelled
+with time.sleep) occupy the default executor the way sync LLM clients did.
+Compared strategies:
+
+  executor  the sync supabase client via loop.run_in_executor (previous routers)
+  async     app.services.supabase_async on its own connection pool
+
+A final pass injects gateway errors to show reads being retried.
+
+    python benchmarks/bench_db_pool.py --requests 50 --llm-calls 64 --llm-ms 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import _offline
+from fakes.postgrest import PostgrestStandIn
+from fakes.server import ThreadedServer
+
+GROUP = {"id": "g1", "name": "Trip", "destination": "Goa", "creator_id": "u1", "ai_group_kn_summary": None}
+USER = {"id": "u1", "email": "a@example.com", "name": "A", "persona_traits": {}, "ai_summary": ""}
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _handler_executor(db):
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, db.get_group, "g1")
+    await loop.run_in_executor(None, db.get_group_members, "g1")
+    await loop.run_in_executor(None, db.get_user_by_id, "u1")
+
+
+async def _handler_async(db):
+    await db.get_group("g1")
+    await db.get_group_members("g1")
+    await db.get_user_by_id("u1")
+
+
+async def _run(handler, args):
+    loop = asyncio.get_running_loop()
+    llm = [loop.run_in_executor(None, time.sleep, args.llm_ms / 1000) for _ in range(args.llm_calls)]
+    await asyncio.sleep(0.01)
+
+    async def timed():
+        start = time.perf_counter()
+        await handler()
+        return (time.perf_counter() - start) * 1000
+
+    latencies = await asyncio.gather(*(timed() for _ in range(args.requests)))
+    await asyncio.gather(*llm)
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--llm-calls", type=int, default=64, help="blocking calls queued on the default executor")
+    parser.add_argument("--llm-ms", type=float, default=500.0)
+    parser.add_argument("--rtt-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    stand_in = PostgrestStandIn(
+        {"groups": [GROUP], "users": [USER], "group_members": [{"group_id": "g1", "user_id": "u1", "role": "creator"}]},
+        latency_ms=args.rtt_ms,
+    )
+    server = ThreadedServer(stand_in.app).start()
+    _offline.configure(SUPABASE_URL=server.url, SUPABASE_RETRY_BACKOFF_SECONDS="0.01")
+
+    from app.services import supabase as sync_db
+    from app.services import entity_cache
+    from app.services import supabase_async as async_db
+
+    print(f"{'strategy':<9} | {'p50':>8} | {'p95':>8} | {'max':>8}")
+    try:
+        for name, handler in (
+            ("executor", lambda: _handler_executor(sync_db)),
+            ("async", lambda: _handler_async(async_db)),
+        ):
+            latencies = await _run(handler, args)
+            print(f"{name:<9} | {statistics.median(latencies):>6.0f}ms | "
+                  f"{_percentile(latencies, 0.95):>6.0f}ms | {max(latencies):>6.0f}ms")
+
+        # The handlers above left g1 in the entity cache; the read must reach the stand-in.
+        entity_cache.clear()
+        retries = async_db.stats()["retries"]
+        stand_in.fail_next(2, status=503)
+        group = await async_db.get_group("g1")
+        retried = async_db.stats()["retries"] - retries
+        print(f"\nretry: read succeeded after injected 503s={group is not None}, retries={retried}, "
+              f"stats={async_db.stats()}")
+        assert group is not None and retried == 2, "expected the read to succeed after exactly 2 retries"
+    finally:
+        await async_db.aclose()
+        server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,337 @@
+"""
+Offline end-to-end load test of the whole trip-planning journey.
+
+Runs the real app (lifespan on: job workers, loop monitor) over HTTP against
+local stand-ins for every dependency: OpenAI and NVIDIA chat completions,
+Gemini, the Langfuse prompt store and PostgREST. Each session signs up
+`--members` users, creates a group, adds the other members, waits for the
+knowledge jobs, fetches recommendations and generates a plan; `--concurrency`
+sessions run at once.
+
+Provider latencies are "median_ms[:p99_ms[:error_rate[:status]]]" specs drawn
+from a log-normal distribution (see fakes/latency.py). The report gives
+throughput, p50/p99 per step, failures, LLM calls per provider, database round
+trips and process resource use (the stand-ins share the process, so CPU and
+memory include them). `--output` saves the report as JSON; `--baseline`
+compares against a saved report and exits 1 when throughput drops or a p50/p99
+grows by more than `--tolerance`.
+
+With CASSETTE_MODE=record the run also writes a cassette (app.core.cassette);
+CASSETTE_MODE=replay then serves every provider, prompt and database call from
+it, and CASSETTE_LATENCY_SCALE=0 leaves only the app's own CPU time.
+
+    python benchmarks/bench_e2e.py --sessions 40 --concurrency 8 --gemini 600:3000:0.01:503
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import _offline
+from fakes.gemini import GeminiStandIn
+from fakes.langfuse import PromptStore, label_of
+from fakes.latency import LatencyModel
+from fakes.openai import OpenAIStandIn
+from fakes.postgrest import PostgrestStandIn
+from fakes.server import ThreadedServer
+
+STEPS = ("POST /users", "POST /groups", "POST /groups/{id}/members", "knowledge job",
+         "GET /groups/{id}/recommendations", "POST /groups/{id}/plan", "session")
+
+
+def _digest(prompt: str) -> str:
+    # Distinct prompts get distinct answers, so caches and memos see realistic keys.
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+
+
+def _respond(prompt: str) -> str:
+    label, tag = label_of(prompt), _digest(prompt)
+    if label == "user_intrest":
+        document = {
+            "top_traits": ["explorer", "foodie", "planner"],
+            "factor_scores": {"adventure": 0.7, "comfort": 0.4, "budget": 0.5},
+            "profile_summary": f"Traveller {tag} who likes street food and short hikes.",
+        }
+    elif label in ("KN_generator", "KN_incremental_update"):
+        document = {
+            "nodes": [{"id": f"{tag}-{i}", "type": "interest", "label": f"Interest {i}"} for i in range(8)],
+            "edges": [{"source": f"{tag}-{i}", "target": f"{tag}-{i + 1}", "weight": 0.5} for i in range(7)],
+        }
+    elif label == "KN_Summerise":
+        document = {"group_vibe": f"Group {tag}", "shared_interests": ["food", "nature"], "budget": "mid"}
+    elif label == "spot_finder":
+        document = {"base_city": "Bangalore", "spots": [
+            {"destination_name": f"Spot {i}", "key_highlights": ["Food street", "Heritage walk"],
+             "estimated_cost_per_person": "INR 1,500"} for i in range(6)]}
+    elif label == "Serach_retrival":
+        document = {"base_city": "Bangalore", "short_trip_destinations": [
+            {"destination_name": f"Trip {i}", "distance_from_base_km": str(60 + 40 * i),
+             "key_highlights": ["Sunrise viewpoint", "Waterfall"]} for i in range(5)]}
+    elif label == "base_level_planner":
+        document = {"plan_options": [
+            {"title": f"Option {o}", "schedule": [
+                {"day": d + 1, "activities": ["Breakfast", "Sightseeing", "Dinner"]} for d in range(3)]}
+            for o in range(3)]}
+    else:
+        document = {}
+    return json.dumps(document, indent=2)
+
+
+def _percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class _Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def ok(self, step: str, seconds: float):
+        self.samples[step].append(seconds)
+
+    def error(self, step: str, reason: str):
+        self.errors[step][reason] += 1
+
+
+class _SessionFailed(Exception):
+    pass
+
+
+async def _timed(recorder: _Recorder, step: str, request, expect=(200, 202)):
+    start = time.perf_counter()
+    try:
+        response = await request
+    except Exception as e:
+        recorder.error(step, type(e).__name__)
+        raise _SessionFailed(step)
+    if response.status_code not in expect:
+        recorder.error(step, str(response.status_code))
+        raise _SessionFailed(step)
+    recorder.ok(step, time.perf_counter() - start)
+    return response.json()
+
+
+async def _await_job(client, recorder: _Recorder, job_id: str, started: float, poll: float):
+    while True:
+        response = await client.get(f"/api/v1/jobs/{job_id}")
+        status = response.json().get("status") if response.status_code == 200 else str(response.status_code)
+        if status == "SUCCESS":
+            recorder.ok("knowledge job", time.perf_counter() - started)
+            return
+        if status not in ("PENDING", "RUNNING"):
+            recorder.error("knowledge job", status)
+            raise _SessionFailed("knowledge job")
+        await asyncio.sleep(poll)
+
+
+async def _session(client, recorder: _Recorder, index: int, members: int, poll: float):
+    start = time.perf_counter()
+    emails = [f"s{index}-u{m}@bench.local" for m in range(members)]
+    try:
+        await asyncio.gather(*(
+            _timed(recorder, "POST /users", client.post("/api/v1/users", json={
+                "email": email, "name": email.split("@")[0], "user_answer": {"q1": f"answer {index}.{m}"},
+            }))
+            for m, email in enumerate(emails)
+        ))
+        enqueued = time.perf_counter()
+        group = await _timed(recorder, "POST /groups", client.post("/api/v1/groups", json={
+            "group_name": f"bench-{index}", "destination": "Bangalore", "creator_email": emails[0],
+        }))
+        jobs = [(group["job_id"], enqueued)]
+        for email in emails[1:]:
+            enqueued = time.perf_counter()
+            member = await _timed(recorder, "POST /groups/{id}/members",
+                                  client.post(f"/api/v1/groups/{group['id']}/members", json={"user_email": email}))
+            jobs.append((member["job_id"], enqueued))
+        await asyncio.gather(*(_await_job(client, recorder, job_id, at, poll) for job_id, at in jobs))
+
+        recommendations = await _timed(recorder, "GET /groups/{id}/recommendations",
+                                       client.get(f"/api/v1/groups/{group['id']}/recommendations"))
+        await _timed(recorder, "POST /groups/{id}/plan",
+                     client.post(f"/api/v1/groups/{group['id']}/plan", json={"raw_data": recommendations}))
+    except _SessionFailed as e:
+        recorder.error("session", f"failed at {e}")
+        return
+    recorder.ok("session", time.perf_counter() - start)
+
+
+def _usage():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss / 1024  # CPU seconds, max RSS in MiB (Linux: KiB)
+
+
+async def _run(args, api, openai, nvidia, gemini, database, prompts):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency * 4, max_keepalive_connections=args.concurrency * 4)
+    async with httpx.AsyncClient(base_url=api.url, timeout=300, limits=limits) as client:
+        for i in range(args.warmup):
+            await _session(client, _Recorder(), -1 - i, args.members, args.poll_seconds)
+        for stand_in in (openai, nvidia, gemini):
+            stand_in.requests.clear()
+            stand_in.failures = 0
+        database.reset_counts()
+
+        recorder = _Recorder()
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def bounded(index: int):
+            async with semaphore:
+                await _session(client, recorder, index, args.members, args.poll_seconds)
+
+        cpu_before, _ = _usage()
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded(i) for i in range(args.sessions)))
+        elapsed = time.perf_counter() - start
+        cpu_after, max_rss = _usage()
+    # Fresh connection: uvicorn drops keep-alive connections after an unhandled error.
+    async with httpx.AsyncClient(base_url=api.url) as client:
+        loop = (await client.get("/api/v1/diagnostics/loop")).json()
+        cassette = (await client.get("/api/v1/diagnostics/cassette")).json()
+
+    completed = len(recorder.samples["session"])
+    return {
+        "config": {key: getattr(args, key) for key in (
+            "sessions", "concurrency", "members", "openai", "nvidia", "gemini", "db_ms", "seed")},
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_sessions_per_second": round(completed / elapsed, 4) if elapsed else 0.0,
+        "steps": {
+            step: {
+                "count": len(recorder.samples[step]),
+                "errors": dict(recorder.errors[step]),
+                "p50_seconds": round(_percentile(recorder.samples[step], 0.5), 4),
+                "p99_seconds": round(_percentile(recorder.samples[step], 0.99), 4),
+            }
+            for step in STEPS
+        },
+        "llm_calls": {
+            "openai": sum(openai.requests.values()),
+            "nvidia": sum(nvidia.requests.values()),
+            "google": sum(gemini.requests.values()),
+            "injected_failures": openai.failures + nvidia.failures + gemini.failures,
+        },
+        "db_round_trips": database.round_trips,
+        "prompt_store_fetches": sum(prompts.fetches.values()),
+        "cassette": cassette,
+        "resources": {
+            "cpu_seconds": round(cpu_after - cpu_before, 3),
+            "cpu_ms_per_session": round((cpu_after - cpu_before) / max(completed, 1) * 1000, 1),
+            "max_rss_mib": round(max_rss, 1),
+            "threads": threading.active_count(),
+            "loop_lag_p99_seconds": loop["lag_p99_seconds"],
+            "loop_blocks": loop["blocks"],
+        },
+    }
+
+
+def _print_report(report: dict):
+    print(f"{report['config']}")
+    print(f"\n{report['steps']['session']['count']} sessions in {report['elapsed_seconds']:.2f}s "
+          f"-> {report['throughput_sessions_per_second']:.2f} sessions/s\n")
+    print(f"{'step':<36} {'count':>6} {'errors':>7} {'p50':>8} {'p99':>8}")
+    for step, row in report["steps"].items():
+        errors = sum(row["errors"].values())
+        print(f"{step:<36} {row['count']:>6} {errors:>7} {row['p50_seconds']:>7.3f}s {row['p99_seconds']:>7.3f}s")
+        for reason, count in sorted(row["errors"].items()):
+            print(f"{'':<38}{count} x {reason}")
+    llm = report["llm_calls"]
+    print(f"\nLLM calls: openai={llm['openai']} nvidia={llm['nvidia']} google={llm['google']} "
+          f"(injected failures {llm['injected_failures']})")
+    print(f"DB round trips: {report['db_round_trips']}, prompt store fetches: {report['prompt_store_fetches']}")
+    res = report["resources"]
+    print(f"CPU {res['cpu_seconds']:.2f}s ({res['cpu_ms_per_session']:.1f}ms/session), max RSS {res['max_rss_mib']:.0f} MiB, "
+          f"{res['threads']} threads, loop lag p99 {res['loop_lag_p99_seconds'] * 1000:.1f}ms, "
+          f"{res['loop_blocks']} loop blocks")
+    cassette = report["cassette"]
+    if cassette["mode"] == "record":
+        print(f"cassette: recorded {cassette['recorded']} calls to {cassette['path']}")
+    elif cassette["mode"] == "replay":
+        print(f"cassette: replayed {cassette['replayed_exact']} exact and {cassette['replayed_sequential']} "
+              f"sequential matches, {cassette['misses']} misses")
+
+
+def _regressions(report: dict, baseline: dict, tolerance: float):
+    found = []
+    before, after = baseline["throughput_sessions_per_second"], report["throughput_sessions_per_second"]
+    if before and after < before * (1 - tolerance):
+        found.append(f"throughput {before:.3f} -> {after:.3f} sessions/s")
+    for step, row in report["steps"].items():
+        old = baseline["steps"].get(step)
+        if not old:
+            continue
+        for field in ("p50_seconds", "p99_seconds"):
+            if old[field] and row[field] > old[field] * (1 + tolerance):
+                found.append(f"{step} {field[:3]} {old[field]:.3f}s -> {row[field]:.3f}s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--members", type=int, default=3, help="users per group, creator included")
+    parser.add_argument("--warmup", type=int, default=1, help="sessions run before measuring")
+    parser.add_argument("--openai", default="300:1200", help="OpenAI latency spec")
+    parser.add_argument("--nvidia", default="800:3000", help="NVIDIA latency spec")
+    parser.add_argument("--gemini", default="600:2500", help="Gemini time-to-first-token spec")
+    parser.add_argument("--gemini-chars-per-second", type=float, default=4000.0)
+    parser.add_argument("--db-ms", type=float, default=5.0, help="PostgREST round-trip latency")
+    parser.add_argument("--debounce-seconds", type=float, default=0.1, help="KN_REFRESH_DEBOUNCE_SECONDS")
+    parser.add_argument("--poll-seconds", type=float, default=0.05, help="job status polling interval")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    openai = OpenAIStandIn(_respond, LatencyModel.parse(args.openai, seed=args.seed))
+    nvidia = OpenAIStandIn(_respond, LatencyModel.parse(args.nvidia, seed=args.seed + 1))
+    gemini = GeminiStandIn(_respond, chars_per_second=args.gemini_chars_per_second,
+                           latency=LatencyModel.parse(args.gemini, seed=args.seed + 2))
+    database = PostgrestStandIn(latency_ms=args.db_ms)
+    servers = [ThreadedServer(stand_in.app).start() for stand_in in (openai, nvidia, gemini, database)]
+    openai_server, nvidia_server, gemini_server, database_server = servers
+
+    # Settings are read at import, so the stand-ins must be up before the app is imported.
+    _offline.configure(
+        SUPABASE_URL=database_server.url,
+        OPENAI_BASE_URL=openai_server.url, OPENAI_API_KEYS="bench-openai-1,bench-openai-2",
+        NVIDIA_BASE_URL=nvidia_server.url, NVIDIA_API_KEYS="bench-nvidia-1,bench-nvidia-2",
+        GOOGLE_BASE_URL=gemini_server.url, GOOGLE_API_KEYS="bench-google-1,bench-google-2",
+        JOB_STORE="memory", KN_REFRESH_DEBOUNCE_SECONDS=str(args.debounce_seconds),
+    )
+    from app.main import app
+
+    prompts = PromptStore().install()
+    api = ThreadedServer(app, lifespan="on").start()
+    try:
+        report = asyncio.run(_run(args, api, openai, nvidia, gemini, database, prompts))
+    finally:
+        api.stop()
+        for server in servers:
+            server.stop()
+
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = _regressions(report, json.load(f), args.tolerance)
+        print(f"\nagainst {args.baseline} (tolerance {args.tolerance:.0%}): "
+              f"{'no regressions' if not found else str(len(found)) + ' regression(s)'}")
+        for line in found:
+            print(" ", line)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
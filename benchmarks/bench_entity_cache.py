@@ -0,0 +1,98 @@
+"""
+Database round trips and hit ratio of the group/user read-through cache.
+
+Replays a read-heavy request mix against the in-memory PostgREST stand-in
+through app.services.supabase_async, once with ENTITY_CACHE_ENABLED=False and
+once with the cache on. Every `--write-every` requests a member joins a group
+(insert_group_member + update_group_kn_summary), so the cached pass also pays
+for invalidations. A final pass changes a row behind the app's back with
+ENTITY_CACHE_VERIFY_RATE=1 to show stale reads being detected.
+
+    python benchmarks/bench_entity_cache.py --requests 500 --groups 20 --users 100
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import _offline
+from fakes.postgrest import PostgrestStandIn
+from fakes.server import ThreadedServer
+
+
+def _seed(groups: int, users: int) -> dict:
+    rng = random.Random(0)
+    user_rows = [{"id": f"u{i}", "email": f"user{i}@example.com", "name": f"User {i}",
+                  "persona_traits": {"traits": ["food"]}, "ai_summary": "likes food"} for i in range(users)]
+    group_rows = [{"id": f"g{g}", "name": f"Group {g}", "destination": "Goa", "creator_id": "u0",
+                   "ai_group_kn_summary": {"v": 0}} for g in range(groups)]
+    members = [{"group_id": g["id"], "user_id": u["id"], "role": "member"}
+               for g in group_rows for u in rng.sample(user_rows, 6)]
+    return {"users": user_rows, "groups": group_rows, "group_members": members}
+
+
+async def _request_mix(db, rng: random.Random, args, stand_in):
+    for i in range(args.requests):
+        group_id = f"g{rng.randrange(args.groups)}"
+        if args.write_every and i % args.write_every == args.write_every - 1:
+            user_id = f"u{rng.randrange(args.users)}"
+            await db.insert_group_member({"group_id": group_id, "user_id": user_id, "role": "member"})
+            await db.update_group_kn_summary(group_id, {"v": i})
+            continue
+        # GET /groups/{id}/traits followed by POST /groups/{id}/recommendations
+        await db.get_group(group_id)
+        members = await db.get_group_members(group_id)
+        await db.get_users_by_ids([m["user_id"] for m in members])
+        await db.get_user_by_email(f"user{rng.randrange(args.users)}@example.com")
+        await db.get_group(group_id)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--write-every", type=int, default=25)
+    parser.add_argument("--rtt-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    stand_in = PostgrestStandIn(latency_ms=args.rtt_ms)
+    server = ThreadedServer(stand_in.app).start()
+    _offline.configure(SUPABASE_URL=server.url)
+
+    from app.core.config import settings
+    from app.services import entity_cache
+    from app.services import supabase_async as db
+
+    print(f"{'cache':<5} | {'round trips':>11} | {'wall':>8} | {'hit ratio':>9}")
+    try:
+        for enabled in (False, True):
+            settings.ENTITY_CACHE_ENABLED = enabled
+            entity_cache.clear()
+            stand_in.tables = _seed(args.groups, args.users)
+            stand_in.reset_counts()
+            start = time.perf_counter()
+            await _request_mix(db, random.Random(1), args, stand_in)
+            wall = time.perf_counter() - start
+            caches = entity_cache.stats()
+            hits = sum(caches[name]["hits"] for name in ("groups", "group_members", "users"))
+            misses = sum(caches[name]["misses"] for name in ("groups", "group_members", "users"))
+            ratio = f"{hits / (hits + misses):.0%}" if enabled else "-"
+            print(f"{'on' if enabled else 'off':<5} | {stand_in.round_trips:>11} | {wall:>7.2f}s | {ratio:>9}")
+
+        # Consistency: a write made outside the app is caught by sampled verification.
+        settings.ENTITY_CACHE_VERIFY_RATE = 1.0
+        await db.get_group("g0")
+        await asyncio.sleep(0.2)
+        stand_in.tables["groups"][0]["name"] = "Renamed elsewhere"
+        await db.get_group("g0")
+        await asyncio.sleep(0.2)
+        healed = await db.get_group("g0")
+        print(f"\nconsistency: {entity_cache.stats()['consistency']}, healed={healed['name'] == 'Renamed elsewhere'}")
+    finally:
+        await db.aclose()
+        server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+"""
+Prompt size of incremental vs. full knowledge-graph updates, with modelled latency.
+
+For groups of 5, 20 and 50 members, the last member "joins" and the graph is
+updated twice through app.services.knowledge: once by full regeneration
+(all personas in the prompt) and once incrementally (latest graph + new
+persona). Prompts come from local stand-in templates, and the NVIDIA call is
+replaced by a latency model:
+
+    latency = base + prefill_ms_per_token * input_tokens + decode_ms_per_token * output_tokens
+
+Output sizes are identical in both modes (the model returns the whole graph),
+so the latency difference comes from prompt size alone and is small: decoding
+the graph dominates. The saving is in input tokens, i.e. cost and context use.
+
+    python benchmarks/bench_kn_incremental.py --sizes 5 20 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import _offline
+
+_offline.configure()
+
+TEMPLATES = {
+    "KN_generator": (
+        "You are building a group knowledge graph for a travel group. Merge the member "
+        "personas below into nodes (traits, preferences, constraints) and weighted edges. "
+        "Return JSON with `nodes` and `edges` only.\n\nMEMBERS:\n{{INPUT_DATA}}"
+    ),
+    "KN_incremental_update": (
+        "You maintain a travel group's knowledge graph. A new member joined. Update the "
+        "existing graph with their persona: add or re-weight nodes and edges, keep ids "
+        "stable. Return the complete updated graph JSON with `nodes` and `edges` only.\n\nGRAPH:\n{{GRAPH_JSON}}\n\n"
+        "NEW MEMBER:\n{{NEW_MEMBER_DATA}}"
+    ),
+    "KN_Summerise": "Summarise this group knowledge graph as JSON.\n\n{{GRAPH_SUBGRAPH_JSON}}",
+}
+
+TRAITS = [
+    "adventure", "culture", "food", "nightlife", "nature", "budget", "luxury", "history",
+    "photography", "relaxation", "shopping", "trekking", "beaches", "wildlife", "art",
+]
+
+
+class _Prompt:
+    def __init__(self, label):
+        self.prompt = TEMPLATES[label]
+        self.config = {"model": "bench-model"}
+        self.version = 1
+
+
+class _PromptStore:
+    def get_prompt(self, name, **kwargs):
+        return _Prompt(name)
+
+
+def _persona(rng: random.Random, i: int) -> dict:
+    scores = {t: round(rng.random(), 2) for t in rng.sample(TRAITS, 6)}
+    return {
+        "persona_traits": {"traits": sorted(scores, key=scores.get, reverse=True)[:3], "score": scores},
+        "ai_summary": (
+            f"Member {i} prefers {', '.join(list(scores)[:3])}; travels on a moderate budget, "
+            "likes planned mornings and free evenings, avoids long road trips, vegetarian-friendly food."
+        ),
+    }
+
+
+def _graph(members: list) -> dict:
+    """
+    Synthetic condensed graph: trait nodes with aggregate weights and member nodes
+    linked to their top traits. Re-measure with exported production graphs when
+    sizing real prompts.
+    """
+    totals = {}
+    for member in members:
+        for trait, weight in member["persona_traits"]["score"].items():
+            count, total = totals.get(trait, (0, 0.0))
+            totals[trait] = (count + 1, total + weight)
+    nodes = [
+        {"id": trait, "type": "trait", "members": count, "weight": round(total / count, 2)}
+        for trait, (count, total) in sorted(totals.items())
+    ]
+    nodes += [{"id": f"m{i}", "type": "member"} for i in range(len(members))]
+    edges = [
+        {"from": f"m{i}", "to": trait}
+        for i, member in enumerate(members)
+        for trait in member["persona_traits"]["traits"]
+    ]
+    return {"nodes": nodes, "edges": edges}
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+async def _run(size: int, args, knowledge, llm_hub, settings):
+    rng = random.Random(size)
+    members = [_persona(rng, i) for i in range(size)]
+    before, new_member = members[:-1], members[-1]
+    graph_before, graph_after = _graph(before), _graph(members)
+    summary = {"summary": "group summary"}
+    calls = []
+
+    async def fake_nvidia(prompt, model, **kwargs):
+        output = summary if prompt.startswith("Summarise") else graph_after
+        input_tokens, output_tokens = _tokens(prompt), _tokens(json.dumps(output))
+        latency_ms = args.base_ms + args.prefill_ms * input_tokens + args.decode_ms * output_tokens
+        await asyncio.sleep(latency_ms / 1000 * args.time_scale)
+        calls.append({"input": input_tokens, "output": output_tokens, "latency_ms": latency_ms})
+        return output
+
+    llm_hub.agenerate_nvidia = fake_nvidia
+    knowledge._kn_memo.clear()
+
+    async def latest_graph(group_id):
+        return {"graph_json": graph_before}
+
+    knowledge.db.get_latest_knowledge_graph = latest_graph
+
+    results = {}
+    for mode in ("full", "incremental"):
+        settings.KN_INCREMENTAL_ENABLED = mode == "incremental"
+        knowledge._kn_memo.clear()
+        knowledge._kn_lineage.set("bench", {"members": len(before), "incremental": 0})
+        calls.clear()
+        start = time.perf_counter()
+        await knowledge.add_member_knowledge("bench", members, new_member)
+        wall_ms = (time.perf_counter() - start) * 1000
+        graph_call = calls[0]
+        results[mode] = {
+            "prompt_tokens": graph_call["input"],
+            "modelled_ms": sum(c["latency_ms"] for c in calls),
+            "wall_ms": wall_ms,
+        }
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--base-ms", type=float, default=400.0)
+    parser.add_argument("--prefill-ms", type=float, default=0.15, help="ms per input token")
+    parser.add_argument("--decode-ms", type=float, default=12.0, help="ms per output token")
+    parser.add_argument("--time-scale", type=float, default=0.001, help="fraction of modelled latency actually slept")
+    args = parser.parse_args()
+
+    from app import prompt_hub, llm_hub
+    from app.core.config import settings
+    from app.services import knowledge
+
+    prompt_hub.registry._client = _PromptStore()
+
+    print(f"{'members':>7} | {'mode':<11} | {'prompt tokens':>13} | {'modelled latency':>16}")
+    for size in args.sizes:
+        results = await _run(size, args, knowledge, llm_hub, settings)
+        for mode, r in results.items():
+            print(f"{size:>7} | {mode:<11} | {r['prompt_tokens']:>13} | {r['modelled_ms'] / 1000:>15.2f}s")
+        saved = 1 - results["incremental"]["prompt_tokens"] / results["full"]["prompt_tokens"]
+        print(f"{'':>7} | {'saving':<11} | {saved:>12.0%} |")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""
+Behaviour of llm_hub during a provider outage: unprotected vs. circuit breakers,
+adaptive timeouts and retry budgets.
+
+Calls arrive at `--rate` per second at a Gemini stand-in through
+`llm_hub.agenerate_google` in three phases: healthy, outage (every request
+fails with 503, or hangs with `--outage hang`) and recovered. Each mode runs
+with fresh breakers, budgets and latency stats:
+
+- unprotected: no breaker, no adaptive timeout, every failure retried twice
+- protected: the defaults (breaker, adaptive timeout, budgeted jittered retries)
+
+Per phase it reports calls, failures, latency, peak calls in flight and
+upstream requests per call.
+
+    python benchmarks/bench_llm_breaker.py --rate 40 --outage hang
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import _offline
+from fakes.gemini import GeminiStandIn
+from fakes.latency import LatencyModel
+from fakes.server import ThreadedServer
+
+_ANSWER = json.dumps({"plan": [{"day": 1, "spots": ["A", "B"]}]})
+_PHASES = ("healthy", "outage", "recovered")
+
+
+def _percentile(samples, q):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _reset(mode: str, args):
+    from app import llm_hub
+    from app.core import routing
+    from app.core.config import settings
+    from app.core.resilience import CircuitBreaker, RetryBudget
+
+    protected = mode == "protected"
+    llm_hub.router = routing.LatencyRouter({}, min_samples=args.min_samples)
+    llm_hub.breakers["google"] = CircuitBreaker(
+        "google", failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD if protected else 10 ** 9,
+        open_seconds=args.open_seconds,
+    )
+    llm_hub.retry_budgets["google"] = RetryBudget(
+        ratio=settings.LLM_RETRY_BUDGET_RATIO if protected else float("inf"),
+        min_retries=settings.LLM_RETRY_BUDGET_MIN_RETRIES,
+    )
+    settings.LLM_TIMEOUT_ADAPTIVE = protected
+    # Fresh key breakers too; the scheduler's other state does not affect this run.
+    for state in settings.google_keys._states:
+        state.breaker = CircuitBreaker(state.breaker.name, settings.LLM_BREAKER_FAILURE_THRESHOLD if protected
+                                       else 10 ** 9, args.open_seconds)
+
+
+async def _run(mode: str, args, gemini, healthy: LatencyModel, outage: LatencyModel):
+    from app import llm_hub
+
+    _reset(mode, args)
+    rows = {phase: {"latencies": [], "failures": [], "calls": 0, "upstream": 0, "peak": 0} for phase in _PHASES}
+    in_flight = 0
+    tasks = []
+
+    async def call(phase: str, i: int):
+        nonlocal in_flight
+        row = rows[phase]
+        row["calls"] += 1
+        in_flight += 1
+        row["peak"] = max(row["peak"], in_flight)
+        start = time.perf_counter()
+        try:
+            await llm_hub.agenerate_google(f"{mode} {phase} {i}", "gemini-bench")
+            row["latencies"].append(time.perf_counter() - start)
+        except Exception:
+            row["failures"].append(time.perf_counter() - start)
+        finally:
+            in_flight -= 1
+
+    for phase, model, seconds in (("healthy", healthy, args.healthy_seconds),
+                                  ("outage", outage, args.outage_seconds),
+                                  ("recovered", healthy, args.recovered_seconds)):
+        gemini.latency = model
+        before = sum(gemini.requests.values())
+        end = time.perf_counter() + seconds
+        i = 0
+        while time.perf_counter() < end:
+            tasks.append(asyncio.ensure_future(call(phase, i)))
+            i += 1
+            await asyncio.sleep(1 / args.rate)
+        rows[phase]["upstream"] = sum(gemini.requests.values()) - before
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    drain = time.perf_counter() - started
+
+    print(f"{mode}:")
+    for phase in _PHASES:
+        row = rows[phase]
+        print(f"  {phase:<9} calls {row['calls']:>4}  ok p50 {_percentile(row['latencies'], 0.5):5.2f}s "
+              f"p99 {_percentile(row['latencies'], 0.99):5.2f}s  failed {len(row['failures']):>4} "
+              f"(p50 {_percentile(row['failures'], 0.5):5.2f}s)  peak in flight {row['peak']:>4}  "
+              f"upstream {row['upstream'] / max(1, row['calls']):.2f}/call")
+    print(f"  drain after last arrival {drain:.1f}s")
+    stats = llm_hub.resilience_stats()["providers"]["google"]
+    print(f"  breaker {stats['breaker']}\n  retry budget {stats['retry_budget']}\n")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=40, help="Call arrivals per second")
+    parser.add_argument("--healthy", default="400:1200", help="Healthy latency spec median:p99")
+    parser.add_argument("--outage", default="503", help="'503' (fast failures) or 'hang' (no answer for 20s)")
+    parser.add_argument("--healthy-seconds", type=float, default=5)
+    parser.add_argument("--outage-seconds", type=float, default=8)
+    parser.add_argument("--recovered-seconds", type=float, default=8)
+    parser.add_argument("--open-seconds", type=float, default=2, help="Breaker open time before a probe")
+    parser.add_argument("--min-samples", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    healthy = LatencyModel.parse(args.healthy, seed=args.seed)
+    if args.outage == "hang":
+        outage = LatencyModel(20000, seed=args.seed)
+    else:
+        outage = LatencyModel(50, error_rate=1.0, error_status=int(args.outage), seed=args.seed)
+
+    gemini = GeminiStandIn(lambda prompt: _ANSWER, chars_per_second=1e6, latency=healthy)
+    server = ThreadedServer(gemini.app).start()
+    _offline.configure(GOOGLE_BASE_URL=server.url, GOOGLE_API_KEYS="bench-google-1,bench-google-2",
+                       LLM_SINGLE_FLIGHT_ENABLED="false", LLM_HTTP_TIMEOUT="30",
+                       LLM_TIMEOUT_MIN_SECONDS="0.5", LLM_RETRY_BASE_SECONDS="0.1")
+    from app import llm_hub
+
+    try:
+        print(f"rate {args.rate:g}/s  healthy {healthy}  outage {outage}\n")
+        for mode in ("unprotected", "protected"):
+            await _run(mode, args, gemini, healthy, outage)
+    finally:
+        await llm_hub.close_clients()
+        server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
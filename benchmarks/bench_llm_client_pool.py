@@ -0,0 +1,104 @@
+"""
+Per-call client overhead of llm_hub before and after client pooling.
+
+Starts a local OpenAI-compatible server and issues the same chat completion
+N times, first building a new OpenAI client per call (the old behaviour), then
+through llm_hub's pooled clients. Reports per-call latency and how many TCP
+connections the server had to accept.
+
+    python benchmarks/bench_llm_client_pool.py --calls 200
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import _offline
+
+_COMPLETION = json.dumps({
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench-model",
+    "choices": [{
+        "index": 0,
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": "{\"ok\": true}"},
+    }],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = set()
+
+    def do_POST(self):
+        _Handler.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_COMPLETION)))
+        self.end_headers()
+        self.wfile.write(_COMPLETION)
+
+    def log_message(self, *args):
+        pass
+
+
+def _summarize(name, samples, connections):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p99 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.99))]
+    print(
+        f"{name:<16} mean={statistics.mean(samples_ms):7.3f}ms "
+        f"p50={statistics.median(samples_ms):7.3f}ms p99={p99:7.3f}ms "
+        f"connections={connections}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+
+    _offline.configure(OPENAI_API_KEYS="bench-key", OPENAI_BASE_URL=base_url)
+
+    from openai import OpenAI
+    from app import llm_hub
+
+    messages = [{"role": "user", "content": "ping"}]
+
+    # Before: a new client (and connection pool) per call.
+    _Handler.connections = set()
+    samples = []
+    for _ in range(args.calls):
+        start = time.perf_counter()
+        client = OpenAI(api_key="bench-key", base_url=base_url)
+        client.chat.completions.create(model="bench-model", messages=messages)
+        samples.append(time.perf_counter() - start)
+        client.close()
+    _summarize("client-per-call", samples, len(_Handler.connections))
+
+    # After: pooled, long-lived client per (provider, key).
+    _Handler.connections = set()
+    samples = []
+    for _ in range(args.calls):
+        start = time.perf_counter()
+        llm_hub.generate_openai("ping", model="bench-model")
+        samples.append(time.perf_counter() - start)
+    _summarize("pooled", samples, len(_Handler.connections))
+
+    asyncio.run(llm_hub.close_clients())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Tail latency of one prompt label: single provider vs. routed vs. routed + hedged.
+
+The label's own backend (a Gemini stand-in) has a long latency tail; an
+equivalent OpenAI-compatible stand-in is slower at the median but steadier.
+`--calls` calls run at `--concurrency` through `llm_hub.agenerate_routed` in
+three modes, each with fresh routing stats:
+
+- single: no route configured, every call goes to Gemini
+- routed: LLM_ROUTES lists both backends; ranking on median latency, failover on errors
+- hedged: as routed, plus a duplicate to the other backend after the first one's p95
+
+    python benchmarks/bench_llm_routing.py --calls 400 --gemini 700:9000 --openai 900:1800
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import _offline
+from fakes.gemini import GeminiStandIn
+from fakes.latency import LatencyModel
+from fakes.openai import OpenAIStandIn
+from fakes.server import ThreadedServer
+
+_LABEL = "spot_finder"
+_ANSWER = json.dumps({"spots": [{"destination_name": f"Spot {i}"} for i in range(5)]})
+
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _run(mode: str, args, gemini, openai):
+    from app import llm_hub
+    from app.core import routing
+    from app.core.config import settings
+
+    routes = {} if mode == "single" else routing.parse_routes({_LABEL: ["google:gemini-bench", "openai:gpt-bench"]})
+    llm_hub.router = routing.LatencyRouter(
+        routes, min_samples=args.min_samples, explore_rate=0.05,
+        hedge_percentile=settings.LLM_HEDGE_PERCENTILE, min_hedge_delay=0.05, default_hedge_delay=10.0,
+    )
+    settings.LLM_HEDGE_ENABLED = mode == "hedged"
+    gemini.requests.clear()
+    openai.requests.clear()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, errors = [], 0
+
+    async def call(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await llm_hub.agenerate_routed(_LABEL, f"[{_LABEL}] request {mode} {i}", "google", "gemini-bench")
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(args.calls)))
+    elapsed = time.perf_counter() - start
+    upstream = sum(gemini.requests.values()) + sum(openai.requests.values())
+    print(f"{mode:<8} p50 {_percentile(latencies, 0.5):6.2f}s  p95 {_percentile(latencies, 0.95):6.2f}s  "
+          f"p99 {_percentile(latencies, 0.99):6.2f}s  max {max(latencies):6.2f}s  errors {errors:>3}  "
+          f"upstream calls {upstream} ({upstream / args.calls:.2f}/call)  wall {elapsed:5.1f}s")
+    return llm_hub.router.stats()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--gemini", default="700:9000", help="Gemini latency spec median:p99[:error_rate[:status]]")
+    parser.add_argument("--openai", default="900:1800", help="OpenAI latency spec")
+    parser.add_argument("--min-samples", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    gemini = GeminiStandIn(lambda prompt: _ANSWER, chars_per_second=1e6,
+                           latency=LatencyModel.parse(args.gemini, seed=args.seed))
+    openai = OpenAIStandIn(lambda prompt: _ANSWER, LatencyModel.parse(args.openai, seed=args.seed + 1))
+    gemini_server = ThreadedServer(gemini.app).start()
+    openai_server = ThreadedServer(openai.app).start()
+    _offline.configure(GOOGLE_BASE_URL=gemini_server.url, GOOGLE_API_KEYS="bench-google",
+                       OPENAI_BASE_URL=openai_server.url, OPENAI_API_KEYS="bench-openai",
+                       LLM_SINGLE_FLIGHT_ENABLED="false")
+    from app import llm_hub
+
+    try:
+        print(f"gemini {LatencyModel.parse(args.gemini)}, openai {LatencyModel.parse(args.openai)}\n")
+        for mode in ("single", "routed", "hedged"):
+            stats = await _run(mode, args, gemini, openai)
+        print("\nhedged routing stats:")
+        for backend, row in stats["backends"].items():
+            print(f"  {backend:<20} calls {row['calls']:>4}  p50 {row['p50_seconds']}s  p95 {row['p95_seconds']}s  "
+                  f"hedge delay {row['hedge_delay_seconds']}s")
+        print(f"  first choice: {stats['routed'].get(_LABEL)}")
+    finally:
+        await llm_hub.close_clients()
+        gemini_server.stop()
+        openai_server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+Cost of the /metrics instrumentation and what a scrape looks like.
+
+1. Per-call overhead of the LLM and DB timing wrappers (`llm_hub._observed`,
+   `supabase_async._timed`) against the bare call.
+2. Render time and size of a scrape with many label combinations.
+3. End to end: `--calls` Google calls (for two prompt labels) against the
+   Gemini stand-in, then GET /metrics, printing the LLM and token lines.
+
+    python benchmarks/bench_metrics.py --iterations 100000 --series 600 --calls 20
+"""
+import argparse
+import asyncio
+import time
+
+import _offline
+from fakes.gemini import GeminiStandIn
+from fakes.server import ThreadedServer
+
+
+class _Prompt:
+    prompt = "Suggest places for {{USER_PROFILE_SUMMARY}}"
+    config = {"model": "gemini-bench"}
+    version = 1
+
+
+class _PromptStore:
+    def get_prompt(self, name, **kwargs):
+        return _Prompt()
+
+
+async def _noop(*args, **kwargs):
+    return None
+
+
+async def _overhead(iterations: int):
+    from app import llm_hub
+    from app.services import supabase_async
+
+    timed_noop = supabase_async._timed(_noop)
+    results = {}
+    for name, body in (
+        ("bare call", lambda: _noop()),
+        ("llm _observed", None),
+        ("db _timed", lambda: timed_noop()),
+    ):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            if body is None:
+                with llm_hub._observed("google", "overhead-only"):
+                    await _noop()
+            else:
+                await body()
+        results[name] = (time.perf_counter() - start) / iterations * 1e6
+    base = results["bare call"]
+    for name, micros in results.items():
+        extra = "" if name == "bare call" else f"  (+{micros - base:.2f}us)"
+        print(f"{name:<14} {micros:6.2f}us/call{extra}")
+
+
+def _scrape_cost(series: int):
+    from app.core import metrics
+
+    registry = metrics.Registry()
+    histogram = registry.histogram("bench_duration_seconds", "bench", ("provider", "model", "prompt"),
+                                   buckets=metrics.LLM_BUCKETS)
+    for i in range(series):
+        histogram.labels(f"p{i % 3}", f"m{i % 10}", f"prompt{i}").observe(i % 7)
+    start = time.perf_counter()
+    text = registry.render()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"\nscrape: {series} histogram series -> {len(text.splitlines())} lines, "
+          f"{len(text) / 1024:.0f} KiB in {elapsed:.1f}ms")
+
+
+async def _end_to_end(calls: int):
+    import httpx
+    from app import llm_hub, prompt_hub
+    from app.main import app
+
+    prompt_hub.registry._client = _PromptStore()
+
+    async def call(label: str, i: int):
+        _, config = await prompt_hub.aget_prompt(label)
+        await llm_hub.agenerate_google(f"prompt {i}", model=config["model"])
+
+    await asyncio.gather(*(call(("spot_finder", "Serach_retrival")[i % 2], i) for i in range(calls)))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.get("/metrics")
+    await llm_hub.close_clients()
+
+    print(f"\nGET /metrics -> {response.status_code} {response.headers['content-type']}")
+    for line in response.text.splitlines():
+        if "overhead-only" in line:
+            continue
+        if line.startswith(("llm_requests_total", "llm_request_duration_seconds_count", "llm_key_tokens_total")):
+            print(" ", line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--series", type=int, default=600)
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+
+    # Settings are read at import, so the stand-in must be up before the app is imported.
+    gemini = ThreadedServer(GeminiStandIn(lambda prompt: '{"ok": true}', ttft_ms=50).app).start()
+    _offline.configure(GOOGLE_BASE_URL=gemini.url, GOOGLE_API_KEYS="bench-key-0001,bench-key-0002",
+                       LLM_SINGLE_FLIGHT_ENABLED="false")
+    try:
+        await _overhead(args.iterations)
+        _scrape_cost(args.series)
+        await _end_to_end(args.calls)
+    finally:
+        gemini.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
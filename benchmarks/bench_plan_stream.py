@@ -0,0 +1,138 @@
+"""
+Time to first content: POST /groups/{id}/plan vs. POST /groups/{id}/plan/stream.
+
+Runs the real app over HTTP against a paced Gemini stand-in and the in-memory
+PostgREST stand-in (benchmarks/fakes/). The model "generates" a multi-option
+plan at `--chars-per-second` after `--ttft-ms`; the script records when the
+first SSE event, the first complete option and the stored plan arrive, and
+checks that both endpoints store the same plan_json.
+
+    python benchmarks/bench_plan_stream.py --options 3 --days 4 --chars-per-second 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import _offline
+from fakes.gemini import GeminiStandIn
+from fakes.postgrest import PostgrestStandIn
+from fakes.server import ThreadedServer
+
+
+class _Prompt:
+    prompt = "Plan a trip for {{USER_PROFILE_SUMMARY}} using {{CITY_ACTIVITY_RESULTS}} and {{SHORT_TRIP_OPTIONS}}"
+    config = {"model": "gemini-bench"}
+    version = 1
+
+
+class _PromptStore:
+    def get_prompt(self, name, **kwargs):
+        return _Prompt()
+
+
+def _plan_document(options: int, days: int) -> dict:
+    return {
+        "plan_options": [
+            {
+                "plan_id": f"opt-{o}",
+                "plan_type": "in_city" if o % 2 == 0 else "short_trip",
+                "plan_variant": f"Variant {o}",
+                "schedule": [
+                    {
+                        "day": d + 1,
+                        "title": f"Day {d + 1}: neighbourhoods and food",
+                        "items": [
+                            {"time": f"{9 + 2 * i:02d}:00", "activity": f"Activity {o}.{d}.{i}",
+                             "location": "Old Town", "notes": "Book ahead on weekends; vegetarian options nearby."}
+                            for i in range(5)
+                        ],
+                    }
+                    for d in range(days)
+                ],
+                "why_fit_user": "Balances the group's interest in food and culture with relaxed evenings.",
+                "cost_estimates": {"per_person": 180 + 40 * o, "currency": "EUR"},
+                "sources": [f"https://example.com/source/{o}/{s}" for s in range(3)],
+            }
+            for o in range(options)
+        ]
+    }
+
+
+async def _blocking(client, base_url, group_id, raw_data):
+    start = time.perf_counter()
+    response = await client.post(f"{base_url}/api/v1/groups/{group_id}/plan", json={"raw_data": raw_data})
+    response.raise_for_status()
+    return {"first_event": None, "first_option": None, "done": time.perf_counter() - start}, response.json()
+
+
+async def _streaming(client, base_url, group_id, raw_data):
+    start = time.perf_counter()
+    marks = {"first_event": None, "first_option": None, "done": None}
+    plan, event = None, None
+    async with client.stream("POST", f"{base_url}/api/v1/groups/{group_id}/plan/stream",
+                             json={"raw_data": raw_data}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                marks["first_event"] = marks["first_event"] or time.perf_counter() - start
+                if event == "option":
+                    marks["first_option"] = marks["first_option"] or time.perf_counter() - start
+            elif line.startswith("data: ") and event in ("plan", "error"):
+                plan = json.loads(line[len("data: "):])
+                if event == "error":
+                    raise RuntimeError(plan)
+    marks["done"] = time.perf_counter() - start
+    return marks, plan
+
+
+def _fmt(seconds):
+    return f"{seconds:>7.2f}s" if seconds is not None else f"{'-':>8}"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--options", type=int, default=3)
+    parser.add_argument("--days", type=int, default=4)
+    parser.add_argument("--ttft-ms", type=float, default=800.0)
+    parser.add_argument("--chars-per-second", type=float, default=2000.0)
+    args = parser.parse_args()
+
+    document = _plan_document(args.options, args.days)
+    text = "```json\n" + json.dumps(document, indent=2) + "\n```"
+    gemini = ThreadedServer(GeminiStandIn(lambda prompt: text, ttft_ms=args.ttft_ms,
+                                          chars_per_second=args.chars_per_second).app).start()
+    postgrest = PostgrestStandIn({"groups": [{"id": "g1", "name": "Trip", "destination": "Lisbon",
+                                              "creator_id": "u1", "ai_group_kn_summary": {"likes": ["food"]}}]})
+    database = ThreadedServer(postgrest.app).start()
+    _offline.configure(SUPABASE_URL=database.url, GOOGLE_BASE_URL=gemini.url, GOOGLE_API_KEYS="bench-key",
+                       JOB_STORE="memory")
+
+    import httpx
+    from app import prompt_hub
+    from app.main import app
+
+    prompt_hub.registry._client = _PromptStore()
+    api = ThreadedServer(app).start()
+    raw_data = {"short_trip": {"city": "Lisbon"}, "long_trip": {"region": "Alentejo"}}
+
+    print(f"{len(text)} chars of plan JSON, {args.options} options x {args.days} days")
+    print(f"{'endpoint':<12} | {'first event':>11} | {'first option':>12} | {'complete':>8}")
+    try:
+        async with httpx.AsyncClient(timeout=120) as client:
+            blocking_marks, blocking_plan = await _blocking(client, api.url, "g1", raw_data)
+            stream_marks, stream_plan = await _streaming(client, api.url, "g1", raw_data)
+        for name, marks in (("plan", blocking_marks), ("plan/stream", stream_marks)):
+            print(f"{name:<12} | {_fmt(marks['first_event']):>11} | {_fmt(marks['first_option']):>12} | {_fmt(marks['done'])}")
+        stored = [row["plan_json"] for row in postgrest.tables["trip_plans"]]
+        same = blocking_plan["plan_json"] == stream_plan["plan_json"] == document and len(stored) == 2
+        print(f"\nstored plans identical to the model output: {same}")
+    finally:
+        api.stop()
+        database.stop()
+        gemini.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
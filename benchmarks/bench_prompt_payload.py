@@ -0,0 +1,140 @@
+"""
+Prompt input size and serialization cost: Jinja's `str()` rendering vs.
+`app.core.prompt_payload.compact`.
+
+Builds payloads shaped like the ones each prompt label renders (member
+personas, a knowledge graph, a group summary, recommendation results for the
+planner), with the None / empty fields and datetimes seen in stored rows, and
+reports estimated input tokens and the time to serialize them, as a repr and
+as compact JSON (with and without a field projection for the planner).
+
+    python benchmarks/bench_prompt_payload.py --members 8 --spots 20
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import _offline
+
+_offline.configure()
+
+from app.core import prompt_payload  # noqa: E402
+from app.core.config import settings  # noqa: E402
+
+_PLANNER_FIELDS = {
+    "CITY_ACTIVITY_RESULTS": ["short_trip_destinations.destination_name", "short_trip_destinations.key_highlights",
+                              "short_trip_destinations.estimated_cost_per_person"],
+    "SHORT_TRIP_OPTIONS": ["short_trip_destinations.destination_name", "short_trip_destinations.distance_from_base_km",
+                           "short_trip_destinations.key_highlights"],
+}
+
+
+def _member(rng: random.Random, i: int) -> dict:
+    return {
+        "persona_traits": {
+            "pace": rng.choice(["relaxed", "balanced", "packed"]),
+            "interests": rng.sample(["food", "history", "nightlife", "nature", "art", "shopping", "trekking"], 3),
+            "budget": rng.choice(["low", "mid", "high"]),
+            "dietary": None if rng.random() < 0.6 else "vegetarian",
+            "accessibility": [],
+            "notes": "",
+        },
+        "ai_summary": f"Member {i} enjoys slow mornings, street food and a museum or two; avoids long drives.",
+    }
+
+
+def _graph(members: list) -> dict:
+    nodes = [{"id": f"m{i}", "type": "member", "label": f"Member {i}", "meta": None} for i in range(len(members))]
+    nodes += [{"id": f"i:{name}", "type": "interest", "label": name, "meta": {}} for name in
+              ("food", "history", "nightlife", "nature", "art", "shopping", "trekking")]
+    edges = [
+        {"source": f"m{i}", "target": f"i:{interest}", "relation": "likes", "weight": 1.0, "evidence": None}
+        for i, m in enumerate(members) for interest in m["persona_traits"]["interests"]
+    ]
+    return {"nodes": nodes, "edges": edges, "generated_at": datetime(2026, 5, 1, 9, 30)}
+
+
+def _summary() -> dict:
+    return {
+        "group_vibe": "curious, food-first, medium budget",
+        "shared_interests": ["food", "history"],
+        "conflicts": [],
+        "constraints": {"dietary": ["vegetarian"], "mobility": None},
+        "travel_profile": [datetime(2026, 5, 2), datetime(2026, 5, 2) + timedelta(days=2)],
+    }
+
+
+def _destination(rng: random.Random, name: str, distance_km: int, i: int) -> dict:
+    return {
+        "option_variant": rng.choice(["Option A – Nature", "Option B – Heritage", "Option C – Food"]),
+        "destination_name": f"{name} {i}",
+        "distance_from_base_km": str(distance_km),
+        "travel_time": "1.5 - 2 hours by car",
+        "trip_length_days": rng.choice([1, 2, 3]),
+        "key_highlights": ["A busy market lane with snacks and crafts", "A temple at the far end"],
+        "accommodation_notes": "" if rng.random() < 0.5 else "Budget guesthouses to mid-range resorts.",
+        "estimated_cost_per_person": "INR 1,500 - 3,000",
+        "transportation_options": ["drive", "bus"],
+        "weather_during_trip": None,
+        "source": {"title": f"Places near the city #{i}", "url": f"https://example.com/spot/{i}", "snippet": None},
+    }
+
+
+def _raw_data(rng: random.Random, spots: int) -> dict:
+    # Shaped like the spot_finder and Serach_retrival outputs stored as short_trip / long_trip.
+    return {
+        "short_trip": {"base_city": "Bengaluru", "short_trip_destinations": [
+            _destination(rng, "Spot", 5 + i, i) for i in range(spots)
+        ]},
+        "long_trip": {"base_city": "Bengaluru", "search_radius_km": 200, "short_trip_destinations": [
+            _destination(rng, "Trip", 120 + i * 15, i) for i in range(max(1, spots // 4))
+        ]},
+    }
+
+
+def _payloads(rng: random.Random, members_count: int, spots: int):
+    members = [_member(rng, i) for i in range(members_count)]
+    summary = _summary()
+    raw = _raw_data(rng, spots)
+    return {
+        "KN_generator": {"INPUT_DATA": members},
+        "KN_Summerise": {"GRAPH_SUBGRAPH_JSON": _graph(members)},
+        "spot_finder": {"USER_PROFILE_SUMMARY": summary,
+                        "DESTINATION_CONTEXT": {"city": "Bengaluru", "travel_profile": summary["travel_profile"]}},
+        "base_level_planner": {"USER_PROFILE_SUMMARY": summary, "CITY_ACTIVITY_RESULTS": raw["short_trip"],
+                               "SHORT_TRIP_OPTIONS": raw["long_trip"]},
+    }
+
+
+def _timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=8)
+    parser.add_argument("--spots", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    payloads = _payloads(random.Random(args.seed), args.members, args.spots)
+    print(f"{'prompt':<26} {'repr tok':>9} {'compact tok':>12} {'saved':>7} {'repr us':>8} {'compact us':>11}")
+    for label, variables in payloads.items():
+        for projected in (False, True) if label == "base_level_planner" else (False,):
+            settings.PROMPT_PAYLOAD_FIELDS = {label: _PLANNER_FIELDS} if projected else {}
+            raw = sum(prompt_payload.estimate_tokens(str(value)) for value in variables.values())
+            compacted = prompt_payload.compact(label, **variables)
+            tokens = sum(prompt_payload.estimate_tokens(str(value)) for value in compacted.values())
+            repr_us = _timed(lambda: [str(value) for value in variables.values()], args.repeat)
+            compact_us = _timed(lambda: [str(value) for value in prompt_payload.compact(label, **variables).values()], args.repeat)
+            name = label + (" +fields" if projected else "")
+            print(f"{name:<26} {raw:>9} {tokens:>12} {1 - tokens / raw:>7.1%} {repr_us:>8.0f} {compact_us:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Time to first content: GET /groups/{id}/recommendations vs. .../recommendations/stream.
+
+Runs the real app over HTTP against a paced Gemini stand-in and the in-memory
+PostgREST stand-in. The city branch (spot_finder) answers quickly; the
+wide-radius branch (Serach_retrival) models a slower grounded search with a
+longer time to first token and a longer answer. The script records when the
+first destination, each complete branch and the end of the stream arrive.
+
+    python benchmarks/bench_recommendations_stream.py --wide-ttft-ms 4000 --format sse
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import _offline
+from fakes.gemini import GeminiStandIn
+from fakes.postgrest import PostgrestStandIn
+from fakes.server import ThreadedServer
+
+
+class _Prompt:
+    def __init__(self, label):
+        self.prompt = label + ": recommend places for {{USER_PROFILE_SUMMARY}} around {{DESTINATION_CONTEXT}}"
+        self.config = {"model": "gemini-bench"}
+        self.version = 1
+
+
+class _PromptStore:
+    def get_prompt(self, name, **kwargs):
+        return _Prompt(name)
+
+
+def _branch_document(field: str, count: int) -> dict:
+    return {
+        "base_city": "Bangalore",
+        field: [
+            {
+                "destination_name": f"Place {i}",
+                "distance_from_base_km": str(20 + 15 * i),
+                "key_highlights": ["Sunrise viewpoint", "Local food street", "Heritage walk"],
+                "estimated_cost_per_person": "INR 5,000 - 8,000",
+                "source": {"title": f"Guide {i}", "url": f"https://example.com/{i}", "snippet": "Well reviewed."},
+            }
+            for i in range(count)
+        ],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--city-ttft-ms", type=float, default=800.0)
+    parser.add_argument("--wide-ttft-ms", type=float, default=4000.0)
+    parser.add_argument("--chars-per-second", type=float, default=1500.0)
+    parser.add_argument("--format", choices=("sse", "ndjson"), default="sse")
+    args = parser.parse_args()
+
+    city = json.dumps(_branch_document("spots", 6), indent=2)
+    wide = json.dumps(_branch_document("short_trip_destinations", 5), indent=2)
+
+    def respond(prompt: str):
+        if prompt.startswith("spot_finder"):
+            return city, args.city_ttft_ms
+        return wide, args.wide_ttft_ms
+
+    gemini = ThreadedServer(GeminiStandIn(respond, chars_per_second=args.chars_per_second).app).start()
+    postgrest = PostgrestStandIn({"groups": [{"id": "g1", "name": "Trip", "destination": "Bangalore",
+                                              "creator_id": "u1", "ai_group_kn_summary": {"likes": ["food"]}}]})
+    database = ThreadedServer(postgrest.app).start()
+    _offline.configure(SUPABASE_URL=database.url, GOOGLE_BASE_URL=gemini.url, GOOGLE_API_KEYS="bench-key",
+                       JOB_STORE="memory", LLM_SINGLE_FLIGHT_ENABLED="false")
+
+    import httpx
+    from app import prompt_hub
+    from app.main import app
+    from app.services import rec_cache
+
+    prompt_hub.registry._client = _PromptStore()
+    api = ThreadedServer(app).start()
+
+    try:
+        async with httpx.AsyncClient(timeout=120) as client:
+            start = time.perf_counter()
+            response = await client.get(f"{api.url}/api/v1/groups/g1/recommendations")
+            response.raise_for_status()
+            blocking = time.perf_counter() - start
+            blocking_result = response.json()
+
+            rec_cache.memory.clear()
+            marks, branches = {}, {}
+            start = time.perf_counter()
+            async with client.stream("GET", f"{api.url}/api/v1/groups/g1/recommendations/stream",
+                                     params={"format": args.format}) as response:
+                response.raise_for_status()
+                event = None
+                async for line in response.aiter_lines():
+                    if args.format == "ndjson":
+                        if not line:
+                            continue
+                        message = json.loads(line)
+                        event, data = message["event"], message["data"]
+                    elif line.startswith("event: "):
+                        event = line[len("event: "):]
+                        continue
+                    elif line.startswith("data: "):
+                        data = json.loads(line[len("data: "):])
+                    else:
+                        continue
+                    elapsed = time.perf_counter() - start
+                    if event == "destination":
+                        marks.setdefault(f"first {data['branch']} destination", elapsed)
+                    elif event == "branch":
+                        marks[f"{data['branch']} complete"] = elapsed
+                        branches[data["branch"]] = data["data"]
+                    elif event == "done":
+                        marks["done"] = elapsed
+
+        print(f"{'blocking endpoint complete':<36} {blocking:>6.2f}s")
+        for name, seconds in sorted(marks.items(), key=lambda item: item[1]):
+            print(f"{'stream: ' + name:<36} {seconds:>6.2f}s")
+        print(f"\nstreamed branches identical to blocking result: {branches == blocking_result}")
+    finally:
+        api.stop()
+        database.stop()
+        gemini.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
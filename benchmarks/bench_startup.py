@@ -0,0 +1,180 @@
+"""
+Cold-start profile of the app: import time, lifespan startup, first use of the
+lazily created clients, and RSS, each measured in a fresh interpreter.
+
+Every run spawns `python -X importtime` that imports `app.main`, runs the
+FastAPI lifespan with STARTUP_WARMUP=`--warmup`, answers one health check
+and creates one client of each provider. The report has the median and max
+over `--runs`, which SDKs were imported by `import app.main`, and the
+heaviest third-party imports with the app module that pulled them in.
+
+`--output` saves the report as JSON; `--baseline` compares against a saved
+report and exits non-zero when import or ready time or RSS grows by more than
+`--tolerance`, so a dependency that makes replicas slow to start shows up in review.
+
+    python benchmarks/bench_startup.py --runs 5 --warmup off
+    python benchmarks/bench_startup.py --runs 5 --output /tmp/startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import _offline
+
+_SDKS = ("openai", "google.genai", "langfuse", "supabase", "postgrest", "openinference.instrumentation.google_genai")
+
+_CHILD = r"""
+import asyncio, json, os, resource, sys, time
+
+def rss_mib():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+report = {
+    "import_seconds": imported - start,
+    "rss_after_import_mib": rss_mib(),
+    "sdks_loaded_at_import": [name for name in json.loads(sys.argv[1]) if name in sys.modules],
+}
+
+async def main():
+    import httpx
+    from app import llm_hub
+
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            response = await client.get("/api/v1/health")
+        report["lifespan_startup_seconds"] = ready - imported
+        report["ready_seconds"] = ready - start
+        report["first_health_seconds"] = time.perf_counter() - ready
+        report["health_status"] = response.status_code
+        first = time.perf_counter()
+        llm_hub.get_async_openai_client("bench-openai")
+        llm_hub.get_google_client("bench-google")
+        report["first_clients_seconds"] = time.perf_counter() - first
+        report["rss_ready_mib"] = rss_mib()
+
+asyncio.run(main())
+print("STARTUP_REPORT " + json.dumps(report))
+"""
+
+
+def _heaviest_imports(importtime: str, top: int):
+    """Third-party modules imported directly by an `app.*` module, by cumulative import time."""
+    children = {}  # depth -> [(module, cumulative_us)] waiting for their parent line
+    found = []
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        module = name.strip()
+        mine = children.pop(depth + 1, [])
+        if module.startswith("app"):
+            found.extend((child, us, module) for child, us in mine if not child.startswith("app"))
+        children.setdefault(depth, []).append((module, int(cumulative)))
+    found.sort(key=lambda row: -row[1])
+    return [{"module": m, "cumulative_ms": round(us / 1000, 1), "imported_by": parent} for m, us, parent in found[:top]]
+
+
+def _run_once(env: dict, profile: bool):
+    start = time.perf_counter()
+    command = [sys.executable] + (["-X", "importtime"] if profile else []) + ["-c", _CHILD, json.dumps(_SDKS)]
+    result = subprocess.run(command, env=env, cwd=_offline.ROOT, capture_output=True, text=True, timeout=300)
+    wall = time.perf_counter() - start
+    line = next((l for l in result.stdout.splitlines() if l.startswith("STARTUP_REPORT ")), None)
+    if result.returncode or line is None:
+        sys.stderr.write(result.stderr[-4000:])
+        raise SystemExit(f"startup run failed with exit code {result.returncode}")
+    report = json.loads(line[len("STARTUP_REPORT "):])
+    report["process_seconds"] = wall
+    return report, result.stderr
+
+
+def _summary(runs, field):
+    values = [run[field] for run in runs]
+    return {"p50": round(statistics.median(values), 4), "max": round(max(values), 4)}
+
+
+def _regressions(report: dict, baseline: dict, tolerance: float):
+    found = []
+    for field in ("import_seconds", "ready_seconds", "rss_ready_mib"):
+        before, after = baseline["metrics"].get(field, {}).get("p50"), report["metrics"][field]["p50"]
+        if before and after > before * (1 + tolerance):
+            found.append(f"{field} {before:.3f} -> {after:.3f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", default="off", choices=("off", "background", "blocking"), help="STARTUP_WARMUP")
+    parser.add_argument("--warmup-prompts", default="", help="STARTUP_WARMUP_PROMPTS (fetches need a Langfuse)")
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports to list")
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    _offline.configure(
+        OPENAI_API_KEYS="bench-openai", NVIDIA_API_KEYS="bench-nvidia", GOOGLE_API_KEYS="bench-google",
+        STARTUP_WARMUP=args.warmup, STARTUP_WARMUP_PROMPTS=args.warmup_prompts, LOOP_MONITOR_ENABLED="false",
+    )
+    env = dict(os.environ)
+
+    runs, importtime = [], ""
+    for i in range(args.runs):
+        run, stderr = _run_once(env, profile=i == 0)
+        if i == 0:
+            importtime = stderr
+        runs.append(run)
+
+    fields = ("process_seconds", "import_seconds", "lifespan_startup_seconds", "ready_seconds",
+              "first_health_seconds", "first_clients_seconds", "rss_after_import_mib", "rss_ready_mib")
+    report = {
+        "config": {"runs": args.runs, "warmup": args.warmup, "python": sys.version.split()[0]},
+        "metrics": {field: _summary(runs, field) for field in fields},
+        "sdks_loaded_at_import": runs[0]["sdks_loaded_at_import"],
+        "heaviest_imports": _heaviest_imports(importtime, args.top),
+    }
+
+    print(f"{args.runs} cold starts, STARTUP_WARMUP={args.warmup}\n")
+    print(f"{'metric':<28} {'p50':>9} {'max':>9}")
+    for field in fields:
+        row = report["metrics"][field]
+        print(f"{field:<28} {row['p50']:>9.3f} {row['max']:>9.3f}")
+    print(f"\nSDKs loaded by `import app.main`: {', '.join(report['sdks_loaded_at_import']) or 'none'}")
+    print("\nheaviest third-party imports (first run, includes -X importtime overhead):")
+    for row in report["heaviest_imports"]:
+        print(f"  {row['cumulative_ms']:>8.1f} ms  {row['module']:<45} via {row['imported_by']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = _regressions(report, json.load(f), args.tolerance)
+        print(f"\nagainst {args.baseline} (tolerance {args.tolerance:.0%}): "
+              f"{'no regressions' if not found else str(len(found)) + ' regression(s)'}")
+        for line in found:
+            print(" ", line)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Database round trips and latency of GET /users/info data loading.
+
+Seeds an in-memory PostgREST stand-in (benchmarks/fakes/postgrest.py) with a
+user who belongs to N groups of M members, where members overlap across
+groups, points the real supabase client at it and loads the user's groups
+twice: with the previous per-group / per-member loop and with
+app.services.loader.load_user_groups. An optional per-request delay models
+the network round trip to Supabase.
+
+    python benchmarks/bench_user_info_queries.py --groups 1 5 10 20 --members 8 --rtt-ms 20
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import _offline
+from fakes.postgrest import PostgrestStandIn
+from fakes.server import ThreadedServer
+
+
+def _seed(groups: int, members: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    # A pool smaller than groups * members so users are shared between groups.
+    pool = [
+        {"id": str(uuid.UUID(int=rng.getrandbits(128))), "email": f"user{i}@example.com",
+         "name": f"User {i}", "persona_traits": {"traits": ["food"]}, "ai_summary": "likes food"}
+        for i in range(max(members, groups * members // 2))
+    ]
+    me = pool[0]
+    tables = {"users": pool, "groups": [], "group_members": [], "trip_plans": []}
+    for g in range(groups):
+        group_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        tables["groups"].append({"id": group_id, "name": f"Group {g}", "destination": "Goa",
+                                 "creator_id": me["id"], "ai_group_kn_summary": None})
+        others = rng.sample(pool[1:], members - 1)
+        for i, user in enumerate([me] + others):
+            tables["group_members"].append({"group_id": group_id, "user_id": user["id"],
+                                            "role": "admin" if i == 0 else "member"})
+        for p in range(2):
+            tables["trip_plans"].append({"id": str(uuid.UUID(int=rng.getrandbits(128))),
+                                         "group_id": group_id, "plan_json": {"day": p}})
+    return {"tables": tables, "user_id": me["id"]}
+
+
+async def _per_group(db, user_id: str):
+    """The loading loop GET /users/info used before the batched loader."""
+    result = []
+    for group in await db.get_user_groups(user_id):
+        members = []
+        for member in await db.get_group_members(group["id"]):
+            member_user = await db.get_user_by_id(member["user_id"])
+            if member_user:
+                members.append(member_user["id"])
+        result.append({"group": group, "members": members, "plans": await db.get_group_plans(group["id"])})
+    return result
+
+
+async def _measure(stand_in, fn, repeat: int):
+    stand_in.reset_counts()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = await fn()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+    return stand_in.round_trips // repeat, elapsed_ms, result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--members", type=int, default=8)
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="simulated round trip per request")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    stand_in = PostgrestStandIn(latency_ms=args.rtt_ms)
+    server = ThreadedServer(stand_in.app).start()
+    _offline.configure(SUPABASE_URL=server.url)
+
+    from app.services import supabase_async as db
+    from app.services import loader
+
+    print(f"{'groups':>6} | {'loader':<9} | {'round trips':>11} | {'latency':>9}")
+    try:
+        for groups in args.groups:
+            seeded = _seed(groups, args.members)
+            stand_in.tables = seeded["tables"]
+            user_id = seeded["user_id"]
+            old_trips, old_ms, old = await _measure(stand_in, lambda: _per_group(db, user_id), args.repeat)
+            new_trips, new_ms, new = await _measure(stand_in, lambda: loader.load_user_groups(user_id), args.repeat)
+            assert [len(e["members"]) for e in old] == [len(e["members"]) for e in new]
+            assert [len(e["plans"]) for e in old] == [len(e["plans"]) for e in new]
+            print(f"{groups:>6} | {'per-group':<9} | {old_trips:>11} | {old_ms:>7.0f}ms")
+            print(f"{'':>6} | {'batched':<9} | {new_trips:>11} | {new_ms:>7.0f}ms")
+    finally:
+        await db.aclose()
+        server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Gemini API stand-in for `generateContent` and `streamGenerateContent?alt=sse`.
+
+Responses come from `respond(prompt)`, returning the text or `(text, ttft_ms)`,
+and are paced like a real model: `ttft_ms` before the first chunk, then
+`chunk_chars` characters every `chunk_chars / chars_per_second` seconds. The
+non-streaming endpoint waits for the whole simulated generation before
+answering. With `latency` (a `LatencyModel`) the time to first token is drawn
+per request instead and a fraction of requests fail. Point GOOGLE_BASE_URL at it.
+"""
+import asyncio
+import json
+from collections import Counter
+from typing import Callable, Optional, Tuple, Union
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from .latency import LatencyModel
+
+_ERROR_STATUS = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE", 504: "DEADLINE_EXCEEDED"}
+
+
+def _prompt_text(body: dict) -> str:
+    texts = []
+    for content in body.get("contents") or []:
+        for part in content.get("parts") or []:
+            texts.append(part.get("text") or "")
+    return "".join(texts)
+
+
+def _payload(text: str, prompt: str, finished: bool, output_chars: int) -> dict:
+    payload = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+    if finished:
+        payload["candidates"][0]["finishReason"] = "STOP"
+        prompt_tokens, output_tokens = len(prompt) // 4, output_chars // 4
+        payload["usageMetadata"] = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        }
+    return payload
+
+
+class GeminiStandIn:
+    def __init__(self, respond: Callable[[str], Union[str, Tuple[str, float]]], ttft_ms: float = 500.0,
+                 chars_per_second: float = 400.0, chunk_chars: int = 80, latency: Optional[LatencyModel] = None):
+        self.respond = respond
+        self.latency = latency
+        self.failures = 0
+        self.ttft_ms = ttft_ms
+        self.chars_per_second = chars_per_second
+        self.chunk_chars = chunk_chars
+        self.requests = Counter()
+        self.app = Starlette(routes=[Route("/{version}/models/{target}", self._handle, methods=["POST"])])
+
+    def _chunks(self, text: str):
+        return [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+
+    async def _handle(self, request: Request):
+        model, _, method = request.path_params["target"].partition(":")
+        self.requests[method] += 1
+        body = json.loads(await request.body() or b"{}")
+        prompt = _prompt_text(body)
+        text, ttft_ms = self.respond(prompt), self.ttft_ms
+        if isinstance(text, tuple):
+            text, ttft_ms = text
+        if self.latency is not None:
+            ttft_ms = self.latency.sample_ms()
+            if self.latency.should_fail():
+                self.failures += 1
+                await asyncio.sleep(ttft_ms / 1000)
+                status = self.latency.error_status
+                error = {"code": status, "message": "stand-in failure", "status": _ERROR_STATUS.get(status, "UNKNOWN")}
+                return JSONResponse({"error": error}, status_code=status)
+        chunks = self._chunks(text)
+        chunk_delay = self.chunk_chars / self.chars_per_second
+
+        if method == "streamGenerateContent":
+            async def events():
+                await asyncio.sleep(ttft_ms / 1000)
+                for i, chunk in enumerate(chunks):
+                    if i:
+                        await asyncio.sleep(chunk_delay)
+                    payload = _payload(chunk, prompt, i == len(chunks) - 1, len(text))
+                    yield f"data: {json.dumps(payload)}\r\n\r\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(ttft_ms / 1000 + chunk_delay * (len(chunks) - 1))
+        return JSONResponse(_payload(text, prompt, True, len(text)))
@@ -0,0 +1,70 @@
+"""
+Langfuse prompt store stand-in, installed in place of the SDK client with
+`PromptStore().install()`.
+
+Every template starts with a `[label]` marker so the provider stand-ins can
+tell which prompt a request rendered (see `label_of`), and carries the
+variables the app renders into it. `fetches` counts lookups per label, which
+shows how often the prompt cache goes back to the store.
+"""
+import re
+from collections import Counter
+from typing import Dict, Optional
+
+TEMPLATES = {
+    "user_intrest": "Infer travel traits from these answers: {{USER_RESPONSES}}",
+    "KN_generator": "Build a knowledge graph of the group members: {{INPUT_DATA}}",
+    "KN_Summerise": "Summarise the group from this graph: {{GRAPH_SUBGRAPH_JSON}}",
+    "KN_incremental_update": "Merge {{NEW_MEMBER_DATA}} into the graph {{GRAPH_JSON}}",
+    "spot_finder": "Recommend city spots for {{USER_PROFILE_SUMMARY}} around {{DESTINATION_CONTEXT}}",
+    "Serach_retrival": "Recommend short trips for {{USER_PROFILE_SUMMARY}} from {{DESTINATION_CONTEXT}}",
+    "base_level_planner": ("Plan a trip for {{USER_PROFILE_SUMMARY}} using {{CITY_ACTIVITY_RESULTS}} "
+                           "and {{SHORT_TRIP_OPTIONS}}"),
+}
+
+MODELS = {
+    "user_intrest": "gpt-bench",
+    "KN_generator": "nvidia-bench",
+    "KN_Summerise": "nvidia-bench",
+    "KN_incremental_update": "nvidia-bench",
+    "spot_finder": "gemini-bench",
+    "Serach_retrival": "gemini-bench",
+    "base_level_planner": "gemini-bench",
+}
+
+_MARKER = re.compile(r"\[([A-Za-z_]+)\]")
+
+
+def label_of(prompt: str) -> Optional[str]:
+    """Label of the template a rendered prompt came from."""
+    match = _MARKER.search(prompt)
+    return match.group(1) if match else None
+
+
+class _Prompt:
+    def __init__(self, label: str, template: str, model: str, version: int):
+        self.prompt = f"[{label}] {template}"
+        self.config = {"model": model}
+        self.version = version
+
+
+class PromptStore:
+    def __init__(self, templates: Dict[str, str] = None, models: Dict[str, str] = None, version: int = 1):
+        self.templates = dict(templates or TEMPLATES)
+        self.models = dict(models or MODELS)
+        self.version = version
+        self.fetches = Counter()
+
+    def get_prompt(self, name: str, **kwargs):
+        if name not in self.templates:
+            raise LookupError(f"prompt {name!r} not found")
+        self.fetches[name] += 1
+        return _Prompt(name, self.templates[name], self.models.get(name, "bench-model"), self.version)
+
+    def install(self) -> "PromptStore":
+        """Serve the app's prompt registry from this store; import after `_offline.configure`."""
+        from app import prompt_hub
+
+        prompt_hub.registry._client = self
+        prompt_hub.registry.invalidate()
+        return self
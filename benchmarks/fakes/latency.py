@@ -0,0 +1,49 @@
+"""
+Latency and failure model shared by the provider stand-ins.
+
+Latencies are log-normal, fitted to a median and a p99, which matches the long
+right tail of real LLM APIs better than a fixed delay. A fraction of requests
+can fail with a configurable HTTP status.
+"""
+import math
+import random
+from typing import Optional
+
+# z-score of the 99th percentile of a standard normal distribution.
+_Z99 = 2.3263
+
+
+class LatencyModel:
+    def __init__(self, median_ms: float, p99_ms: Optional[float] = None, error_rate: float = 0.0,
+                 error_status: int = 503, seed: Optional[int] = None):
+        self.median_ms = median_ms
+        self.p99_ms = p99_ms if p99_ms is not None else median_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._mu = math.log(max(median_ms, 1e-3))
+        self._sigma = max(0.0, math.log(max(self.p99_ms, 1e-3) / max(median_ms, 1e-3)) / _Z99)
+        self._random = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "LatencyModel":
+        """Build from "median_ms[:p99_ms[:error_rate[:status]]]", e.g. "800:4000:0.02:429"."""
+        parts = spec.split(":")
+        return cls(
+            float(parts[0]),
+            float(parts[1]) if len(parts) > 1 and parts[1] else None,
+            float(parts[2]) if len(parts) > 2 and parts[2] else 0.0,
+            int(parts[3]) if len(parts) > 3 and parts[3] else 503,
+            seed=seed,
+        )
+
+    def sample_ms(self) -> float:
+        if not self._sigma:
+            return self.median_ms
+        return self._random.lognormvariate(self._mu, self._sigma)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def __repr__(self):
+        return (f"LatencyModel(median={self.median_ms:g}ms, p99={self.p99_ms:g}ms, "
+                f"errors={self.error_rate:.1%} x {self.error_status})")
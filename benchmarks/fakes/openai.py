@@ -0,0 +1,63 @@
+"""
+OpenAI-compatible `POST /chat/completions` stand-in, used for both OpenAI and
+the NVIDIA endpoint (which speaks the same API).
+
+Responses come from `respond(prompt)`, where `prompt` is the joined text of
+the request messages. Each request waits a delay drawn from `latency` (a
+`LatencyModel`), and the same model decides which requests fail; a 429 carries
+a `retry-after` header like the real API. Point OPENAI_BASE_URL or
+NVIDIA_BASE_URL at it.
+"""
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Callable
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from .latency import LatencyModel
+
+
+class OpenAIStandIn:
+    def __init__(self, respond: Callable[[str], str], latency: LatencyModel = None):
+        self.respond = respond
+        self.latency = latency or LatencyModel(200)
+        self.requests = Counter()
+        self.failures = 0
+        self.app = Starlette(routes=[
+            Route("/chat/completions", self._handle, methods=["POST"]),
+            Route("/v1/chat/completions", self._handle, methods=["POST"]),
+        ])
+
+    async def _handle(self, request: Request):
+        body = json.loads(await request.body() or b"{}")
+        model = body.get("model", "")
+        self.requests[model] += 1
+        prompt = "\n".join(str(m.get("content") or "") for m in body.get("messages") or [])
+
+        await asyncio.sleep(self.latency.sample_ms() / 1000)
+        if self.latency.should_fail():
+            self.failures += 1
+            status = self.latency.error_status
+            headers = {"retry-after": "1"} if status == 429 else {}
+            error = {"message": "stand-in failure", "type": "server_error", "code": status}
+            return JSONResponse({"error": error}, status_code=status, headers=headers)
+
+        text = self.respond(prompt)
+        prompt_tokens, output_tokens = len(prompt) // 4, len(text) // 4
+        return JSONResponse({
+            "id": f"chatcmpl-{sum(self.requests.values())}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": output_tokens,
+                "total_tokens": prompt_tokens + output_tokens,
+            },
+        })
@@ -0,0 +1,125 @@
+"""
+In-memory PostgREST stand-in serving the subset of the API the app uses:
+select with column lists, eq./in. filters, order, limit, insert and update.
+Point SUPABASE_URL at it; every request is counted per (method, table) and
+can be delayed by `latency_ms` to model the network round trip.
+"""
+import asyncio
+import json
+from collections import Counter
+from typing import Dict, List
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+def _split_in_values(raw: str) -> List[str]:
+    values, current, quoted = [], [], False
+    for ch in raw:
+        if ch == '"':
+            quoted = not quoted
+        elif ch == "," and not quoted:
+            values.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    values.append("".join(current))
+    return values
+
+
+def _as_text(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else str(value)
+
+
+class PostgrestStandIn:
+    def __init__(self, tables: Dict[str, List[dict]] = None, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self._failures: List[int] = []
+        self.tables: Dict[str, List[dict]] = {name: list(rows) for name, rows in (tables or {}).items()}
+        self.requests = Counter()
+        self.app = Starlette(routes=[
+            Route("/rest/v1/{table}", self._handle, methods=["GET", "POST", "PATCH", "DELETE"]),
+        ])
+
+    def fail_next(self, count: int, status: int = 503):
+        """Answer the next `count` requests with `status` (e.g. to exercise client retries)."""
+        self._failures.extend([status] * count)
+
+    def reset_counts(self):
+        self.requests.clear()
+
+    @property
+    def round_trips(self) -> int:
+        return sum(self.requests.values())
+
+    def _filter(self, rows: List[dict], params) -> List[dict]:
+        for column, expression in params.multi_items():
+            if column in ("select", "order", "limit", "offset", "columns", "on_conflict"):
+                continue
+            op, _, operand = expression.partition(".")
+            if op == "eq":
+                rows = [r for r in rows if _as_text(r.get(column)) == operand]
+            elif op == "in":
+                allowed = set(_split_in_values(operand.strip("()")))
+                rows = [r for r in rows if _as_text(r.get(column)) in allowed]
+            elif op == "neq":
+                rows = [r for r in rows if _as_text(r.get(column)) != operand]
+            elif op == "is" and operand == "null":
+                rows = [r for r in rows if r.get(column) is None]
+        return rows
+
+    @staticmethod
+    def _project(rows: List[dict], select: str) -> List[dict]:
+        columns = [c.strip() for c in (select or "*").split(",") if c.strip()]
+        if not columns or "*" in columns:
+            return [dict(r) for r in rows]
+        return [{c: r.get(c) for c in columns} for r in rows]
+
+    @staticmethod
+    def _order(rows: List[dict], order: str) -> List[dict]:
+        for part in reversed([p for p in (order or "").split(",") if p]):
+            column, _, direction = part.partition(".")
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=direction.startswith("desc"))
+            rows = present + missing
+        return rows
+
+    async def _handle(self, request: Request) -> Response:
+        table = request.path_params["table"]
+        self.requests[(request.method, table)] += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        if self._failures:
+            return Response("upstream unavailable", status_code=self._failures.pop(0))
+        rows = self.tables.setdefault(table, [])
+        params = request.query_params
+
+        if request.method == "GET":
+            result = self._order(self._filter(rows, params), params.get("order"))
+            if params.get("offset"):
+                result = result[int(params["offset"]):]
+            if params.get("limit"):
+                result = result[: int(params["limit"])]
+            return JSONResponse(self._project(result, params.get("select")))
+
+        if request.method == "POST":
+            body = json.loads(await request.body() or b"[]")
+            new_rows = body if isinstance(body, list) else [body]
+            rows.extend(dict(r) for r in new_rows)
+            return JSONResponse(new_rows, status_code=201)
+
+        matched = self._filter(rows, params)
+        if request.method == "PATCH":
+            changes = json.loads(await request.body() or b"{}")
+            for row in matched:
+                row.update(changes)
+            return JSONResponse([dict(r) for r in matched])
+
+        ids = {id(r) for r in matched}
+        self.tables[table] = [r for r in rows if id(r) not in ids]
+        return JSONResponse([dict(r) for r in matched])
@@ -0,0 +1,36 @@
+import socket
+import threading
+import time
+
+import uvicorn
+
+
+class ThreadedServer:
+    """
+    Runs an ASGI app with uvicorn on a free local port in a daemon thread.
+
+    Lifespan events are off by default; pass `lifespan="on"` to run the app's
+    startup and shutdown (job workers, loop monitor, client cleanup).
+    """
+
+    def __init__(self, app, host: str = "127.0.0.1", lifespan: str = "off"):
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://{host}:{self.port}"
+        config = uvicorn.Config(app, host=host, port=self.port, log_level="warning", lifespan=lifespan)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self) -> "ThreadedServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"stand-in server on {self.url} did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
@@ -0,0 +1,13 @@
+-- Background job status for JOB_STORE=supabase (app/jobs/queue.py SupabaseJobStore).
+-- The default in-memory store needs no table.
+create table if not exists public.jobs (
+    id uuid primary key,
+    type text not null,
+    group_id uuid not null references public.groups (id) on delete cascade,
+    status text not null,
+    error_message text,
+    created_at timestamp not null default now(),
+    updated_at timestamp not null default now()
+);
+
+create index if not exists jobs_group_id_idx on public.jobs (group_id);
@@ -0,0 +1,19 @@
+"""Offline settings so the app modules import without credentials or network."""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+for key, value in {
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_ANON_KEY": "test",
+    "LANGFUSE_PUBLIC_KEY": "pk-test",
+    "LANGFUSE_SECRET_KEY": "sk-test",
+    "LANGFUSE_BASE_URL": "http://127.0.0.1:9",
+    "LANGFUSE_TRACING_ENABLED": "false",
+    "OTEL_SDK_DISABLED": "true",
+}.items():
+    os.environ.setdefault(key, value)
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,93 @@
+import json
+import random
+
+import pytest
+
+from app.core.json_extract import JSONExtractError, JSONExtractor, loads
+
+DOC = {"plan_options": [{"plan_id": "opt-1", "budget": 12000, "weekend": True, "notes": None,
+                         "days": [{"day": 1, "title": "Old town"}]}]}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('Sure! Here it is:\n{"a": 1}\nAnything else?', {"a": 1}),
+    ('{"a": [1, 2,], "b": 2,}', {"a": [1, 2], "b": 2}),
+    ("{'a': 'x', b: True, c: None}", {"a": "x", "b": True, "c": None}),
+    ('{"a": "line\nbreak"}', {"a": "line\nbreak"}),
+    ('{"a": "he said "hi" there", "b": 1}', {"a": 'he said "hi" there', "b": 1}),
+    ('{"a": "x\\d"}', {"a": "x\\d"}),
+])
+def test_repairs_common_defects(text, expected):
+    assert loads(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": "x"  "b": 2}', {"a": "x", "b": 2}),
+    ('{"a": 1\n"b": 2}', {"a": 1, "b": 2}),
+    ('{"a": {"c": [1, 2] "d": true} "e": null}', {"a": {"c": [1, 2], "d": True}, "e": None}),
+    ('["a" "b"]', ["a", "b"]),
+    ("[1 2 3]", [1, 2, 3]),
+])
+def test_missing_commas_are_inserted(text, expected):
+    assert loads(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"n": 1.}', {"n": 1.0}),
+    ('{"n": 007}', {"n": 7}),
+    ('{"n": .5, "m": +3}', {"n": 0.5, "m": 3}),
+    ('{"date": "2026-05-01", "version": 1.2.3}', {"date": "2026-05-01", "version": "1.2.3"}),
+])
+def test_loose_numbers_become_numbers(text, expected):
+    assert loads(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": "abc', {"a": "abc"}),
+    ('{"a": 1, "b": "x\\u00', {"a": 1, "b": "x"}),
+    ('{"a": 1, "b": [1, 2', {"a": 1, "b": [1, 2]}),
+    ('{"a": 12', {"a": 12}),
+    ('{"a": 1, "b', {"a": 1}),
+])
+def test_truncated_output_keeps_complete_members(text, expected):
+    assert loads(text) == expected
+
+
+@pytest.mark.parametrize("text", ['{"a": ', '{"a', "no json here", "", None])
+def test_unrecoverable_output_raises(text):
+    with pytest.raises(JSONExtractError):
+        loads(text)
+
+
+def test_empty_containers_are_kept():
+    assert loads("{}") == {}
+    assert loads("[]") == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('Note [1]: the answer is {"a": 1}', {"a": 1}),
+    ('[1] {"plan_options": []}', {"plan_options": []}),
+    ("[1, 2]", [1, 2]),
+    ("[1] and [2]", [1]),
+])
+def test_bracketed_prose_is_not_the_answer(text, expected):
+    assert loads(text) == expected
+
+
+def test_chunked_feed_matches_one_shot():
+    text = "Here:\n```json\n" + json.dumps(DOC, indent=2).replace('"', "'").replace("true", "True") + "\n```"
+    whole = JSONExtractor()
+    whole.feed(text)
+    rng = random.Random(4)
+    for _ in range(20):
+        extractor = JSONExtractor()
+        pos = 0
+        committed = []
+        while pos < len(text):
+            step = rng.randint(1, 9)
+            committed.append(extractor.feed(text[pos:pos + step]))
+            pos += step
+        assert extractor.result() == whole.result() == DOC
+        assert "".join(committed) == extractor.text
@@ -0,0 +1,75 @@
+import json
+import random
+import time
+
+from app.core.json_stream import JSONStreamScanner
+
+DOC = {
+    "plan_options": [
+        {"plan_id": f"opt-{o}", "note": 'a "quoted" {brace} [x]', "daily_itinerary": [{"day": d} for d in range(3)]}
+        for o in range(3)
+    ],
+    "summary": "done",
+}
+
+
+def _chunks(text, rng, size=7):
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, size)
+        yield text[pos:pos + step]
+        pos += step
+
+
+def _scan(text, patterns, rng):
+    scanner = JSONStreamScanner(patterns)
+    events = []
+    for chunk in _chunks(text, rng):
+        events.extend(scanner.feed(chunk))
+    return scanner, events
+
+
+def test_reports_matching_values_in_order():
+    text = "Here you go:\n```json\n" + json.dumps(DOC, indent=2) + "\n```"
+    scanner, events = _scan(text, [("plan_options", "*"), ("plan_options", "*", "daily_itinerary", "*")],
+                            random.Random(1))
+    options = [value for path, value in events if len(path) == 2]
+    days = [path for path, _ in events if len(path) == 4]
+    assert options == DOC["plan_options"]
+    assert days[:3] == [("plan_options", 0, "daily_itinerary", d) for d in range(3)]
+    assert scanner.done
+
+
+def test_chunking_does_not_change_events():
+    text = json.dumps(DOC)
+    patterns = [("plan_options", "*", "plan_id"), ("summary",)]
+    expected = _scan(text, patterns, random.Random(0))[1]
+    for seed in range(20):
+        assert _scan(text, patterns, random.Random(seed))[1] == expected
+    assert expected[-1] == (("summary",), "done")
+
+
+def test_only_chunks_of_pending_values_are_kept():
+    items = [{"id": i, "text": "x" * 50} for i in range(2000)]
+    text = json.dumps({"items": items})
+    scanner = JSONStreamScanner([("items", "*")])
+    retained = 0
+    count = 0
+    for chunk in _chunks(text, random.Random(2), size=40):
+        count += len(scanner.feed(chunk))
+        retained = max(retained, sum(len(c) for _, c in scanner._chunks))
+    assert count == len(items)
+    assert retained < 200
+
+
+def test_scan_time_is_linear():
+    def elapsed(n):
+        text = json.dumps({"items": [{"id": i, "text": "x" * 50} for i in range(n)]})
+        scanner = JSONStreamScanner([("items", "*")])
+        start = time.perf_counter()
+        for chunk in _chunks(text, random.Random(3), size=20):
+            scanner.feed(chunk)
+        return time.perf_counter() - start
+
+    small, large = elapsed(1000), elapsed(8000)
+    assert large < small * 16
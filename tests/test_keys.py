@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.keys import KeyScheduler, KeysExhaustedError
+from app.core.resilience import CLOSED, HALF_OPEN, OPEN, CircuitOpenError
+
+
+class _Upstream(Exception):
+    status_code = 503
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+
+def _in_flight(scheduler):
+    return [row["in_flight"] for row in scheduler.stats()]
+
+
+def test_picks_least_loaded_key():
+    scheduler = KeyScheduler("test", ["key-aaaaaaaa", "key-bbbbbbbb"])
+    first = scheduler.acquire()
+    second = scheduler.acquire()
+    assert {first.key, second.key} == {"key-aaaaaaaa", "key-bbbbbbbb"}
+    scheduler.release(first)
+    scheduler.release(second)
+    assert _in_flight(scheduler) == [0, 0]
+
+
+def test_rpm_throttles_instead_of_failing():
+    scheduler = KeyScheduler("test", ["key-aaaaaaaa"], rpm=1, max_wait_seconds=120)
+    scheduler.release(scheduler.acquire())
+    lease = scheduler.acquire()
+    assert 50 < lease.delay <= 60
+    scheduler.release(lease)
+
+
+def test_wait_beyond_max_raises():
+    scheduler = KeyScheduler("test", ["key-aaaaaaaa"], rpm=1, max_wait_seconds=1)
+    scheduler.release(scheduler.acquire())
+    with pytest.raises(KeysExhaustedError):
+        scheduler.acquire()
+
+
+def test_rate_limited_key_cools_down():
+    scheduler = KeyScheduler("test", ["key-aaaaaaaa", "key-bbbbbbbb"], cooldown_seconds=60)
+    lease = scheduler.acquire()
+    scheduler.release(lease, _RateLimited())
+    for _ in range(3):
+        other = scheduler.acquire()
+        assert other.key != lease.key
+        scheduler.release(other)
+
+
+def test_invalid_key_is_disabled():
+    class Unauthorized(Exception):
+        status_code = 401
+
+    scheduler = KeyScheduler("test", ["key-aaaaaaaa", "key-bbbbbbbb"])
+    lease = scheduler.acquire()
+    scheduler.release(lease, Unauthorized())
+    assert lease.key not in scheduler.keys
+
+
+def test_key_breaker_opens_and_probes():
+    scheduler = KeyScheduler("test", ["key-aaaaaaaa"], breaker_threshold=2, breaker_open_seconds=0.05)
+    for _ in range(2):
+        scheduler.release(scheduler.acquire(), _Upstream())
+    assert scheduler.stats()[0]["breaker"]["state"] == OPEN
+    with pytest.raises(CircuitOpenError):
+        scheduler.acquire()
+    time.sleep(0.06)
+    probe = scheduler.acquire()
+    assert scheduler.stats()[0]["breaker"]["state"] == HALF_OPEN
+    scheduler.release(probe)
+    assert scheduler.stats()[0]["breaker"]["state"] == CLOSED
+
+
+def test_cancelled_during_throttle_wait_releases_key():
+    scheduler = KeyScheduler("test", ["key-aaaaaaaa"], rpm=1, max_wait_seconds=120)
+    scheduler.release(scheduler.acquire())
+
+    async def main():
+        async def call():
+            async with scheduler.alease():
+                pass
+
+        task = asyncio.create_task(call())
+        await asyncio.sleep(0.05)
+        assert _in_flight(scheduler) == [1]
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert _in_flight(scheduler) == [0]
+
+
+def test_cancelled_probe_during_throttle_wait_frees_probe_slot():
+    scheduler = KeyScheduler("test", ["key-aaaaaaaa"], rpm=1, max_wait_seconds=120,
+                             breaker_threshold=1, breaker_open_seconds=0.01)
+    scheduler.release(scheduler.acquire(), _Upstream())
+    time.sleep(0.02)
+
+    async def main():
+        async def call():
+            async with scheduler.alease():
+                pass
+
+        task = asyncio.create_task(call())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert _in_flight(scheduler) == [0]
+    # The probe slot was given back, so the recovering key can still be probed.
+    assert scheduler.stats()[0]["breaker"]["state"] == HALF_OPEN
+    probe = scheduler.acquire()
+    scheduler.release(probe)
+    assert scheduler.stats()[0]["breaker"]["state"] == CLOSED
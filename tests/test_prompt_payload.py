@@ -0,0 +1,89 @@
+import logging
+from datetime import datetime
+
+import pytest
+from jinja2 import Template
+
+from app.core import prompt_payload
+from app.core.config import settings
+
+RESULTS = {
+    "base_city": "Bengaluru",
+    "short_trip_destinations": [
+        {"destination_name": "Nandi Hills", "key_highlights": ["Sunrise"], "weather_during_trip": None},
+        {"destination_name": "Mysuru", "key_highlights": [], "source": {"url": "https://example.com"}},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def payload_settings(monkeypatch):
+    monkeypatch.setattr(settings, "PROMPT_PAYLOAD_COMPACT", True)
+    monkeypatch.setattr(settings, "PROMPT_PAYLOAD_DROP_EMPTY", True)
+    monkeypatch.setattr(settings, "PROMPT_PAYLOAD_FIELDS", {})
+    monkeypatch.setattr(prompt_payload, "_warned", set())
+
+
+def _render(template: str, **variables) -> str:
+    return Template(template).render(**prompt_payload.compact("spot_finder", **variables))
+
+
+def test_interpolation_renders_compact_json():
+    assert _render("{{ X }}", X={"b": None, "a": [1, {"c": ""}], "d": datetime(2026, 5, 1)}) == (
+        '{"a":[1,{}],"d":"2026-05-01T00:00:00"}'
+    )
+
+
+def test_templates_can_traverse_the_data():
+    template = "{% for d in X.short_trip_destinations %}{{ d.destination_name }}={{ d.key_highlights }};{% endfor %}"
+    assert _render(template, X=RESULTS) == 'Nandi Hills=["Sunrise"];Mysuru=[];'
+    assert _render("{{ X['base_city'] }} {{ X.short_trip_destinations|length }}", X=RESULTS) == "Bengaluru 2"
+
+
+def test_projection_applies_to_rendering_only(monkeypatch):
+    monkeypatch.setattr(settings, "PROMPT_PAYLOAD_FIELDS", {
+        "spot_finder": {"X": ["short_trip_destinations.destination_name"]},
+    })
+    assert _render("{{ X }}", X=RESULTS) == (
+        '{"short_trip_destinations":[{"destination_name":"Nandi Hills"},{"destination_name":"Mysuru"}]}'
+    )
+    assert _render("{{ X.base_city }}", X=RESULTS) == "Bengaluru"
+
+
+def test_wrapped_values_equal_the_input():
+    variables = prompt_payload.compact("spot_finder", X=RESULTS, Y=(1, 2), Z="text")
+    assert variables["X"] == RESULTS
+    assert variables["Y"] == [1, 2]
+    assert variables["Z"] == "text"
+
+
+def test_disabled_passes_variables_through(monkeypatch):
+    monkeypatch.setattr(settings, "PROMPT_PAYLOAD_COMPACT", False)
+    assert _render("{{ X }}", X={"a": None}) == "{'a': None}"
+
+
+def test_unmatched_field_path_is_logged_once(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "PROMPT_PAYLOAD_FIELDS", {
+        "spot_finder": {"X": ["spots.destination_name", "short_trip_destinations.source.url"]},
+    })
+    with caplog.at_level(logging.WARNING, logger="app.core.prompt_payload"):
+        _render("{{ X }}", X=RESULTS)
+        _render("{{ X }}", X=RESULTS)
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 1
+    assert "spot_finder.X.spots.destination_name" in messages[0]
+
+
+def test_empty_lists_do_not_count_as_unmatched(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "PROMPT_PAYLOAD_FIELDS", {
+        "spot_finder": {"X": ["short_trip_destinations.destination_name"]},
+    })
+    with caplog.at_level(logging.WARNING, logger="app.core.prompt_payload"):
+        _render("{{ X }}", X={"short_trip_destinations": []})
+    assert not caplog.records
+
+
+def test_fingerprint_follows_the_settings(monkeypatch):
+    before = prompt_payload.fingerprint()
+    monkeypatch.setattr(settings, "PROMPT_PAYLOAD_DROP_EMPTY", False)
+    assert prompt_payload.fingerprint() != before
@@ -0,0 +1,58 @@
+import pytest
+
+from app.core.cache import SQLiteCache, TTLCache
+from app.core.config import settings
+from app.services import rec_cache
+
+
+@pytest.fixture
+def tiers(tmp_path, monkeypatch):
+    memory = TTLCache(100, 60)
+    persistent = SQLiteCache(str(tmp_path / "rec.sqlite"), 60, table="recommendations")
+    monkeypatch.setattr(rec_cache, "memory", memory)
+    monkeypatch.setattr(rec_cache, "persistent", persistent)
+    yield memory, persistent
+    persistent.close()
+
+
+def test_key_ignores_whitespace_and_case():
+    versions = {"spot_finder": "1:abc"}
+    assert rec_cache.make_key("a  b", " Goa ", "2026-05-01", versions) == rec_cache.make_key(
+        "a b", "goa", "2026-05-01", versions
+    )
+    assert rec_cache.make_key("a b", "goa", "2026-05-01", versions) != rec_cache.make_key(
+        "a b", "goa", "2026-05-01", {"spot_finder": "2:def"}
+    )
+
+
+def test_key_changes_with_payload_settings(monkeypatch):
+    versions = {"spot_finder": "1:abc"}
+    before = rec_cache.make_key("a b", "goa", "2026-05-01", versions)
+    monkeypatch.setattr(settings, "PROMPT_PAYLOAD_FIELDS", {"spot_finder": {"USER_PROFILE_SUMMARY": ["group_vibe"]}})
+    assert rec_cache.make_key("a b", "goa", "2026-05-01", versions) != before
+
+
+def test_get_returns_a_copy(tiers):
+    rec_cache.put("k", {"short_trip": {"spots": [1]}}, group_id="g1")
+    value = rec_cache.get("k")
+    value["short_trip"]["spots"].append(2)
+    assert rec_cache.get("k") == {"short_trip": {"spots": [1]}}
+
+
+def test_invalidate_group_drops_both_tiers(tiers):
+    rec_cache.put("k", {"v": 1}, group_id="g1")
+    rec_cache.put("other", {"v": 2}, group_id="g2")
+    rec_cache.invalidate_group("g1")
+    assert rec_cache.get("k") is None
+    assert rec_cache.get("other") == {"v": 2}
+
+
+def test_promoted_entry_keeps_group_tag(tiers):
+    memory, _ = tiers
+    rec_cache.put("k", {"v": 1}, group_id="g1")
+    memory.clear()  # e.g. after a restart only the SQLite tier has the entry
+    assert rec_cache.get("k") == {"v": 1}
+    assert len(memory) == 1
+    rec_cache.invalidate_group("g1")
+    assert len(memory) == 0
+    assert rec_cache.get("k") is None
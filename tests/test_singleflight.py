@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_identical_calls_share_one_upstream_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"plan": [1]}
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+
+    results = _run(main())
+    assert len(calls) == 1
+    assert results == [{"plan": [1]}] * 5
+    assert flight.stats()["deduplicated"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_callers_mutating_results_do_not_affect_each_other():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return {"branches": {"short_trip": None}}
+
+    async def caller(patch):
+        result = await flight.do("k", fetch)
+        result["branches"]["short_trip"] = patch
+        await asyncio.sleep(0)
+        return result
+
+    async def main():
+        return await asyncio.gather(caller("leader"), caller("follower"), flight.do("k", fetch))
+
+    leader, follower, untouched = _run(main())
+    assert leader["branches"]["short_trip"] == "leader"
+    assert follower["branches"]["short_trip"] == "follower"
+    assert untouched["branches"]["short_trip"] is None
+
+
+def test_exception_reaches_every_caller():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream")
+
+    async def main():
+        return await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+
+    assert [str(e) for e in _run(main())] == ["upstream", "upstream"]
+
+
+def test_one_cancelled_caller_does_not_cancel_the_call():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def fetch():
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return 1
+
+    async def main():
+        first = asyncio.create_task(flight.do("k", fetch))
+        second = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert _run(main()) == 1
+    assert cancelled == []
+
+
+def test_call_is_cancelled_when_its_last_caller_leaves():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def fetch():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(flight.do("k", fetch), 0.02)
+        await asyncio.sleep(0)
+        # A new caller for the same key starts a fresh call.
+        return await flight.do("k", lambda: asyncio.sleep(0, result="fresh"))
+
+    assert _run(main()) == "fresh"
+    assert cancelled == [1]
+    assert flight.stats()["abandoned"] == 1
+    assert flight.stats()["waiters"] == 0